@@ -0,0 +1,44 @@
+""" Compare json decoders of NseApi on option chain response bytes
+
+Usage:
+    python benchmarks/bench_decode.py [--strikes 150] [--expiries 16] [--repeat 20]
+"""
+import argparse
+import json
+import timeit
+import sys
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.requester import JSON_DECODERS, decode_option_chain
+from nseapi.synthetic import option_chain_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strikes', type=int, default=150)
+    parser.add_argument('--expiries', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = option_chain_payload('NIFTY', strikes=args.strikes, expiries=args.expiries, seed=1)
+    content = json.dumps(payload).encode()
+    print(f'payload: {len(content) / 1024:.0f} KiB, {len(payload["records"]["data"])} records')
+
+    def best_ms(func):
+        return min(timeit.repeat(func, number=1, repeat=args.repeat)) * 1000
+
+    # What res.json() did: decode bytes to text, then stdlib json
+    base = best_ms(lambda: json.loads(content.decode('utf-8')))
+    print(f'{"res.json() equivalent":<32} {base:8.2f} ms')
+    for name, decoder in JSON_DECODERS.items():
+        assert decode_option_chain(content, decoder)['records'] == payload['records']
+        elapsed = best_ms(lambda: decode_option_chain(content, decoder))
+        print(f'{name:<32} {elapsed:8.2f} ms  x{base / elapsed:5.2f}')
+
+
+if __name__ == '__main__':
+    main()
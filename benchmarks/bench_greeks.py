@@ -0,0 +1,79 @@
+""" Time vectorized implied volatility and Greeks against row by row DataFrame.apply
+
+Usage:
+    python benchmarks/bench_greeks.py [--rows 10000 1000000] [--apply-rows 10000]
+"""
+import argparse
+import math
+import time as t
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.greeks import black_scholes, implied_volatility
+
+
+def random_options(rows, seed=1):
+    rng = np.random.default_rng(seed)
+    spot = rng.uniform(100, 50000, rows)
+    data = {
+        'spot': spot,
+        'strike': spot * rng.uniform(0.7, 1.3, rows),
+        'time': rng.uniform(1 / 365, 0.5, rows),
+        'vol': rng.uniform(0.08, 0.8, rows),
+        'call': rng.random(rows) < 0.5,
+    }
+    data['price'] = black_scholes(data['spot'], data['strike'], data['time'], data['vol'], 0.07, 0.0,
+                                  data['call'])['Price']
+    return data
+
+
+def row_greeks(row, rate=0.07):
+    """ Greeks of one option the way they were computed with apply """
+    sqrt_t = math.sqrt(row['time'])
+    d1 = (math.log(row['spot'] / row['strike']) + (rate + 0.5 * row['vol'] ** 2) * row['time']) / \
+         (row['vol'] * sqrt_t)
+    d2 = d1 - row['vol'] * sqrt_t
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    pdf = math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi)
+    sign = 1 if row['call'] else -1
+    return pd.Series({
+        'Delta': sign * cdf(sign * d1),
+        'Gamma': pdf / (row['spot'] * row['vol'] * sqrt_t),
+        'Vega': row['spot'] * pdf * sqrt_t / 100,
+        'Theta': (-row['spot'] * pdf * row['vol'] / (2 * sqrt_t)
+                  - sign * rate * row['strike'] * math.exp(-rate * row['time']) * cdf(sign * d2)) / 365,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000])
+    parser.add_argument('--apply-rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    df = pd.DataFrame(random_options(args.apply_rows))
+    started = t.perf_counter()
+    df.apply(row_greeks, axis=1)
+    elapsed = t.perf_counter() - started
+    print(f'{"DataFrame.apply greeks":<32} {elapsed * 1000:10.1f} ms  ({args.apply_rows} rows)')
+
+    for rows in args.rows:
+        data = random_options(rows)
+        started = t.perf_counter()
+        vol = implied_volatility(data['price'], data['spot'], data['strike'], data['time'], 0.07, 0.0, data['call'])
+        solved = t.perf_counter()
+        black_scholes(data['spot'], data['strike'], data['time'], vol, 0.07, 0.0, data['call'])
+        done = t.perf_counter()
+        print(f'{"implied_volatility":<32} {(solved - started) * 1000:10.1f} ms  ({rows} rows, '
+              f'{np.isnan(vol).mean() * 100:.2f}% unsolved)')
+        print(f'{"black_scholes greeks":<32} {(done - solved) * 1000:10.1f} ms  ({rows} rows)')
+
+
+if __name__ == '__main__':
+    main()
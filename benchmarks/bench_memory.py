@@ -0,0 +1,36 @@
+""" Compare memory of default and compact OptionChain, tests/test_compact.py checks results are unchanged
+
+Usage:
+    python benchmarks/bench_memory.py [--strikes 150] [--expiries 16] [--symbol NIFTY]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.data_models import OptionChain
+from nseapi.synthetic import option_chain_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strikes', type=int, default=150)
+    parser.add_argument('--expiries', type=int, default=16)
+    parser.add_argument('--symbol', default='NIFTY')
+    args = parser.parse_args()
+
+    payload = option_chain_payload(args.symbol, strikes=args.strikes, expiries=args.expiries, seed=1)
+    chain = OptionChain(payload)
+    compact = OptionChain(payload, compact=True)
+
+    projected = OptionChain(payload, compact=True, columns=['Call Open Interest', 'Put Open Interest',
+                                                            'Call Last Price', 'Put Last Price'])
+    for name, c in (('default', chain), ('compact', compact), ('compact + 4 columns', projected)):
+        print(f'{name:<24} {c.memory_usage().sum() / 1024:10.1f} KiB  ({len(c)} rows)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+""" Throughput of parallel.parse_many against parsing in one process
+
+Usage:
+    python benchmarks/bench_parallel.py [--payloads 64] [--strikes 150] [--expiries 16] [--workers 1 2 4 8]
+"""
+import argparse
+import json
+import os
+import time as t
+import sys
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.data_models import OptionChain
+from nseapi.parallel import parse_many
+from nseapi.requester import decode_option_chain, get_decoder
+from nseapi.synthetic import option_chain_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--payloads', type=int, default=64)
+    parser.add_argument('--strikes', type=int, default=150)
+    parser.add_argument('--expiries', type=int, default=16)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, 16, 32, cpus} & set(range(1, cpus + 1)))
+    bodies = [json.dumps(option_chain_payload('NIFTY', strikes=args.strikes, expiries=args.expiries,
+                                              seed=i)).encode() for i in range(args.payloads)]
+    decoder = get_decoder()
+
+    started = t.perf_counter()
+    for body in bodies:
+        OptionChain(decode_option_chain(body, decoder))
+    serial = t.perf_counter() - started
+    print(f'{"serial":<12} {args.payloads / serial:8.1f} payloads/s')
+
+    for n in workers:
+        started = t.perf_counter()
+        for chain in parse_many(bodies, workers=n):
+            chain.df
+        elapsed = t.perf_counter() - started
+        print(f'{f"workers={n}":<12} {args.payloads / elapsed:8.1f} payloads/s  x{serial / elapsed:5.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+""" Compare columnar records_to_dataframe with normalize_oi_data + data_to_dataframe
+
+Usage:
+    python benchmarks/bench_parse.py [--strikes 150] [--expiries 16] [--repeat 20]
+"""
+import argparse
+import timeit
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.data_models import normalize_oi_data, data_to_dataframe, records_to_dataframe
+from nseapi.synthetic import option_chain_payload
+
+
+def legacy_parse(payload):
+    # normalize_oi_data replace data lists in place, so give it shallow copies
+    data = normalize_oi_data({'records': dict(payload['records']), 'filtered': dict(payload['filtered'])})
+    return data_to_dataframe(data['records']['data'])
+
+
+def fast_parse(payload):
+    return records_to_dataframe(payload['records']['data'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strikes', type=int, default=150)
+    parser.add_argument('--expiries', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = option_chain_payload('NIFTY', strikes=args.strikes, expiries=args.expiries, seed=1)
+    pd.testing.assert_frame_equal(legacy_parse(payload), fast_parse(payload))
+
+    rows = len(payload['records']['data'])
+    results = {}
+    for name, func in (('normalize_oi_data + data_to_dataframe', legacy_parse),
+                       ('records_to_dataframe', fast_parse)):
+        results[name] = min(timeit.repeat(lambda: func(payload), number=1, repeat=args.repeat))
+        print(f'{name:<40} {results[name] * 1000:8.2f} ms  ({rows} records)')
+
+    legacy, fast = results.values()
+    print(f'speedup: {legacy / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
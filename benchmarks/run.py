@@ -0,0 +1,209 @@
+""" Benchmark suite: parsing, OptionChain operations, startup and fetching from a local FakeNseServer
+
+Every result is milliseconds, or kB and connections for fetch.wire_kb_per_chain and
+fetch.connections, lower is better. Results can be saved as baseline and later
+runs compared to it, benchmarks slower than baseline by more than tolerance are reported
+as regressions and make the run exit with status 1.
+
+Usage:
+    python benchmarks/run.py [--save baseline.json] [--compare baseline.json] [--tolerance 0.25]
+                             [--strikes 150] [--expiries 16] [--symbols 20] [--filter fetch]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time as t
+import timeit
+from datetime import timedelta
+from pathlib import Path
+
+# Run from a checkout without installing nseapi
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from nseapi.data_models import OptionChain, data_to_dataframe, normalize_oi_data, records_to_dataframe
+from nseapi.fake_server import FakeNseServer
+from nseapi.history import OptionChainHistory
+from nseapi.requester import NseApi
+from nseapi.synthetic import option_chain_payload
+from nseapi.transport import Transport
+
+STOCKS = ['RELIANCE', 'TCS', 'INFY', 'HDFCBANK', 'ICICIBANK', 'SBIN', 'ITC', 'LT', 'AXISBANK', 'KOTAKBANK',
+          'BHARTIARTL', 'HINDUNILVR', 'MARUTI', 'TITAN', 'WIPRO', 'ULTRACEMCO', 'NESTLEIND', 'ONGC']
+
+
+def best_ms(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def parse_benchmarks(args) -> dict:
+    payload = option_chain_payload('NIFTY', strikes=args.strikes, expiries=args.expiries, seed=1)
+
+    def legacy():
+        data = normalize_oi_data({'records': dict(payload['records']), 'filtered': dict(payload['filtered'])})
+        return data_to_dataframe(data['records']['data'])
+
+    return {
+        'parse.normalize_oi_data+data_to_dataframe': best_ms(legacy, args.repeat),
+        'parse.records_to_dataframe': best_ms(lambda: records_to_dataframe(payload['records']['data']), args.repeat),
+        'parse.option_chain_compact': best_ms(lambda: OptionChain(payload, compact=True), args.repeat),
+        'parse.option_chain_near_atm10': best_ms(
+            lambda: OptionChain(payload, expiries='near', strikes_around_atm=10), args.repeat),
+    }
+
+
+def chain_benchmarks(args) -> dict:
+    payload = option_chain_payload('NIFTY', strikes=args.strikes, expiries=args.expiries, seed=1)
+    df = OptionChain(payload).df
+
+    def fresh():
+        # New chain every run, so cached strike index and expiry calendar views are rebuilt
+        chain = OptionChain(df)
+        chain.time_stamp = None
+        return chain
+
+    def expiry_views():
+        chain = fresh()
+        for view in (chain.near_expriry, chain.next_expiry, chain.far_expiry, chain.monthly_expiry,
+                     chain.weekly_expiry, chain.current_expiry):
+            view.df
+
+    def history_session():
+        # One snapshot a minute for a trading day
+        history = OptionChainHistory()
+        snapshot = fresh()
+        start = OptionChain(payload).time_stamp
+        for minute in range(375):
+            snapshot.time_stamp = start + timedelta(minutes=minute)
+            history.append(snapshot)
+        return history.change('Call Open Interest', minutes=15)
+
+    return {
+        'chain.trim': best_ms(lambda: fresh().trim(5), args.repeat),
+        'chain.trim_near_expiry': best_ms(lambda: fresh().near_expriry.trim(5).df, args.repeat),
+        'chain.expiry_views': best_ms(expiry_views, args.repeat),
+        'chain.get_by_strike': best_ms(lambda: fresh().get_by_strike(fresh().middle_strike, 'above').df,
+                                       args.repeat),
+        'chain.to_dict': best_ms(lambda: fresh().trim(5).to_dict(), args.repeat),
+        'chain.history_session': best_ms(history_session, max(1, args.repeat // 5)),
+    }
+
+
+def fetch_benchmarks(args) -> dict:
+    results = {}
+    symbols = ['NIFTY', 'BANKNIFTY', 'FINNIFTY'] + STOCKS
+    symbols = (symbols * (args.symbols // len(symbols) + 1))[:args.symbols]
+    with FakeNseServer(strikes=args.strikes, expiries=args.expiries, latency=args.latency) as server:
+        transport = Transport()
+        api = NseApi(background_refresh=False, transport=transport)
+        try:
+            api.option_chain('NIFTY', True)
+            latencies = []
+            for _ in range(args.repeat):
+                started = t.perf_counter()
+                api.option_chain('NIFTY', True)
+                latencies.append((t.perf_counter() - started) * 1000)
+            latencies.sort()
+            results['fetch.latency_p50'] = statistics.median(latencies)
+            results['fetch.latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+            started = t.perf_counter()
+            fetched = sum(chain is not None for _, chain in api.option_chains(symbols))
+            elapsed = (t.perf_counter() - started) * 1000
+            results['fetch.option_chains_per_symbol'] = elapsed / max(fetched, 1)
+            chains = transport.stats()['endpoints']['Open Interest']
+            results['fetch.wire_kb_per_chain'] = chains['wire_bytes'] / chains['responses'] / 1024
+            results['fetch.connections'] = transport.connections
+
+            failures = sum(count for (path, status), count in server.stats.items() if status != 200)
+            if failures:
+                print(f'warning: {failures} failed responses from FakeNseServer', file=sys.stderr)
+        finally:
+            api.close()
+    return results
+
+
+def import_ms(statement: str, repeat: int) -> float:
+    """ Return best milliseconds of statement in fresh interpreters, so nothing is imported yet """
+    code = f'import time; s = time.perf_counter(); {statement}; print(time.perf_counter() - s)'
+    return min(float(subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)) for _ in range(repeat)) * 1000
+
+
+def startup_benchmarks(args) -> dict:
+    repeat = min(args.repeat, 5)
+    results = {
+        'startup.import_nseapi': import_ms('import nseapi', repeat),
+        'startup.import_NseApi': import_ms('from nseapi import NseApi', repeat),
+    }
+    with FakeNseServer(latency=args.latency):
+        def construct(lazy):
+            NseApi(background_refresh=False, lazy=lazy).close()
+        results['startup.NseApi'] = best_ms(lambda: construct(False), args.repeat)
+        results['startup.NseApi_lazy'] = best_ms(lambda: construct(True), args.repeat)
+    return results
+
+
+SUITES = {'parse': parse_benchmarks, 'chain': chain_benchmarks, 'startup': startup_benchmarks,
+          'fetch': fetch_benchmarks}
+# Benchmark: unit, for results which are not milliseconds
+UNITS = {'fetch.wire_kb_per_chain': 'kB', 'fetch.connections': 'conn'}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """ Print results next to baseline and return names of regressed benchmarks """
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        unit = UNITS.get(name, 'ms')
+        if base is None:
+            print(f'{name:<46} {value:10.3f} {unit:<4}  (no baseline)')
+            continue
+        ratio = value / base if base else float('inf')
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:<46} {value:10.3f} {unit:<4}  baseline {base:10.3f} {unit:<4}  x{ratio:5.2f}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', help='write results to this baseline file')
+    parser.add_argument('--compare', help='compare results with this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown ratio')
+    parser.add_argument('--strikes', type=int, default=150)
+    parser.add_argument('--expiries', type=int, default=16)
+    parser.add_argument('--symbols', type=int, default=20, help='symbols fetched by throughput benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of latency injected by server')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--filter', default='', help='run only benchmarks whose name starts with this')
+    args = parser.parse_args()
+
+    results = {}
+    for suite, func in SUITES.items():
+        if suite.startswith(args.filter) or args.filter.startswith(suite):
+            results.update({k: v for k, v in func(args).items() if k.startswith(args.filter)})
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+    else:
+        for name, value in results.items():
+            print(f'{name:<46} {value:10.3f} {UNITS.get(name, "ms"):<4}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'params': {k: v for k, v in vars(args).items() if k not in ('save', 'compare')},
+                       'results': results}, f, indent=2)
+
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
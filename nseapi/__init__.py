@@ -1,10 +1,33 @@
-from nseapi.requester import NseApi
 import nseapi.constant as _c
 from pathlib import Path as _Path
-import os as _os
 from datetime import datetime as _datetime
+from importlib import import_module as _import_module
 
 _c.HOME_DIR_PATH = _Path(__file__).parent
 _c.TODAY_DATE = _datetime.now()
 __version__ = '0.0.6'
-__all__ = ['NseApi']
\ No newline at end of file
+__all__ = ['NseApi', 'AsyncNseApi']
+
+# Loaded on first access (PEP 562), so import nseapi does not import pandas and requests
+_LAZY_ATTRIBUTES = {
+    'NseApi': 'nseapi.requester',
+    'AsyncNseApi': 'nseapi.async_requester',
+}
+_SUBMODULES = ('analytics', 'async_requester', 'cache', 'data_models', 'fake_server', 'generic', 'greeks',
+               'history', 'logger', 'metrics', 'multichain', 'parallel', 'recorder', 'requester', 'retry',
+               'scheduler', 'session', 'store', 'stream', 'synthetic', 'transport')
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(_import_module(_LAZY_ATTRIBUTES[name]), name)
+    elif name in _SUBMODULES:
+        value = _import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_SUBMODULES))
@@ -0,0 +1,150 @@
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+
+# Build up labels, from change in price and change in open interest
+LONG_BUILD_UP = 'Long Build Up'         # Price up, OI up
+SHORT_BUILD_UP = 'Short Build Up'       # Price down, OI up
+LONG_UNWINDING = 'Long Unwinding'       # Price down, OI down
+SHORT_COVERING = 'Short Covering'       # Price up, OI down
+BUILD_UP_LABELS = [LONG_BUILD_UP, SHORT_BUILD_UP, LONG_UNWINDING, SHORT_COVERING]
+
+SUMMARY_INDEX = ['Symbol', 'Time Stamp', 'Expiry Date']
+
+
+def _values(chain, column: str) -> np.ndarray:
+    """ Return column of chain as float64, missing values as 0 """
+    return np.nan_to_num(chain.column(column).astype(np.float64))
+
+
+def _stack(chains: List, column: str) -> np.ndarray:
+    """ Return column of every chain as one float64 array, missing values as 0 """
+    return np.concatenate([_values(chain, column) for chain in chains])
+
+
+def _segment_cumsum(values: np.ndarray, starts: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """ Return cumulative sum of values restarted at every group start """
+    total = np.cumsum(values)
+    return total - (total[starts] - values[starts])[group]
+
+
+def expiry_summary(chains: Iterable) -> pd.DataFrame:
+    """ Open interest, volume, put call ratios and max pain of every expiry of many OptionChains
+
+    All chains, like one poll cycle of every symbol or many snapshots of one symbol, are
+    stacked and computed together without looping over strikes or expiries.
+
+    Max pain is the strike at which option writers pay least if the underlying settles
+    there. Pain of every strike is computed from cumulative sums over strikes sorted
+    within each expiry, so it is linear in number of strikes.
+
+    Args:
+        chains (Iterable[OptionChain]): option chains of any symbols and times
+
+    Returns:
+        pd.DataFrame: indexed by Symbol, Time Stamp, Expiry Date with Call OI, Put OI,
+            Call Volume, Put Volume, OI PCR, Volume PCR and Max Pain columns
+    """
+    chains = list(chains)
+    columns = ['Call OI', 'Put OI', 'Call Volume', 'Put Volume', 'OI PCR', 'Volume PCR', 'Max Pain']
+    sizes = np.array([len(chain) for chain in chains], dtype=np.int64)
+    if not sizes.sum():
+        return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[], [], []], names=SUMMARY_INDEX))
+
+    chain_no = np.repeat(np.arange(len(chains)), sizes)
+    strike = np.concatenate([chain.column('Strike Price').astype(np.float64) for chain in chains])
+    expiry = np.concatenate([chain.column('Expiry Date') for chain in chains]).astype('datetime64[ns]')
+    symbol = np.concatenate([chain.column('Underlying') for chain in chains])
+    call_oi, put_oi = _stack(chains, 'Call Open Interest'), _stack(chains, 'Put Open Interest')
+    call_volume, put_volume = _stack(chains, 'Call Total Traded Volume'), _stack(chains, 'Put Total Traded Volume')
+
+    # Sort by chain, expiry, strike so every (chain, expiry) group is one run of sorted strikes
+    order = np.lexsort((strike, expiry.view(np.int64), chain_no))
+    chain_no, expiry, symbol, strike = chain_no[order], expiry[order], symbol[order], strike[order]
+    call_oi, put_oi = call_oi[order], put_oi[order]
+    call_volume, put_volume = call_volume[order], put_volume[order]
+
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (chain_no[1:] != chain_no[:-1]) | (expiry[1:] != expiry[:-1])
+    starts = np.flatnonzero(new_group)
+    group = np.cumsum(new_group) - 1
+    ends = np.append(starts[1:], len(order)) - 1
+
+    # Calls below settlement strike and puts above it expire in the money
+    call_cum = _segment_cumsum(call_oi, starts, group)
+    call_strike_cum = _segment_cumsum(call_oi * strike, starts, group)
+    put_cum = _segment_cumsum(put_oi, starts, group)
+    put_strike_cum = _segment_cumsum(put_oi * strike, starts, group)
+    put_above = put_cum[ends][group] - put_cum + put_oi
+    put_strike_above = put_strike_cum[ends][group] - put_strike_cum + put_oi * strike
+    pain = (strike * call_cum - call_strike_cum) + (put_strike_above - strike * put_above)
+
+    # Lowest pain of every group, first (lowest) strike on ties
+    lowest = np.lexsort((pain, group))[starts]
+
+    totals = {name: np.add.reduceat(values, starts) for name, values in
+              (('Call OI', call_oi), ('Put OI', put_oi), ('Call Volume', call_volume), ('Put Volume', put_volume))}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totals['OI PCR'] = np.where(totals['Call OI'] > 0, totals['Put OI'] / totals['Call OI'], np.nan)
+        totals['Volume PCR'] = np.where(totals['Call Volume'] > 0, totals['Put Volume'] / totals['Call Volume'], np.nan)
+    totals['Max Pain'] = strike[lowest]
+
+    time_stamps = np.array([chain.time_stamp for chain in chains], dtype='datetime64[ns]')
+    index = pd.MultiIndex.from_arrays([symbol[starts], time_stamps[chain_no[starts]], expiry[starts]],
+                                      names=SUMMARY_INDEX)
+    return pd.DataFrame(totals, index=index, columns=columns)
+
+
+def max_pain(chain) -> pd.Series:
+    """ Return max pain strike of every expiry of OptionChain, indexed by Expiry Date """
+    return expiry_summary([chain])['Max Pain'].droplevel([0, 1])
+
+
+def pcr(chain) -> pd.DataFrame:
+    """ Return open interest and volume put call ratio of every expiry of OptionChain """
+    return expiry_summary([chain])[['OI PCR', 'Volume PCR']].droplevel([0, 1])
+
+
+def _build_up_labels(price_change: np.ndarray, oi_change: np.ndarray) -> pd.Categorical:
+    codes = np.select([(price_change > 0) & (oi_change > 0),
+                       (price_change < 0) & (oi_change > 0),
+                       (price_change < 0) & (oi_change < 0),
+                       (price_change > 0) & (oi_change < 0)],
+                      [0, 1, 2, 3], -1)
+    return pd.Categorical.from_codes(codes, categories=BUILD_UP_LABELS)
+
+
+def build_up_many(chains: Iterable) -> List[pd.DataFrame]:
+    """ Classify build up of calls and puts of every row of many OptionChains
+
+    Rows are labelled from sign of P.Change and Change in Open Interest of each side,
+    rows without price or OI change get NaN.
+
+    Args:
+        chains (Iterable[OptionChain]): option chains of any symbols and times
+
+    Returns:
+        List[pd.DataFrame]: per chain, Strike Price, Expiry Date, Call Build Up and Put
+            Build Up columns with index of chain df
+    """
+    chains = list(chains)
+    if not chains:
+        return []
+    sizes = [len(chain) for chain in chains]
+    bounds = np.cumsum([0] + sizes)
+    labels = {side: _build_up_labels(_stack(chains, f'{side} P.Change'),
+                                     _stack(chains, f'{side} Change in Open Interest'))
+              for side in ('Call', 'Put')}
+
+    results = []
+    for chain, start, stop in zip(chains, bounds[:-1], bounds[1:]):
+        results.append(pd.DataFrame({'Strike Price': chain.column('Strike Price'),
+                                     'Expiry Date': chain.column('Expiry Date'),
+                                     'Call Build Up': labels['Call'][start:stop],
+                                     'Put Build Up': labels['Put'][start:stop]}, index=chain.df.index))
+    return results
+
+
+def build_up(chain) -> pd.DataFrame:
+    """ Classify build up of calls and puts of every row of OptionChain, see build_up_many """
+    return build_up_many([chain])[0]
@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from nseapi.requester import NseApi, is_index
+from nseapi.data_models import OptionChain
+from nseapi.stream import ChainDiff, ChainStream
+
+
+class AsyncNseApi:
+    """ asyncio front end of NseApi
+
+    All coroutines share one NseApi, so the main page cookie handshake is done once and
+    every request goes through the same cookie-warmed connection pool.
+    """
+
+    def __init__(self, api: NseApi = None, concurrency: int = NseApi.CONCURRENCY, **kwargs):
+        """ asyncio front end of NseApi
+
+        Args:
+            api (NseApi, optional): api to share. Defaults to None, which create new NseApi from kwargs.
+            concurrency (int, optional): max requests in flight. Defaults to NseApi.CONCURRENCY.
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self.api = api if api is not None else NseApi(**kwargs)
+        self.concurrency = concurrency
+        self.api.mount_adapters(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='AsyncNseApi')
+        self._semaphore = None
+
+    async def option_chain(self, symbol: str, index: Optional[bool] = None) -> Optional[OptionChain]:
+        """ Return OptionChain Data for symbol
+
+        Args:
+            symbol (str): symbol of stock or index
+            index (bool, optional): True if symbol is index. Defaults to None, which decide from symbol.
+
+        Returns:
+            [OptionChain]: None if symbol could not be fetched
+        """
+        if index is None:
+            index = is_index(symbol)
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            if not self.api.main_page_loaded:
+                await loop.run_in_executor(self._executor, self.api.ensure_init)
+            return await loop.run_in_executor(self._executor, self.api.option_chain, symbol, index)
+
+    async def option_chains(self, symbols: Iterable[str],
+                            index: Optional[bool] = None) -> AsyncIterator[Tuple[str, Optional[OptionChain]]]:
+        """ Fetch OptionChain of many symbols concurrently
+
+        Args:
+            symbols (Iterable[str]): symbols of stocks and/or indices
+            index (bool, optional): True if all symbols are indices, False if all are stocks.
+                Defaults to None, which decide per symbol.
+
+        Yields:
+            Tuple[str, OptionChain]: (symbol, OptionChain) in order of completion
+        """
+        async def fetch(symbol):
+            return symbol, await self.option_chain(symbol, index)
+
+        tasks = [asyncio.ensure_future(fetch(s.upper())) for s in symbols]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, symbols: Iterable[str], interval: float = 60, index: Optional[bool] = None,
+                     fields: List[str] = None, stream: ChainStream = None) -> AsyncIterator[ChainDiff]:
+        """ Poll symbols forever and yield changes of every new snapshot
+
+        Polls whose records timestamp has not moved are dropped before parsing.
+
+        Args:
+            symbols (Iterable[str]): symbols of stocks and/or indices
+            interval (float, optional): seconds between polls of a symbol. Defaults to 60.
+            index (bool, optional): True if all symbols are indices. Defaults to None, which decide per symbol.
+            fields (List[str], optional): fields compared for Call and Put. Defaults to stream.DIFF_FIELDS.
+            stream (ChainStream, optional): last snapshots to continue from. Defaults to None.
+
+        Yields:
+            ChainDiff: first snapshot of every symbol has all strikes marked New
+        """
+        symbols = [s.upper() for s in symbols]
+        stream = stream or ChainStream(fields)
+        loop = asyncio.get_running_loop()
+
+        def parse(symbol, symbol_index, res):
+            if res is None or not stream.is_new(symbol, res['records'].get('timestamp')):
+                return None
+            return stream.update(self.api.parse_option_chain(res, symbol, symbol_index), symbol)
+
+        async def poll(symbol):
+            symbol_index = is_index(symbol) if index is None else index
+            async with self._get_semaphore():
+                if not self.api.main_page_loaded:
+                    await loop.run_in_executor(self._executor, self.api.ensure_init)
+                res = await loop.run_in_executor(self._executor, self.api.option_chain_payload,
+                                                 symbol, symbol_index)
+            return await loop.run_in_executor(self._executor, parse, symbol, symbol_index, res)
+
+        while True:
+            started = loop.time()
+            for task in asyncio.as_completed([poll(s) for s in symbols]):
+                diff = await task
+                if diff is not None:
+                    yield diff
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+    def close(self):
+        """ Shutdown worker threads """
+        self._executor.shutdown(wait=False)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphore is created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
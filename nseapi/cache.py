@@ -0,0 +1,119 @@
+import threading
+import time as t
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = ('payload', 'size', 'stored_at', 'time_stamp', 'parsed')
+
+    def __init__(self, payload, size: int, stored_at: float):
+        self.payload = payload
+        self.size = size
+        self.stored_at = stored_at
+        self.time_stamp = None
+        self.parsed = None
+
+
+class ResponseCache:
+    """ Thread safe cache of decoded NseApi responses with TTL and LRU eviction
+
+    Entries are keyed by url + params. Besides the decoded payload, an entry can hold the
+    object parsed from it (like OptionChain) together with the payload records timestamp,
+    so a refetch which brings back the same timestamp reuses the parsed object.
+    Size limit counts response body bytes, parsed objects are not counted.
+
+    Payloads and parsed objects are handed out as they are stored, to every caller, so
+    they must be treated as read-only. NseApi gives out copies of cached OptionChains.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_bytes: int = 64 * 1024 * 1024):
+        """ Cache of decoded responses
+
+        Args:
+            ttl (float, optional): seconds a payload is served from cache. Defaults to 30.0.
+            max_bytes (int, optional): max total response bytes held. Defaults to 64 MiB.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.parsed_hits = 0
+        self.parsed_misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(url: str, params: Optional[dict] = None) -> Tuple:
+        """ Return cache key of request """
+        return (url,) + tuple(sorted((params or {}).items()))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """ Return payload of key if it is younger than ttl else None """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or t.monotonic() - entry.stored_at > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.payload
+
+    def put(self, key: Tuple, payload: Any, size: int):
+        """ Store payload of key, parsed object of previous payload is kept for get_parsed """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            new_entry = _Entry(payload, size, t.monotonic())
+            if entry is not None:
+                self.size -= entry.size
+                new_entry.time_stamp, new_entry.parsed = entry.time_stamp, entry.parsed
+            if size > self.max_bytes:
+                return
+            self._entries[key] = new_entry
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def get_parsed(self, key: Tuple, time_stamp: Any) -> Optional[Any]:
+        """ Return object parsed from payload of key with same records timestamp, else None """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.parsed is None or time_stamp is None or entry.time_stamp != time_stamp:
+                self.parsed_misses += 1
+                return None
+            self.parsed_hits += 1
+            return entry.parsed
+
+    def put_parsed(self, key: Tuple, time_stamp: Any, parsed: Any):
+        """ Store object parsed from payload of key with its records timestamp """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.time_stamp = time_stamp
+                entry.parsed = parsed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    @property
+    def stats(self) -> dict:
+        """ Return hit/miss counters and size """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'parsed_hits': self.parsed_hits,
+                'parsed_misses': self.parsed_misses,
+                'evictions': self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -6,6 +6,11 @@ URL_EQUITIES = "https://www.nseindia.com/api/option-chain-equities"
 URL_MAIN = "https://www.nseindia.com"
 URL_STOCK_LIST = "https://www.nseindia.com/api/equity-stockIndices"
 URL_BANKNIFTY_STOCKS = "https://www1.nseindia.com/live_market/dynaContent/live_watch/stock_watch/bankNiftyStockWatch.json"
+
+# request_name of NseApi._get for api responses, kept in recordings
+REQUEST_OPTION_CHAIN = 'Open Interest'
+REQUEST_STOCK_LIST = 'Stock List'
+
 HEADER = {
     'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.101 Safari/537.36",
     "Referer" : "https://www1.nseindia.com/products/content/equities/equities/archieve_eq.htm"
@@ -21,6 +26,9 @@ NAME_TO_INDICES = {
     'NIFTY BANK': 'BANKNIFTY'
 }
 
+# Symbols served by URL_INDICES, everything else goes to URL_EQUITIES
+OPTION_INDICES = {'NIFTY', 'BANKNIFTY', 'FINNIFTY', 'MIDCPNIFTY'}
+
 BASECOLUMNS = ['Strike Price', 'Expiry Date', 'Underlying Value']
 RENAME_COLUMNS = {
     'strikePrice': 'Strike Price',
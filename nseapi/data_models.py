@@ -1,8 +1,12 @@
 from datetime import datetime
-from typing import Union
+from functools import lru_cache
+from operator import itemgetter
+from typing import Optional, Tuple, Union
 import pandas as pd
 import numpy as np
 import nseapi.constant as c
+import nseapi.metrics as m
+from nseapi.greeks import chain_greeks
 pd.options.mode.chained_assignment = None  # default='warn'
 
 
@@ -25,27 +29,27 @@ def rename_columns_old(columns):
     return columns_new
 
 
-def rename_columns(df):
-    """ Return dictonary with old_name: new_name """
-    # columns = {k: v for k, v in c.RENAME_COLUMNS.items() if k in df.columns}
-    
-    columns = {}
+@lru_cache(maxsize=None)
+def rename_column(column: str) -> str:
+    """ Return new name of column """
+    column_parts = column.split(' ')
+    new_column = column
+    # Change position of Call or Put to First
+    if column_parts[-1] in ['Call', 'Put']:
+        new_column_parts = [column_parts[-1]]
+        new_column_parts.extend(column_parts[:-1])
+        new_column = ' '.join(new_column_parts)
 
-    for column in df.columns:
-        column_parts = column.split(' ')
-        new_column = column
-        # Change position of Call or Put to First
-        if column_parts[-1] in ['Call', 'Put']:
-            new_column_parts = [column_parts[-1]]
-            new_column_parts.extend(column_parts[:-1])
-            new_column = ' '.join(new_column_parts)
+    # Change as per constant RENAME COLUMNS
+    if new_column in c.RENAME_COLUMNS.keys():
+        new_column = c.RENAME_COLUMNS[new_column]
 
-        # Change as per constant RENAME COLUMNS
-        if new_column in c.RENAME_COLUMNS.keys():
-            new_column = c.RENAME_COLUMNS[new_column]
+    return new_column
 
-        columns[column] = new_column
 
+def rename_columns(df):
+    """ Return dictonary with old_name: new_name """
+    columns = {column: rename_column(column) for column in df.columns}
     df.rename(columns=columns, inplace=True)
 
 
@@ -72,7 +76,9 @@ def normalize_oi_data(raw_data: dict):
         'PE': records_pe
     }
 
-    # parsing filtered_data
+    # parsing filtered_data, dropped by decoders of NseApi
+    if 'filtered' not in raw_data:
+        return raw_data
     for d in raw_data['filtered']['data']:
         try:
             filtered_ce.append(d['CE'])
@@ -106,43 +112,547 @@ def data_to_dataframe(data: dict):
     rename_columns(df)
     return df
 
-class OptionChain:
-    """ Hold Option Chain Data for symbol """
 
-    def __init__(self, data):
+# Shared by every snapshot of every symbol, NSE only has a handful of expiry dates
+_EXPIRY_DATES_CACHE = {}
+
+
+def parse_expiry_dates(values) -> np.ndarray:
+    """ Return datetime64[ns] array of NSE expiry date strings like 25-Feb-2021
+
+    Parsed dates are cached, so each distinct string is parsed once per process.
+    """
+    cache = _EXPIRY_DATES_CACHE
+    try:
+        return np.array([cache[v] for v in values], dtype='datetime64[ns]')
+    except KeyError:
+        pass
+
+    for v in set(values):
+        if v not in cache:
+            try:
+                cache[v] = np.datetime64(datetime.strptime(v, '%d-%b-%Y'), 'ns')
+            except (TypeError, ValueError):
+                cache[v] = pd.to_datetime(v, dayfirst=True).to_datetime64()
+    return np.array([cache[v] for v in values], dtype='datetime64[ns]')
+
+
+def _side_fields(rows: list, drop: tuple) -> Tuple[list, bool]:
+    """ Return union of keys of rows in order of first appearance, same as pandas.DataFrame(rows)
+    and whether every row has the same keys """
+    first_keys = rows[0].keys()
+    fields = list(first_keys)
+    seen = set(fields)
+    uniform = True
+    for row in rows:
+        if row.keys() != first_keys:
+            uniform = False
+            for k in row:
+                if k not in seen:
+                    seen.add(k)
+                    fields.append(k)
+    return [f for f in fields if f not in drop], uniform
+
+
+def _side_values(rows: list, fields: list, uniform: bool, key_fields: list) -> dict:
+    """ Return field: values of rows, missing values are NaN like pandas.DataFrame(rows) """
+    if uniform:
+        # Transpose with itemgetter + zip, both run in C
+        return dict(zip(fields, zip(*map(itemgetter(*fields), rows))))
+
+    values = {}
+    for field in fields:
+        if field in key_fields:
+            values[field] = [row[field] for row in rows]
+        else:
+            values[field] = [row.get(field, np.nan) for row in rows]
+    return values
+
+
+def _to_array(name: str, values) -> Optional[np.ndarray]:
+    if name in ('Expiry Date', 'Underlying', 'Identifier'):
+        return np.array(values, dtype=object)
+
+    array = np.array(values)
+    if array.dtype.kind not in 'if':
+        # Unexpected value like None or string, let pandas decide dtype
+        return None
+    return array
+
+
+def records_to_columns(records: list) -> Optional[dict]:
+    """ Parse records['data'] of option chain payload into numpy columns
+
+    Single pass replacement of normalize_oi_data + data_to_dataframe. Call and Put of each
+    (strike, expiry) are paired with a hash lookup instead of pandas.merge, and column
+    names come from a cached rename map.
+
+    Args:
+        records (list): raw records['data'] of option chain payload
+
+    Returns:
+        [dict]: column name to numpy array in order of OptionChain.df columns.
+            None if data is not in expected shape.
+    """
+    ce_rows = []
+    pe_rows = []
+    for d in records:
+        ce = d.get('CE')
+        if ce is not None:
+            ce_rows.append(ce)
+        pe = d.get('PE')
+        if pe is not None:
+            pe_rows.append(pe)
+
+    if not ce_rows or not pe_rows:
+        return None
+
+    ce_fields, ce_uniform = _side_fields(ce_rows, ('bidQty', 'bidprice', 'askQty', 'askPrice'))
+    pe_fields, pe_uniform = _side_fields(pe_rows, ('underlying', 'bidQty', 'bidprice', 'askQty', 'askPrice'))
+    key_fields = [f for f in ce_fields if rename_column(f) in c.BASECOLUMNS]
+    if len(key_fields) != len(c.BASECOLUMNS) or \
+            sorted(rename_column(f) for f in pe_fields if f in key_fields) != sorted(c.BASECOLUMNS):
+        return None
+
+    try:
+        ce_values = _side_values(ce_rows, ce_fields, ce_uniform, key_fields)
+        pe_values = _side_values(pe_rows, pe_fields, pe_uniform, key_fields)
+    except KeyError:
+        return None
+
+    # Pair CE with PE on key, same as inner merge keeping order of CE
+    pe_positions = {key: i for i, key in enumerate(zip(*(pe_values[f] for f in key_fields)))}
+    ce_keys = list(zip(*(ce_values[f] for f in key_fields)))
+    if len(pe_positions) != len(pe_rows) or len(set(ce_keys)) != len(ce_keys):
+        return None
+
+    ce_index = []
+    pe_index = []
+    for i, key in enumerate(ce_keys):
+        j = pe_positions.get(key)
+        if j is not None:
+            ce_index.append(i)
+            pe_index.append(j)
+    if not ce_index:
+        return None
+    ce_index = np.array(ce_index, dtype=np.intp)
+    pe_index = np.array(pe_index, dtype=np.intp)
+
+    ce_names = {rename_column(f) for f in ce_fields}
+    pe_names = {rename_column(f) for f in pe_fields}
+    both = (ce_names & pe_names) - set(c.BASECOLUMNS)
+
+    columns = {}
+    for values, fields, side_index, suffix in ((ce_values, ce_fields, ce_index, ' Call'),
+                                               (pe_values, pe_fields, pe_index, ' Put')):
+        for field in fields:
+            name = rename_column(field)
+            array = _to_array(name, values[field])
+            if name in c.BASECOLUMNS:
+                if suffix == ' Put':
+                    continue
+            elif name in both:
+                name = name + suffix
+            name = rename_column(name)
+
+            if array is None:
+                return None
+            columns[name] = array[side_index]
+
+    columns['Expiry Date'] = parse_expiry_dates(columns['Expiry Date'])
+    return columns
+
+
+def records_to_dataframe(records: list, compact: bool = False, columns: list = None) -> pd.DataFrame:
+    """ Return OptionChain DataFrame of records['data']
+
+    Same DataFrame as data_to_dataframe(normalize_oi_data(...)['records']['data']), falls back
+    to that path if records are not in expected shape.
+
+    Args:
+        records (list): raw records['data'] of option chain payload
+        compact (bool, optional): return compact_dataframe. Defaults to False.
+        columns (list, optional): columns to keep besides REQUIRED_COLUMNS. Defaults to None, which keep all.
+    """
+    sink = m.sink
+    with sink.span('nseapi_stage_seconds', stage='columns'):
+        arrays = records_to_columns(records)
+    if arrays is None:
+        with sink.span('nseapi_stage_seconds', stage='normalize'):
+            data = normalize_oi_data({'records': {'data': records}, 'filtered': {'data': []}})
+        with sink.span('nseapi_stage_seconds', stage='frame'):
+            df = data_to_dataframe(data['records']['data'])
+        if columns is not None:
+            df = df[_keep_columns(df.columns, columns)]
+    else:
+        if columns is not None:
+            arrays = {name: arrays[name] for name in _keep_columns(arrays, columns)}
+        with sink.span('nseapi_stage_seconds', stage='frame'):
+            df = pd.DataFrame(arrays)
+    if compact:
+        with sink.span('nseapi_stage_seconds', stage='compact'):
+            df = compact_dataframe(df)
+    return df
+
+
+# Expiry groups of ExpiryCalendar, accepted as expiries of filter_records
+EXPIRY_GROUPS = ('current', 'near', 'next', 'far', 'monthly', 'weekly')
+
+
+def _wanted_expiries(dates: np.ndarray, expiries) -> np.ndarray:
+    """ Return datetime64[ns] dates among sorted unique dates selected by expiries """
+    if isinstance(expiries, str) and expiries in EXPIRY_GROUPS:
+        return getattr(expiry_calendar(dates), expiries)
+    if isinstance(expiries, int):
+        return dates[:expiries]
+    if not isinstance(expiries, (list, tuple)):
+        expiries = [expiries]
+    expiries = [datetime.strptime(e, '%d-%m-%y') if isinstance(e, str) else e for e in expiries]
+    return np.array(expiries, dtype='datetime64[ns]')
+
+
+def filter_records(records: list, expiries=None, strikes_around_atm: int = None,
+                   underlying_value: float = None) -> list:
+    """ Return records of wanted expiries and strikes, so nothing else is parsed
+
+    Same rows as near_expriry.trim(strikes_around_atm) and friends of the whole chain. Records
+    without both Call and Put are dropped, like the merge of Call and Put does.
+
+    Args:
+        records (list): raw records['data'] of option chain payload
+        expiries (optional): expiry group like near or monthly, number of nearest expiries, or
+            expiry dates as datetime or dd-mm-yy string. Defaults to None, which keep all.
+        strikes_around_atm (int, optional): strikes kept below and above ATM strike. Defaults to None,
+            which keep all.
+        underlying_value (float, optional): records['underlyingValue'], ATM strike is strike nearest
+            to it. Defaults to None, which use underlyingValue of records.
+
+    Raises:
+        ValueError: if no record has wanted expiries
+    """
+    records = [d for d in records if 'CE' in d and 'PE' in d]
+    if not records:
+        return records
+
+    if expiries is not None:
+        strings = list({d['expiryDate'] for d in records})
+        dates = parse_expiry_dates(strings)
+        wanted = np.isin(dates, _wanted_expiries(np.unique(dates), expiries))
+        wanted = {string for string, keep in zip(strings, wanted) if keep}
+        records = [d for d in records if d['expiryDate'] in wanted]
+        if not records:
+            raise ValueError('Expiry Date not found')
+
+    if strikes_around_atm is not None:
+        if underlying_value is None:
+            underlying_value = records[0]['CE']['underlyingValue']
+        strikes = np.unique(np.array([d['strikePrice'] for d in records]))
+        middle = np.searchsorted(strikes, StrikeIndex(strikes).nearest(underlying_value))
+        low = strikes[max(middle - strikes_around_atm, 0)]
+        high = strikes[min(middle + strikes_around_atm, len(strikes) - 1)]
+        records = [d for d in records if low <= d['strikePrice'] <= high]
+    return records
+
+
+# Columns OptionChain needs, kept by column projection
+REQUIRED_COLUMNS = c.BASECOLUMNS + ['Underlying']
+IDENTIFIER_SIDES = {'Call Identifier': 'CE', 'Put Identifier': 'PE'}
+COMPACT_DECIMALS = 4        # Max decimals of float columns stored as float32
+
+
+def _keep_columns(names, columns: list) -> list:
+    """ Return names which are in columns or REQUIRED_COLUMNS, in order of names """
+    keep = set(columns).union(REQUIRED_COLUMNS)
+    return [name for name in names if name in keep]
+
+
+def _float32_decimals(values: np.ndarray) -> Optional[int]:
+    """ Return decimals to which float32 copy of values is rounded to get values back, None if
+    float32 loses precision """
+    finite = values[np.isfinite(values)]
+    small = finite.astype(np.float32).astype(np.float64)
+    for decimals in range(COMPACT_DECIMALS + 1):
+        if np.array_equal(np.round(finite, decimals), finite):
+            return decimals if np.array_equal(np.round(small, decimals), finite) else None
+    return None
+
+
+def derive_identifiers(instrument: str, symbols, expiry_dates, strikes, side: str) -> np.ndarray:
+    """ Return NSE contract identifiers like OPTIDXNIFTY25-02-2021CE14000.00 """
+    # Format every distinct expiry date once
+    unique_dates, positions = np.unique(np.asarray(expiry_dates, dtype='datetime64[ns]'), return_inverse=True)
+    dates = np.array(pd.DatetimeIndex(unique_dates).strftime('%d-%m-%Y'), dtype=object)[positions]
+    return np.array([f'{instrument}{symbol}{date}{side}{strike:.2f}'
+                     for symbol, date, strike in zip(symbols, dates, strikes)], dtype=object)
+
+
+def _identifier_instrument(df: pd.DataFrame, name: str) -> Optional[str]:
+    """ Return instrument prefix if identifiers of column name can be derived from other columns """
+    values = df[name].to_numpy()
+    if not len(values) or not isinstance(values[0], str) or \
+            not all(col in df for col in ('Underlying', 'Expiry Date', 'Strike Price')):
+        return None
+    instrument = values[0][:6]
+    derived = derive_identifiers(instrument, df['Underlying'].to_numpy(), df['Expiry Date'],
+                                 df['Strike Price'].to_numpy(), IDENTIFIER_SIDES[name])
+    return instrument if np.array_equal(derived, values) else None
+
+
+def compact_dataframe(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """ Return copy of OptionChain DataFrame which takes less memory
+
+    - int64 columns become int32 when values fit
+    - float64 columns become float32 when values have at most COMPACT_DECIMALS decimals
+      and are restored exactly by rounding
+    - Underlying becomes categorical
+    - Call/Put Identifier columns are dropped when they can be derived from symbol,
+      expiry date and strike price
+
+    What was changed is kept in df.attrs['compact'], expand_dataframe restores the
+    original DataFrame.
+
+    Args:
+        df (pd.DataFrame): OptionChain DataFrame
+        columns (list, optional): columns to keep besides REQUIRED_COLUMNS. Defaults to None, which keep all.
+    """
+    if 'compact' in df.attrs:
+        return df if columns is None else df[_keep_columns(df.columns, columns)]
+    if columns is not None:
+        df = df[_keep_columns(df.columns, columns)]
+
+    info = {'columns': list(df.columns), 'dtypes': {}, 'decimals': {}, 'identifiers': {}}
+    data = {}
+    int32 = np.iinfo(np.int32)
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if name in IDENTIFIER_SIDES:
+            instrument = _identifier_instrument(df, name)
+            if instrument is not None:
+                info['identifiers'][name] = instrument
+                continue
+        elif name == 'Underlying':
+            data[name] = pd.Categorical(values)
+            info['dtypes'][name] = str(values.dtype)
+            continue
+        elif values.dtype.kind == 'i' and len(values) and int32.min <= values.min() and values.max() <= int32.max:
+            data[name] = values.astype(np.int32)
+            info['dtypes'][name] = str(values.dtype)
+            continue
+        elif values.dtype == np.float64:
+            decimals = _float32_decimals(values)
+            if decimals is not None:
+                data[name] = values.astype(np.float32)
+                info['dtypes'][name] = str(values.dtype)
+                info['decimals'][name] = decimals
+                continue
+        data[name] = values
+
+    compact = pd.DataFrame(data, index=df.index)
+    compact.attrs['compact'] = info
+    return compact
+
+
+def expand_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """ Return values of column of compact_dataframe with original dtype, derived if it was dropped """
+    info = df.attrs.get('compact')
+    if info is None:
+        return df[name].to_numpy()
+    if name in info['identifiers']:
+        return derive_identifiers(info['identifiers'][name], df['Underlying'].to_numpy(),
+                                  df['Expiry Date'], df['Strike Price'].to_numpy(), IDENTIFIER_SIDES[name])
+    values = df[name].to_numpy()
+    if name in info['decimals']:
+        return np.round(values.astype(np.float64), info['decimals'][name])
+    if name in info['dtypes']:
+        return values.astype(info['dtypes'][name])
+    return values
+
+
+def expand_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """ Return DataFrame of compact_dataframe with original dtypes and identifier columns """
+    info = df.attrs.get('compact')
+    if info is None:
+        return df
+
+    names = info['columns'] + [name for name in df.columns if name not in info['columns']]
+    data = {name: expand_column(df, name) for name in names if name in df or name in info['identifiers']}
+    return pd.DataFrame(data, index=df.index)
+
+
+def parse_time_stamp(value: Union[datetime, str]) -> datetime:
+    """ Return datetime of records timestamp like 19-Feb-2021 15:30:00 """
+    if isinstance(value, str):
+        return datetime.strptime(value, '%d-%b-%Y %H:%M:%S')
+    return value
+
+
+class OptionChain:
+    """ Hold Option Chain Data for symbol
+
+    Filters like near_expriry return views which share data of parent OptionChain, the
+    filtered DataFrame is only built when df of the view is used.
+    """
+
+    def __init__(self, data, compact: bool = False, columns: list = None, expiries=None,
+                 strikes_around_atm: int = None):
+        """ Option Chain Data for symbol
+
+        Args:
+            data: option chain payload, DataFrame or OptionChain
+            compact (bool, optional): hold df as compact_dataframe. Defaults to False.
+            columns (list, optional): columns to keep besides REQUIRED_COLUMNS. Defaults to None, which keep all.
+            expiries (optional): only parse these expiries of payload, see filter_records. Defaults to None.
+            strikes_around_atm (int, optional): only parse this many strikes below and above ATM strike
+                of payload, see filter_records. Defaults to None.
+        """
         self.time_stamp = None
-        self.expiry_dates = None
+        self._df = None
+        self._source = None         # (DataFrame, row positions) of view
+        self._expiry_dates = None
+        self._columns = {}          # column name: numpy values
+        self._strikes = None        # StrikeIndex
+        self._scalars = {}          # underlying value, symbol, middle strike
+        if (expiries is not None or strikes_around_atm is not None) and \
+                isinstance(data, (OptionChain, pd.DataFrame)):
+            raise ValueError('expiries and strikes_around_atm only filter option chain payloads')
         if isinstance(data, OptionChain):
             self.df = data.df
             self.time_stamp = data.time_stamp
+            if compact or columns is not None:
+                self.df = compact_dataframe(self.df, columns) if compact else self.df[
+                    _keep_columns(self.df.columns, columns)]
         else:
-            self._prepare_data(data)
+            self._prepare_data(data, compact, columns, expiries, strikes_around_atm)
 
-    def _prepare_data(self, data):
+    def _prepare_data(self, data, compact: bool = False, columns: list = None, expiries=None,
+                      strikes_around_atm: int = None):
         if data is None:
             raise ValueError('data is None')
         if isinstance(data, pd.DataFrame):
-            self.df = pd.DataFrame(data)
+            df = pd.DataFrame(data)
+            # Keep compact metadata, DataFrame() drops attrs
+            df.attrs.update(data.attrs)
+            if compact:
+                df = compact_dataframe(df, columns)
+            elif columns is not None:
+                df = df[_keep_columns(df.columns, columns)]
+            self.df = df
         else:
-            data = normalize_oi_data(data)
             try:
                 self.time_stamp = data['records']['timestamp']
             except KeyError:
                 print('timestamp not in keys')
-            self.df = data_to_dataframe(data['records']['data'])
-        self.expiry_dates = ExpiryDates(self.df['Expiry Date'])
+            with m.sink.span('nseapi_stage_seconds', stage='option_chain'):
+                records = data['records']['data']
+                if expiries is not None or strikes_around_atm is not None:
+                    with m.sink.span('nseapi_stage_seconds', stage='filter'):
+                        records = filter_records(records, expiries, strikes_around_atm,
+                                                 data['records'].get('underlyingValue'))
+                self.df = records_to_dataframe(records, compact, columns)
 
-        if isinstance(self.time_stamp, str):
-            self.time_stamp = datetime.strptime(self.time_stamp, '%d-%b-%Y %H:%M:%S')
+        self.time_stamp = parse_time_stamp(self.time_stamp)
 
     @property
-    def middle_strike(self) -> Union[np.int64, np.float64, np.float32, np.int, np.float]:
-        df = self.df.iloc[(self.df['Strike Price'] - self.underlying_value).abs().argsort()[:1]]
-        df = df['Strike Price']
-        if len(df.unique()) > 1:
-            raise ValueError('More then one strike found')
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            source, rows = self._source
+            self._df = source.iloc[rows]
+            self._source = None
+        return self._df
+
+    @df.setter
+    def df(self, value: pd.DataFrame):
+        self._df = value
+        self._source = None
+        self._invalidate()
+
+    @property
+    def expiry_dates(self) -> 'ExpiryDates':
+        if self._expiry_dates is None:
+            with m.sink.span('nseapi_stage_seconds', stage='expiry_dates'):
+                self._expiry_dates = ExpiryDates(self.column('Expiry Date'))
+        return self._expiry_dates
+
+    @expiry_dates.setter
+    def expiry_dates(self, value: 'ExpiryDates'):
+        self._expiry_dates = value
+
+    def column(self, name: str) -> np.ndarray:
+        """ Return values of column with original dtype, expanded if chain is compact
+
+        Identifier columns of compact chains, like Underlying, are derived. Nothing else of a
+        view is built, and values are cached, so treat the array as read only.
+        """
+        values = self._columns.get(name)
+        if values is None:
+            if self._df is not None:
+                values = expand_column(self._df, name)
+            else:
+                source, rows = self._source
+                values = expand_column(source, name)[rows]
+            self._columns[name] = values
+        return values
+
+    def _select(self, mask: np.ndarray) -> 'OptionChain':
+        """ Return view of rows where mask is True """
+        return self._take(np.flatnonzero(mask))
+
+    def _take(self, rows: np.ndarray) -> 'OptionChain':
+        """ Return view of rows at positions """
+        view = self.__class__.__new__(self.__class__)
+        view.time_stamp = self.time_stamp
+        view._df = None
+        view._expiry_dates = None
+        view._columns = {}
+        view._strikes = None
+        view._scalars = {}
+        if self._df is not None:
+            view._source = (self._df, rows)
         else:
-            return df.values[0]
+            source, parent_rows = self._source
+            view._source = (source, parent_rows[rows])
+        return view
+
+    def copy(self, deep: bool = False) -> 'OptionChain':
+        """ Return chain with its own DataFrame
+
+        Setting columns or df of the copy leaves this chain unchanged. Unless deep, column
+        data is shared, so values changed in place, like with df.loc, change both.
+        """
+        chain = self.__class__.__new__(self.__class__)
+        chain.time_stamp = self.time_stamp
+        chain._df = self.df.copy(deep=deep)
+        chain._source = None
+        chain._expiry_dates = self._expiry_dates
+        chain._columns = {} if deep else dict(self._columns)
+        chain._strikes = self._strikes
+        chain._scalars = dict(self._scalars)
+        return chain
+
+    def _select_expiry(self, expiry_dates: 'ExpiryDates') -> 'OptionChain':
+        view = self._select(np.isin(self.column('Expiry Date'), expiry_dates.values))
+        view._expiry_dates = expiry_dates
+        return view
+
+    def _invalidate(self):
+        """ Drop values cached from df """
+        self._expiry_dates = None
+        self._columns = {}
+        self._strikes = None
+        self._scalars = {}
+
+    @property
+    def strike_index(self) -> 'StrikeIndex':
+        if self._strikes is None:
+            self._strikes = StrikeIndex(self.column('Strike Price'))
+        return self._strikes
+
+    @property
+    def middle_strike(self) -> Union[np.int64, np.float64, np.float32, np.int, np.float]:
+        """ Return strike price nearest to underlying value, lower one if two are equally near """
+        if 'middle_strike' not in self._scalars:
+            self._scalars['middle_strike'] = self.strike_index.nearest(self.underlying_value)
+        return self._scalars['middle_strike']
 
     @property
     def strike_prices(self) -> list:
@@ -150,8 +660,8 @@ class OptionChain:
 
         Returns:
             list: Sorted list of strike prices
-        """        
-        return sorted(list(self.df['Strike Price'].unique()))
+        """
+        return list(self.strike_index.strikes)
 
     @property
     def underlying_value(self) -> Union[float, int]:
@@ -163,10 +673,12 @@ class OptionChain:
         Returns:
             [float or int]:
         """
-        ticker = list(set(self.df['Underlying Value']))
-        if len(ticker) > 1:
-            raise ValueError("More than one symbol found")
-        return ticker[0]
+        if 'underlying_value' not in self._scalars:
+            ticker = pd.unique(self.column('Underlying Value'))
+            if len(ticker) > 1:
+                raise ValueError("More than one symbol found")
+            self._scalars['underlying_value'] = ticker[0]
+        return self._scalars['underlying_value']
 
     @property
     def time_string(self) -> str:
@@ -188,67 +700,52 @@ class OptionChain:
         Returns:
             [str]: like nifty, reliance
         """
-        ticker = list(set(self.df['Underlying']))
-        if len(ticker) > 1:
-            raise ValueError("More than one symbol found")
-        return ticker[0]
+        if 'symbol' not in self._scalars:
+            ticker = pd.unique(self.column('Underlying'))
+            if len(ticker) > 1:
+                raise ValueError("More than one symbol found")
+            self._scalars['symbol'] = ticker[0]
+        return self._scalars['symbol']
 
     @property
     def near_expriry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.near_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.near_expiry)
 
     @property
     def next_expiry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.next_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.next_expiry)
 
     @property
     def far_expiry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.far_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.far_expiry)
 
     @property
     def monthly_expiry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.monthly_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.monthly_expiry)
 
     @property
     def weekly_expiry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.weekly_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.weekly_expiry)
 
     @property
     def current_expiry(self) -> 'OptionChain':
-        df = self.df.loc[self.df['Expiry Date'].isin(self.expiry_dates.current_expiry.values)]
-        df = self.__class__(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select_expiry(self.expiry_dates.current_expiry)
 
     def get_by_strike(self, price, condition: str = 'equal'):
         """ Get data above or below or equal to price
         :param price: (float, int): price from which to perform action
         :param condition: (str): which condition to perform. (above, below or equal are valid)
         """
-        df = None
+        index = self.strike_index
         if condition.lower() == 'equal':
-            df = OptionChain(self.df[self.df['Strike Price'] == price])
+            rows = index.rows(price, price)
         elif condition.lower() == 'above':
-            df = OptionChain(self.df[self.df['Strike Price'] > price])
+            rows = index.rows(price, None, closed=False)
         elif condition.lower() == 'below':
-            df = OptionChain(self.df[self.df['Strike Price'] < price])
-        df.time_stamp = self.time_stamp
-        return df
+            rows = index.rows(None, price, closed=False)
+        else:
+            raise ValueError('condition must be above, below or equal')
+        return self._take(rows)
 
     def get_by_expiry(self, expiry_date: Union[datetime, str, list]):
         """ To get only data of selected expiry date
@@ -256,55 +753,57 @@ class OptionChain:
         :param expiry_date: (datetime, str, list) get all data of data
         :return OpenInterest
         """
-        df = None
         if isinstance(expiry_date, str):
-            expiry_date = datetime.strptime(expiry_date, '%d-%m-%y')
-            df = self.df[self.df['Expiry Date'] == expiry_date]
+            expiry_date = [datetime.strptime(expiry_date, '%d-%m-%y')]
         elif isinstance(expiry_date, list):
             expiry_date = [datetime.strptime(e, '%d-%m-%y') for e in expiry_date if isinstance(e, str)]
-            df = self.df.loc[self.df['Expiry Date'].isin(expiry_date)]
         else:
             if not isinstance(expiry_date, datetime) and not isinstance(expiry_date, list):
                 raise TypeError('expiry_date must be datetime')
 
-        if len(df) < 1:
+        mask = np.isin(self.column('Expiry Date'), np.array(expiry_date, dtype='datetime64[ns]'))
+        if not mask.any():
             raise ValueError('Expiry Date not found')
 
-        df = OptionChain(df)
-        df.time_stamp = self.time_stamp
-        return df
+        return self._select(mask)
 
     def trim(self, strikes: int = 5):
         """ Will trim data to above and below till strikes from underling value and also inclue middle_strike
         :param strikes: int: default 5
         :return OpenInerest
         """
-        # Get All Strike Price above middle strike price
-        strikes_prices = pd.Series(self.strike_prices)
-        above_strikes = strikes_prices.loc[strikes_prices > self.middle_strike]
-        above_strikes.sort_values(inplace=True)
-        above_strikes = above_strikes.iloc[:strikes]
-
-        # Get all strike price below middle strike price
-        below_strikes = strikes_prices.loc[strikes_prices < self.middle_strike]
-        below_strikes.sort_values(inplace=True, ascending=False)
-        below_strikes = below_strikes.iloc[:strikes]
-
-
-        strikes_prices = pd.concat([above_strikes, below_strikes], ignore_index=True)
-        # Add middle strike price to series
-        strikes_prices = strikes_prices.append(pd.Series([self.middle_strike]), ignore_index=True, verify_integrity=True)
-        strikes_prices.sort_values(inplace=True)
-        strikes_prices.reset_index(drop=True, inplace=True)
-
-        df = self.df.loc[self.df['Strike Price'].isin(strikes_prices.values)]
-        # df = self.df.iloc[(self.df['Strike Price'] - self.underlying_value).abs().argsort()[:strikes * 2]]
-        df = OptionChain(df)
-        df.time_stamp = self.time_stamp
-        return df
+        index = self.strike_index
+        middle = np.searchsorted(index.strikes, self.middle_strike)
+        low = index.strikes[max(middle - strikes, 0)]
+        high = index.strikes[min(middle + strikes, len(index.strikes) - 1)]
+        return self._take(index.rows(low, high))
+
+    def greeks(self, rate: float = 0.07, div_yield: float = 0.0) -> pd.DataFrame:
+        """ Return implied volatility and Greeks of every row
+
+        IV is solved from Call/Put Last Price, time to expiry is measured from time_stamp.
+
+        Args:
+            rate (float, optional): risk free rate as continuous fraction. Defaults to 0.07.
+            div_yield (float, optional): dividend yield as continuous fraction. Defaults to 0.0.
+
+        Returns:
+            pd.DataFrame: Strike Price, Expiry Date, Time To Expiry and Call/Put IV, Delta,
+                Gamma, Vega, Theta columns with index of df
+        """
+        return chain_greeks([self], rate, div_yield)[0]
+
+    @property
+    def compact(self) -> bool:
+        """ True if df is compact_dataframe """
+        return 'compact' in self.df.attrs
+
+    def memory_usage(self) -> pd.Series:
+        """ Return bytes used by every column of df, including index, strings counted deeply """
+        return self.df.memory_usage(deep=True)
 
     def to_dict(self):
-        return self.df.to_dict(orient='records')
+        return expand_dataframe(self.df).to_dict(orient='records')
 
     def __str__(self):
         return self.df.__str__()
@@ -316,12 +815,20 @@ class OptionChain:
         return self.df.__iter__()
 
     def __getitem__(self, item):
-        return self.df.__getitem__(item)
+        if not self.compact:
+            return self.df.__getitem__(item)
+        # Same values and dtypes as a chain which is not compact, dropped identifiers are derived
+        if isinstance(item, str):
+            return pd.Series(self.column(item), index=self.df.index, name=item)
+        return expand_dataframe(self.df).__getitem__(item)
 
     def __setitem__(self, key, value):
         self.df.__setitem__(key, value)
+        self._invalidate()
 
     def __len__(self):
+        if self._df is None:
+            return len(self._source[1])
         return self.df.__len__()
 
     def __call__(self, *args, **kwargs):
@@ -332,35 +839,84 @@ class OptionChain:
 
 
 class IndexStocks:
-    """ Hold all symbols details for indices """
+    """ Hold all symbols details for indices
+
+    Added batches are concatenated once when data is next used, and each symbol keeps the
+    row of its latest batch. Row of every symbol is hashed, so lookups do not scan data.
+    """
+    STOCK_PRIORITY = 0
+    INDEX_PRIORITY = 1
 
     def __init__(self):
-        self.data = pd.DataFrame()
+        self._data = pd.DataFrame()
+        self._batches = []          # DataFrames added since data was built
+        self._rows = None           # symbol: row position in data
+        self._sorted = {}           # priority: symbols sorted by identifier
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if self._batches:
+            frames = self._batches if self._data.empty else [self._data] + self._batches
+            data = pd.concat(frames, ignore_index=True)
+            self._batches = []
+            self._set_data(data.drop_duplicates('symbol', keep='last', ignore_index=True))
+        return self._data
+
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._batches = []
+        self._set_data(value)
+
+    def _set_data(self, data: pd.DataFrame):
+        self._data = data
+        self._rows = None
+        self._sorted = {}
+
+    @property
+    def rows(self) -> dict:
+        """ Return symbol: row position in data """
+        data = self.data
+        if self._rows is None:
+            self._rows = {symbol: i for i, symbol in enumerate(data['symbol'])} if 'symbol' in data else {}
+        return self._rows
+
+    def _row(self, symbol: str) -> int:
+        try:
+            return self.rows[symbol]
+        except KeyError:
+            raise KeyError('{} not in symbols'.format(symbol))
 
     def get_prev_close(self, symbol):
-        data = self.data[self.data['symbol'] == symbol]['previousClose']
-        if data.empty:
-            raise KeyError('{} not in symbols'.format(data))
-        else:
-            return float(data.values[0])
+        return float(self.data['previousClose'].iat[self._row(symbol)])
+
+    def get_quote(self, symbol: str) -> dict:
+        """ Return all details of symbol
+
+        Raises:
+            KeyError: if symbol is not in any added index
+        """
+        return self.data.iloc[self._row(symbol)].to_dict()
+
+    def _sorted_symbols(self, priority: int) -> list:
+        data = self.data
+        if priority not in self._sorted:
+            df = data.loc[data['priority'] == priority].sort_values(['identifier'], kind='stable')
+            self._sorted[priority] = list(df['symbol'])
+        return list(self._sorted[priority])
 
     def get_stocks(self) -> list:
         """ Get sorted stock list of indices
 
         :return: list
         """
-        df = self.data.loc[self.data['priority'] == 0]
-        df.sort_values(['identifier'], ascending=bool, inplace=True)
-        return list(df['symbol'])
+        return self._sorted_symbols(self.STOCK_PRIORITY)
 
     def get_indices(self) -> list:
         """ Get sorted indices list of indices
 
         :return: list
         """
-        df = self.data.loc[self.data['priority'] == 1]
-        df.sort_values(['identifier'], ascending=bool, inplace=True)
-        return list(df['symbol'])
+        return self._sorted_symbols(self.INDEX_PRIORITY)
 
     def get_list(self) -> list:
         """ get both indices and stocks symbols
@@ -378,29 +934,23 @@ class IndexStocks:
 
     def add_data(self, data):
         """ Add to Index Details
-        append data to existing data
+        queue data to be concatenated with existing data
         rename index name to index symbol
-        drop duplicate
 
         :param data: (dict)
         :return: self
         """
-        if self.data.empty:
-            self.data = pd.DataFrame(data['data'])
-        else:
-            # Append Data to symbols
-            df = self.prepare_data(data['data'])
-            self.data = self.data.append(df, ignore_index=True)
+        df = self.prepare_data(data['data'])
+
+        # Drop meta column. Meta column has dict, which is not needed
+        df.drop(columns=['meta'], errors='ignore', inplace=True)
 
         # Replace index symbol
         index_name = data['metadata']['indexName']
+        if 'symbol' in df:
+            df.loc[df['symbol'] == index_name, 'symbol'] = c.NAME_TO_INDICES[index_name]
 
-        # Drop meta column. Meta column has dict. Which cause TypeError in drop_duplicates
-        self.data.drop(['meta'], axis=1, inplace=True)
-        self.data.drop_duplicates(inplace=True)
-
-        self.data.symbol[self.data.symbol == index_name] = c.NAME_TO_INDICES[index_name]
-        self.data.sort_values(['identifier'], ascending=bool)
+        self._batches.append(df)
         return self
 
     def __str__(self):
@@ -422,64 +972,170 @@ class IndexStocks:
         return self.data.__len__()
 
 
+class StrikeIndex:
+    """ Sorted strike prices of an option chain with row positions of every strike
+
+    Rows are ordered by strike price, so rows of any strike range are one slice of order.
+    """
+
+    def __init__(self, values: np.ndarray):
+        """ Sort strike prices
+
+        Args:
+            values (np.ndarray): strike price of every row
+        """
+        self.order = np.argsort(values, kind='stable')
+        sorted_values = values[self.order]
+        self.strikes, self.starts = np.unique(sorted_values, return_index=True)
+        self.ends = np.append(self.starts[1:], len(sorted_values))
+
+    def nearest(self, price: float):
+        """ Return strike nearest to price, lower one if two are equally near """
+        if not len(self.strikes):
+            raise ValueError('No strike found')
+        i = np.searchsorted(self.strikes, price)
+        if i == len(self.strikes) or (i > 0 and price - self.strikes[i - 1] <= self.strikes[i] - price):
+            i -= 1
+        return self.strikes[i]
+
+    def rows(self, low: Optional[float] = None, high: Optional[float] = None, closed: bool = True) -> np.ndarray:
+        """ Return positions, in row order, of rows with strike between low and high
+
+        Args:
+            low (float, optional): lowest strike. Defaults to None, which has no lower bound.
+            high (float, optional): highest strike. Defaults to None, which has no upper bound.
+            closed (bool, optional): include low and high strikes. Defaults to True.
+        """
+        start = 0 if low is None else np.searchsorted(self.strikes, low, 'left' if closed else 'right')
+        stop = len(self.strikes) if high is None else np.searchsorted(self.strikes, high,
+                                                                       'right' if closed else 'left')
+        if start >= stop:
+            return self.order[:0]
+        return np.sort(self.order[self.starts[start]:self.ends[stop - 1]])
+
+
+class ExpiryCalendar:
+    """ Near, next, far, monthly and weekly classification of a set of expiry dates
+
+    Months are compared as year * 12 + month, so December rolls over to January of next year.
+    Calendars are shared through expiry_calendar().
+    """
+
+    def __init__(self, dates: np.ndarray):
+        """ Classify expiry dates
+
+        Args:
+            dates (np.ndarray): sorted unique datetime64[ns] expiry dates
+        """
+        self.dates = dates
+        months = dates.astype('datetime64[M]').astype(np.int64)
+        if len(dates):
+            near_month = months[0]
+            self.current = dates[:1]
+            self.near = dates[months == near_month]
+            self.next = dates[months == near_month + 1]
+            self.far = dates[months > near_month + 1]
+            # Last expiry of every month
+            self.monthly = dates[np.append(months[1:] != months[:-1], True)]
+        else:
+            self.current = self.near = self.next = self.far = self.monthly = dates
+        self.weekly = self.near[:-1] if len(self.near) > 1 else self.near
+
+
+_EXPIRY_CALENDARS = {}
+_EXPIRY_CALENDARS_DAY = None
+
+
+def expiry_calendar(dates: np.ndarray) -> ExpiryCalendar:
+    """ Return shared ExpiryCalendar of sorted unique datetime64[ns] expiry dates
+
+    Calendars are cached for the trading day, so every symbol and snapshot with the same
+    expiry dates share one calendar.
+    """
+    global _EXPIRY_CALENDARS_DAY
+    today = datetime.now().date()
+    if _EXPIRY_CALENDARS_DAY != today:
+        _EXPIRY_CALENDARS.clear()
+        _EXPIRY_CALENDARS_DAY = today
+
+    key = dates.tobytes()
+    calendar = _EXPIRY_CALENDARS.get(key)
+    if calendar is None:
+        calendar = _EXPIRY_CALENDARS.setdefault(key, ExpiryCalendar(dates))
+    return calendar
+
+
 class ExpiryDates:
     def __init__(self, data):
-        if isinstance(data, pd.Series):
-            data = data.copy()
+        if isinstance(data, np.ndarray) and data.dtype == 'datetime64[ns]':
+            values = data
+        elif isinstance(data, (pd.Series, pd.Index)):
+            values = pd.DatetimeIndex(data).values
         else:
             try:
                 _ = iter(data)
-                data = pd.Series(data)
+                values = pd.DatetimeIndex(list(data)).values
             except TypeError:
                 raise TypeError('data must be pandas.Series or Iterables')
 
-        self.data = data
-        self.data.drop_duplicates(keep='first', inplace=True)
-        self.data.sort_values(inplace=True)
-        self.datetime_index = pd.DatetimeIndex(data)
-        self.months = sorted(self.datetime_index.month.unique())
+        self._values = np.unique(values)
+        self._calendar = None
+
+    @classmethod
+    def _from_calendar(cls, values: np.ndarray) -> 'ExpiryDates':
+        expiry_dates = cls.__new__(cls)
+        expiry_dates._values = values
+        expiry_dates._calendar = None
+        return expiry_dates
+
+    @property
+    def calendar(self) -> ExpiryCalendar:
+        if self._calendar is None:
+            self._calendar = expiry_calendar(self._values)
+        return self._calendar
 
     @property
     def values(self):
-        return self.data.values
+        return self._values
+
+    @property
+    def data(self) -> pd.Series:
+        return pd.Series(self._values)
+
+    @property
+    def datetime_index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._values)
+
+    @property
+    def months(self) -> list:
+        return sorted(self.datetime_index.month.unique())
 
     @property
     def current_expiry(self):
-        return ExpiryDates([self.data.min()])
+        return self._from_calendar(self.calendar.current)
 
     @property
     def near_expiry(self):
-        near_month = min(self.months)
-        near_series = self.data.loc[self.datetime_index.month == near_month]
-        return ExpiryDates(near_series)
+        return self._from_calendar(self.calendar.near)
 
     @property
     def next_expiry(self):
-        near_month = min(self.months) + 1
-        near_series = self.data.loc[self.datetime_index.month == near_month]
-        return ExpiryDates(near_series)
+        return self._from_calendar(self.calendar.next)
 
     @property
     def far_expiry(self):
-        near_month = min(self.months) + 1
-        near_series = self.data.loc[self.datetime_index.month > near_month]
-        return ExpiryDates(near_series)
+        return self._from_calendar(self.calendar.far)
 
     @property
     def monthly_expiry(self):
-        results = []
-        for i, m in enumerate(self.months):
-            m_data = self.data.loc[self.datetime_index.month == m]
-            results.append(m_data.max())
-        results = pd.Series(results)
-        results.drop_duplicates(keep='first', inplace=True)
-        results.sort_values(inplace=True)
-        return ExpiryDates(results)
+        return self._from_calendar(self.calendar.monthly)
 
     @property
     def weekly_expiry(self):
-        near = self.near_expiry.data
-        if len(near) > 1:
-            near = near.iloc[:-1]
+        return self._from_calendar(self.calendar.weekly)
 
-        return ExpiryDates(near)
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f'ExpiryDates({[str(d)[:10] for d in self._values]})'
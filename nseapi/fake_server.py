@@ -0,0 +1,290 @@
+""" Local stand-in of NSE website for load tests and benchmarks
+
+FakeNseServer serves the main page with NSE like Set-Cookie headers, synthetic option
+chain and stock list payloads, and rejects api requests without unexpired cookies with
+401, like NSE does. Latency, error responses and cookie expiry can be injected while it
+runs. Used as context manager it points constant URLs at itself, so NseApi created
+inside the block talks to it::
+
+    with FakeNseServer(strikes=150, latency=0.05) as server:
+        api = NseApi()
+        chain = api.option_chain('NIFTY', True)
+"""
+import gzip
+import json
+import random
+import secrets
+import threading
+import time as t
+import zlib
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import nseapi.constant as c
+from nseapi.synthetic import option_chain_payload, stock_list_payload
+
+# Constant url name: path served for it
+PATHS = {
+    'URL_MAIN': '/',
+    'URL_INDICES': '/api/option-chain-indices',
+    'URL_EQUITIES': '/api/option-chain-equities',
+    'URL_STOCK_LIST': '/api/equity-stockIndices',
+}
+COOKIE_NAMES = ('nsit', 'nseappid')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # Keep-alive, like NSE
+    disable_nagle_algorithm = True  # Else body written after headers waits for delayed ACK
+    fake = None                     # FakeNseServer, set on subclass
+
+    def do_GET(self):
+        fake = self.fake
+        parts = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        fake._sleep()
+
+        if parts.path == PATHS['URL_MAIN']:
+            return self._main_page()
+        if parts.path not in fake.routes:
+            return self._send(404, b'{}', parts.path)
+
+        status = fake._injected_status()
+        if status is None and not fake._cookies_valid(self.headers.get('Cookie', '')):
+            status = 401
+        if status is not None:
+            return self._send(status, b'{}', parts.path)
+        try:
+            body, compressed = fake.routes[parts.path](params)
+        except KeyError:
+            return self._send(400, b'{}', parts.path)
+        if compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            return self._send(200, compressed, parts.path, 'gzip')
+        self._send(200, body, parts.path)
+
+    def _main_page(self):
+        fake = self.fake
+        token = secrets.token_hex(16)
+        fake._issue(token)
+        ttl = fake.cookie_ttl
+        self.send_response(200)
+        # Attribute before every comma, so requests joined header splits like NSE's
+        self.send_header('Set-Cookie', f'nsit={token}; Path=/; Max-Age={ttl}; HttpOnly')
+        self.send_header('Set-Cookie', f'nseappid={token}; Path=/; Max-Age={ttl}')
+        self.send_header('Set-Cookie', f'bm_mi={token}; Path=/; Max-Age={ttl}')
+        body = b'<html><body>NSE</body></html>'
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        fake._count(PATHS['URL_MAIN'], 200)
+
+    def _send(self, status: int, body: bytes, path: str, encoding: str = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.fake._count(path, status)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeNseServer:
+    """ Local HTTP server which behaves like NSE website """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, strikes: int = 100, expiries: int = 8,
+                 stocks: int = 50, latency: float = 0.0, jitter: float = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None, cookie_ttl: int = 600,
+                 update_interval: float = 3.0, seed: int = 0, compress: bool = True):
+        """ Local HTTP server which behaves like NSE website
+
+        Args:
+            host (str, optional): Defaults to '127.0.0.1'.
+            port (int, optional): Defaults to 0, which pick a free port.
+            strikes (int, optional): strikes per expiry of option chains. Defaults to 100.
+            expiries (int, optional): expiry dates of option chains. Defaults to 8.
+            stocks (int, optional): stocks in stock lists. Defaults to 50.
+            latency (float, optional): seconds added to every response. Defaults to 0.0.
+            jitter (float, optional): max random seconds added to latency. Defaults to 0.0.
+            error_rates (Dict[int, float], optional): status code: probability of api requests
+                answered with it, like {503: 0.05, 403: 0.01}. Defaults to None.
+            cookie_ttl (int, optional): seconds main page cookies are accepted. Defaults to 600.
+            update_interval (float, optional): seconds between new records timestamps of a
+                symbol. Defaults to 3.0.
+            seed (int, optional): seed of synthetic payloads. Defaults to 0.
+            compress (bool, optional): gzip payloads for clients accepting it, like NSE. Defaults to True.
+        """
+        self.host = host
+        self.port = port
+        self.strikes = strikes
+        self.expiries = expiries
+        self.stocks = stocks
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates or {})
+        self.cookie_ttl = cookie_ttl
+        self.update_interval = update_interval
+        self.seed = seed
+        self.compress = compress
+        self.stats = Counter()      # (path, status): responses
+        self.routes = {
+            PATHS['URL_INDICES']: self._option_chain,
+            PATHS['URL_EQUITIES']: self._option_chain,
+            PATHS['URL_STOCK_LIST']: self._stock_list,
+        }
+
+        self._tokens = {}           # cookie value: expiry time
+        self._payloads = {}         # key: (update bucket, encoded payload, gzipped payload)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._httpd = None
+        self._thread = None
+        self._saved_urls = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> 'FakeNseServer':
+        """ Start serving in background thread """
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='FakeNseServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def patch_urls(self):
+        """ Point constant URLs at this server """
+        if self._saved_urls is None:
+            self._saved_urls = {name: getattr(c, name) for name in PATHS}
+        for name, path in PATHS.items():
+            setattr(c, name, self.url + path if path != '/' else self.url)
+
+    def restore_urls(self):
+        """ Point constant URLs back at NSE """
+        if self._saved_urls is not None:
+            for name, url in self._saved_urls.items():
+                setattr(c, name, url)
+            self._saved_urls = None
+
+    def expire_cookies(self):
+        """ Reject every cookie issued so far, like NSE rotating its cookies """
+        with self._lock:
+            self._tokens.clear()
+
+    def _issue(self, token: str):
+        with self._lock:
+            now = t.time()
+            # Forget expired tokens
+            self._tokens = {k: v for k, v in self._tokens.items() if v > now}
+            self._tokens[token] = now + self.cookie_ttl
+
+    def _cookies_valid(self, header: str) -> bool:
+        cookies = dict(part.strip().split('=', 1) for part in header.split(';') if '=' in part)
+        now = t.time()
+        with self._lock:
+            return all(self._tokens.get(cookies.get(name), 0) > now for name in COOKIE_NAMES)
+
+    def _injected_status(self) -> Optional[int]:
+        if not self.error_rates:
+            return None
+        draw = self._random.random()
+        for status, rate in self.error_rates.items():
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    def _sleep(self):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            t.sleep(delay)
+
+    def _count(self, path: str, status: int):
+        with self._lock:
+            self.stats[(path, status)] += 1
+
+    def _cached(self, key, build) -> Tuple[bytes, Optional[bytes]]:
+        """ Return encoded and gzipped payload of key, rebuilt every update_interval seconds """
+        bucket = int(t.time() // self.update_interval)
+        with self._lock:
+            cached = self._payloads.get(key)
+        if cached is None or cached[0] != bucket:
+            # Built outside lock, threads racing on a new bucket build same payload
+            body = json.dumps(build(bucket), separators=(',', ':')).encode()
+            compressed = gzip.compress(body, 6) if self.compress else None
+            cached = (bucket, body, compressed)
+            with self._lock:
+                self._payloads[key] = cached
+        return cached[1], cached[2]
+
+    def _option_chain(self, params: dict) -> Tuple[bytes, Optional[bytes]]:
+        symbol = params['symbol'].upper()
+
+        def build(bucket):
+            return option_chain_payload(symbol, strikes=self.strikes, expiries=self.expiries,
+                                        time_stamp=datetime.fromtimestamp(bucket * self.update_interval),
+                                        seed=zlib.crc32(f'{self.seed}-{symbol}-{bucket}'.encode()))
+        return self._cached(('option_chain', symbol), build)
+
+    def _stock_list(self, params: dict) -> Tuple[bytes, Optional[bytes]]:
+        index_name = params['index']
+
+        def build(bucket):
+            return stock_list_payload(index_name, stocks=self.stocks,
+                                      seed=zlib.crc32(f'{self.seed}-{index_name}'.encode()))
+        return self._cached(('stock_list', index_name), build)
+
+    def __enter__(self):
+        self.start()
+        self.patch_urls()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.restore_urls()
+        self.stop()
+
+
+def main():
+    """ Run FakeNseServer in foreground, so load tests can run it in its own process """
+    import argparse
+    parser = argparse.ArgumentParser(description='Local stand-in of NSE website')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--strikes', type=int, default=100)
+    parser.add_argument('--expiries', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--cookie-ttl', type=int, default=600)
+    parser.add_argument('--no-compress', action='store_true', help='never gzip payloads')
+    parser.add_argument('--error', action='append', default=[], metavar='STATUS:RATE',
+                        help='inject error responses, like 503:0.05, can be repeated')
+    args = parser.parse_args()
+
+    error_rates = {int(status): float(rate) for status, rate in (e.split(':') for e in args.error)}
+    server = FakeNseServer(args.host, args.port, strikes=args.strikes, expiries=args.expiries,
+                           latency=args.latency, jitter=args.jitter, error_rates=error_rates,
+                           cookie_ttl=args.cookie_ttl, compress=not args.no_compress).start()
+    print(f'Serving fake NSE on {server.url}')
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
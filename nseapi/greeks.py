@@ -0,0 +1,221 @@
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.special import ndtr as norm_cdf
+except ImportError:
+    norm_cdf = None
+
+EXPIRY_TIME = np.timedelta64(15 * 60 + 30, 'm')    # Options expire at 15:30 IST on expiry date
+YEAR_SECONDS = 365 * 24 * 60 * 60
+MIN_VOL = 1e-4              # Bracket of implied volatility solver, as fraction
+MAX_VOL = 5.0
+GREEKS = ['IV', 'Delta', 'Gamma', 'Vega', 'Theta']
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+ArrayLike = Union[float, np.ndarray]
+
+
+if norm_cdf is None:
+    def norm_cdf(x: np.ndarray) -> np.ndarray:
+        """ Standard normal cdf, Abramowitz & Stegun 7.1.26 erf approximation (abs error < 1.5e-7) """
+        x = np.asarray(x, dtype=np.float64)
+        z = np.abs(x) / math.sqrt(2)
+        k = 1.0 / (1.0 + 0.3275911 * z)
+        poly = k * (0.254829592 + k * (-0.284496736 + k * (1.421413741 + k * (-1.453152027 + k * 1.061405429))))
+        half_erfc = 0.5 * poly * np.exp(-z * z)
+        return np.where(x >= 0, 1.0 - half_erfc, half_erfc)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def time_to_expiry(expiry_dates: np.ndarray, time_stamp: datetime) -> np.ndarray:
+    """ Return years from time_stamp till 15:30 of expiry dates, NaN for expired options """
+    expiry = np.asarray(expiry_dates, dtype='datetime64[ns]') + EXPIRY_TIME
+    seconds = (expiry - np.datetime64(time_stamp, 'ns')) / np.timedelta64(1, 's')
+    return np.where(seconds > 0, seconds / YEAR_SECONDS, np.nan)
+
+
+def _d1_d2(spot, strike, time, vol, rate, div_yield) -> Tuple[np.ndarray, np.ndarray]:
+    vol_sqrt_t = vol * np.sqrt(time)
+    d1 = (np.log(spot / strike) + (rate - div_yield + 0.5 * vol * vol) * time) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+
+def black_scholes(spot: ArrayLike, strike: ArrayLike, time: ArrayLike, vol: ArrayLike, rate: ArrayLike = 0.0,
+                  div_yield: ArrayLike = 0.0, call: Union[bool, np.ndarray] = True) -> Dict[str, np.ndarray]:
+    """ Black-Scholes price and Greeks, arguments are broadcast together
+
+    Args:
+        spot (ArrayLike): underlying value
+        strike (ArrayLike): strike price
+        time (ArrayLike): years till expiry
+        vol (ArrayLike): volatility as fraction, like 0.15
+        rate (ArrayLike, optional): risk free rate as continuous fraction. Defaults to 0.0.
+        div_yield (ArrayLike, optional): dividend yield as continuous fraction. Defaults to 0.0.
+        call (Union[bool, np.ndarray], optional): True for calls, False for puts. Defaults to True.
+
+    Returns:
+        Dict[str, np.ndarray]: Price, Delta, Gamma, Vega (per 1% volatility) and Theta (per day)
+    """
+    d1, d2 = _d1_d2(spot, strike, time, vol, rate, div_yield)
+    div_discount = np.exp(-div_yield * time)
+    discount = np.exp(-rate * time)
+    sign = np.where(call, 1.0, -1.0)
+    cdf_d1 = norm_cdf(sign * d1)
+    cdf_d2 = norm_cdf(sign * d2)
+    pdf_d1 = norm_pdf(d1)
+    sqrt_t = np.sqrt(time)
+
+    price = sign * (spot * div_discount * cdf_d1 - strike * discount * cdf_d2)
+    theta = (-spot * div_discount * pdf_d1 * vol / (2 * sqrt_t)
+             - sign * rate * strike * discount * cdf_d2
+             + sign * div_yield * spot * div_discount * cdf_d1)
+    return {
+        'Price': price,
+        'Delta': sign * div_discount * cdf_d1,
+        'Gamma': div_discount * pdf_d1 / (spot * vol * sqrt_t),
+        'Vega': spot * div_discount * pdf_d1 * sqrt_t / 100,
+        'Theta': theta / 365,
+    }
+
+
+def implied_volatility(price: ArrayLike, spot: ArrayLike, strike: ArrayLike, time: ArrayLike,
+                       rate: ArrayLike = 0.0, div_yield: ArrayLike = 0.0, call: Union[bool, np.ndarray] = True,
+                       tol: float = 1e-6, max_iter: int = 60) -> np.ndarray:
+    """ Solve Black-Scholes implied volatility of many options at once
+
+    Newton steps are taken while they stay inside the bracket of the root, otherwise the
+    bracket is bisected, so every option converges even far out of the money. Options
+    whose price is outside no-arbitrage bounds, or with no price, get NaN.
+
+    Args:
+        price (ArrayLike): option price
+        spot (ArrayLike): underlying value
+        strike (ArrayLike): strike price
+        time (ArrayLike): years till expiry
+        rate (ArrayLike, optional): risk free rate as continuous fraction. Defaults to 0.0.
+        div_yield (ArrayLike, optional): dividend yield as continuous fraction. Defaults to 0.0.
+        call (Union[bool, np.ndarray], optional): True for calls, False for puts. Defaults to True.
+        tol (float, optional): max error of model price. Defaults to 1e-6.
+        max_iter (int, optional): Defaults to 60.
+
+    Returns:
+        np.ndarray: volatility as fraction
+    """
+    price, spot, strike, time, rate, div_yield, call = (
+        np.array(a, dtype=np.float64).ravel() for a in
+        np.broadcast_arrays(price, spot, strike, time, rate, div_yield, call))
+    call = call.astype(bool)
+    forward_spot = spot * np.exp(-div_yield * time)
+    forward_strike = strike * np.exp(-rate * time)
+    intrinsic = np.maximum(np.where(call, forward_spot - forward_strike, forward_strike - forward_spot), 0)
+    upper = np.where(call, forward_spot, forward_strike)
+    with np.errstate(invalid='ignore'):
+        valid = (time > 0) & (price > intrinsic) & (price < upper) & (spot > 0) & (strike > 0)
+
+    vol = np.full(price.shape, np.nan)
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return vol
+    price, spot, strike, time, rate, div_yield, call = (
+        a[rows] for a in (price, spot, strike, time, rate, div_yield, call))
+
+    # Brenner-Subrahmanyam guess, good near the money
+    guess = np.clip(price / spot * np.sqrt(2 * np.pi / time), 0.05, 2.0)
+    low = np.full(guess.shape, MIN_VOL)
+    high = np.full(guess.shape, MAX_VOL)
+    active = np.arange(len(rows))
+    for _ in range(max_iter):
+        v = guess[active]
+        args = (spot[active], strike[active], time[active])
+        d1, d2 = _d1_d2(*args, v, rate[active], div_yield[active])
+        sign = np.where(call[active], 1.0, -1.0)
+        model = sign * (args[0] * np.exp(-div_yield[active] * args[2]) * norm_cdf(sign * d1)
+                        - args[1] * np.exp(-rate[active] * args[2]) * norm_cdf(sign * d2))
+        vega = args[0] * np.exp(-div_yield[active] * args[2]) * norm_pdf(d1) * np.sqrt(args[2])
+        diff = model - price[active]
+
+        # Price rise with volatility, so sign of diff tells side of root
+        above = diff > 0
+        high[active] = np.where(above, v, high[active])
+        low[active] = np.where(above, low[active], v)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = v - diff / vega
+        bisect = ~((step > low[active]) & (step < high[active]))
+        step[bisect] = 0.5 * (low[active] + high[active])[bisect]
+        guess[active] = step
+
+        done = (np.abs(diff) < tol) | (high[active] - low[active] < tol)
+        guess[active[done]] = v[done]
+        active = active[~done]
+        if not len(active):
+            break
+
+    # Prices which need volatility outside bracket are not solvable
+    guess[(guess <= MIN_VOL + tol) | (guess >= MAX_VOL - tol)] = np.nan
+    vol[rows] = guess
+    return vol
+
+
+def _chain_inputs(chain) -> Tuple[np.ndarray, ...]:
+    """ Return spot, strike, time, call price, put price arrays of OptionChain """
+    time_stamp = chain.time_stamp if chain.time_stamp is not None else datetime.now()
+    return (chain.column('Underlying Value').astype(np.float64),
+            chain.column('Strike Price').astype(np.float64),
+            time_to_expiry(chain.column('Expiry Date'), time_stamp),
+            chain.column('Call Last Price').astype(np.float64),
+            chain.column('Put Last Price').astype(np.float64))
+
+
+def chain_greeks(chains: Iterable, rate: float = 0.07, div_yield: float = 0.0) -> List[pd.DataFrame]:
+    """ Implied volatility and Greeks of every strike of many OptionChains in one pass
+
+    Rows of all chains, calls and puts are stacked and solved together. Time to expiry is
+    measured from time_stamp of each chain. IV is in percent like NSE Implied Volatility.
+
+    Args:
+        chains (Iterable[OptionChain]): option chains, may be of different symbols and snapshots
+        rate (float, optional): risk free rate as continuous fraction. Defaults to 0.07.
+        div_yield (float, optional): dividend yield as continuous fraction. Defaults to 0.0.
+
+    Returns:
+        List[pd.DataFrame]: per chain, Strike Price, Expiry Date, Time To Expiry and
+            Call/Put IV, Delta, Gamma, Vega, Theta columns with index of chain df
+    """
+    chains = list(chains)
+    inputs = [_chain_inputs(chain) for chain in chains]
+    if not inputs:
+        return []
+    spot, strike, time, call_price, put_price = (np.concatenate(a) for a in zip(*inputs))
+    n = len(spot)
+
+    # Calls in first half, puts in second half
+    spot2, strike2, time2 = np.tile(spot, 2), np.tile(strike, 2), np.tile(time, 2)
+    call = np.repeat([True, False], n)
+    vol = implied_volatility(np.concatenate([call_price, put_price]), spot2, strike2, time2,
+                             rate, div_yield, call)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = black_scholes(spot2, strike2, time2, vol, rate, div_yield, call)
+    values['IV'] = vol * 100
+
+    results = []
+    start = 0
+    for chain, chain_inputs in zip(chains, inputs):
+        stop = start + len(chain_inputs[0])
+        df = pd.DataFrame({'Strike Price': chain.column('Strike Price'),
+                           'Expiry Date': chain.column('Expiry Date'),
+                           'Time To Expiry': time[start:stop]}, index=chain.df.index)
+        for side, offset in (('Call', 0), ('Put', n)):
+            for greek in GREEKS:
+                df[f'{side} {greek}'] = values[greek][offset + start:offset + stop]
+        results.append(df)
+        start = stop
+    return results
@@ -0,0 +1,226 @@
+""" Intraday history of one expiry of a symbol as time x strike x field arrays
+
+OptionChainHistory copies every appended snapshot into preallocated NumPy arrays which
+grow geometrically, so a session of appends is linear instead of quadratic like
+concatenating DataFrames, and rolling queries are slices of one array::
+
+    history = OptionChainHistory('NIFTY')
+    for chain in chains:
+        history.append(chain)
+    history.change('Put Open Interest', minutes=15)
+"""
+from datetime import datetime
+from typing import List, Optional, Union
+import numpy as np
+import pandas as pd
+
+# Fields kept for every strike
+HISTORY_FIELDS = ['Call Open Interest', 'Call Total Traded Volume', 'Call Implied Volatility', 'Call Last Price',
+                  'Put Open Interest', 'Put Total Traded Volume', 'Put Implied Volatility', 'Put Last Price']
+
+
+class OptionChainHistory:
+    """ Snapshots of one expiry of a symbol in time x strike x field arrays
+
+    Strikes are kept in order of first appearance, so strikes NSE adds during the day are
+    appended without moving earlier values, strikes missing from a snapshot are NaN.
+    Queries return strikes sorted.
+    """
+    GROWTH = 2          # Capacity multiplier when arrays are full
+    CAPACITY = 64       # Initial snapshots capacity
+
+    def __init__(self, symbol: str = None, expiry_date: Union[datetime, str] = None, fields: List[str] = None,
+                 capacity: int = CAPACITY, strikes_capacity: int = 256):
+        """ Intraday history of one expiry of a symbol
+
+        Args:
+            symbol (str, optional): symbol of chains. Defaults to None, which take symbol of first chain.
+            expiry_date (Union[datetime, str], optional): expiry kept, datetime or dd-mm-yy string.
+                Defaults to None, which take nearest expiry of first chain.
+            fields (List[str], optional): OptionChain columns kept. Defaults to HISTORY_FIELDS.
+            capacity (int, optional): snapshots allocated up front. Defaults to 64.
+            strikes_capacity (int, optional): strikes allocated up front. Defaults to 256.
+        """
+        if isinstance(expiry_date, str):
+            expiry_date = datetime.strptime(expiry_date, '%d-%m-%y')
+        self.symbol = symbol
+        self.expiry_date = None if expiry_date is None else np.datetime64(expiry_date, 'ns')
+        self.fields = list(HISTORY_FIELDS if fields is None else fields)
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+
+        self._size = 0
+        self._times = np.empty(max(1, capacity), dtype='datetime64[ns]')
+        self._underlying = np.empty(max(1, capacity), dtype=np.float64)
+        self._values = np.full((max(1, capacity), max(1, strikes_capacity), len(self.fields)), np.nan)
+        self._strikes = np.empty(max(1, strikes_capacity), dtype=np.float64)     # Order of first appearance
+        self._strike_count = 0
+        self._sorted = np.empty(0, dtype=np.float64)
+        self._order = np.empty(0, dtype=np.intp)    # Positions of sorted strikes
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def times(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._times[:self._size], name='Time Stamp')
+
+    @property
+    def strikes(self) -> np.ndarray:
+        """ Return sorted strike prices seen so far """
+        return self._sorted
+
+    @property
+    def underlying(self) -> pd.Series:
+        """ Return underlying value of every snapshot """
+        return pd.Series(self._underlying[:self._size], index=self.times, name='Underlying Value')
+
+    def append(self, chain) -> bool:
+        """ Add snapshot of expiry from OptionChain
+
+        Snapshots with time stamp not after last one, like repeated polls, are skipped.
+
+        Args:
+            chain (OptionChain): snapshot of symbol, of any expiries
+
+        Returns:
+            bool: True if snapshot was added
+        """
+        time_stamp = np.datetime64(chain.time_stamp, 'ns')
+        if self._size and time_stamp <= self._times[self._size - 1]:
+            return False
+
+        expiry = chain.column('Expiry Date').astype('datetime64[ns]')
+        if self.expiry_date is None:
+            self.expiry_date = expiry.min()
+        if self.symbol is None:
+            self.symbol = chain.symbol
+        rows = np.flatnonzero(expiry == self.expiry_date)
+        if not len(rows):
+            raise ValueError(f'Expiry Date {self.expiry_date} not in chain')
+
+        try:
+            values = [chain.column(field)[rows] for field in self.fields]
+        except KeyError as e:
+            raise ValueError(f'chain has no {e} column') from None
+        positions = self._strike_positions(chain.column('Strike Price')[rows].astype(np.float64))
+
+        if self._size == len(self._times):
+            self._grow_times(self._size * self.GROWTH)
+        i = self._size
+        self._times[i] = time_stamp
+        self._underlying[i] = chain.column('Underlying Value')[rows[0]]
+        for j, field_values in enumerate(values):
+            self._values[i, positions, j] = field_values
+        self._size += 1
+        return True
+
+    def _strike_positions(self, strikes: np.ndarray) -> np.ndarray:
+        """ Return strike axis positions of strikes, adding strikes not seen before """
+        found = np.searchsorted(self._sorted, strikes)
+        new = found == len(self._sorted)
+        new[~new] = self._sorted[found[~new]] != strikes[~new]
+        if new.any():
+            added = np.unique(strikes[new])
+            count = self._strike_count + len(added)
+            if count > len(self._strikes):
+                self._grow_strikes(max(count, len(self._strikes) * self.GROWTH))
+            self._strikes[self._strike_count:count] = added
+            self._strike_count = count
+            self._order = np.argsort(self._strikes[:count], kind='stable')
+            self._sorted = self._strikes[:count][self._order]
+            found = np.searchsorted(self._sorted, strikes)
+        return self._order[found]
+
+    def _grow_times(self, capacity: int):
+        self._times = np.concatenate([self._times, np.empty(capacity - len(self._times), self._times.dtype)])
+        self._underlying = np.concatenate([self._underlying, np.empty(capacity - len(self._underlying))])
+        values = np.full((capacity,) + self._values.shape[1:], np.nan)
+        values[:self._size] = self._values[:self._size]
+        self._values = values
+
+    def _grow_strikes(self, capacity: int):
+        self._strikes = np.concatenate([self._strikes, np.empty(capacity - len(self._strikes))])
+        values = np.full((self._values.shape[0], capacity, len(self.fields)), np.nan)
+        values[:self._size, :self._strike_count] = self._values[:self._size, :self._strike_count]
+        self._values = values
+
+    def _start(self, minutes: Optional[float]) -> int:
+        """ Return first snapshot within minutes of last one, 0 if minutes is None """
+        if minutes is None or not self._size:
+            return 0
+        since = self._times[self._size - 1] - np.timedelta64(int(minutes * 60 * 10 ** 9), 'ns')
+        return int(np.searchsorted(self._times[:self._size], since))
+
+    def values(self, field: str, minutes: float = None) -> np.ndarray:
+        """ Return time x sorted strike array of field
+
+        Args:
+            field (str): one of fields
+            minutes (float, optional): only snapshots within minutes of last one. Defaults to None, which use all.
+        """
+        if field not in self._field_index:
+            raise ValueError(f'field must be one of {self.fields}')
+        return self._values[self._start(minutes):self._size, self._order, self._field_index[field]]
+
+    def frame(self, field: str, minutes: float = None) -> pd.DataFrame:
+        """ Return field as DataFrame indexed by Time Stamp with a column per strike """
+        start = self._start(minutes)
+        return pd.DataFrame(self.values(field, minutes), index=self.times[start:],
+                            columns=pd.Index(self._sorted, name='Strike Price'))
+
+    def series(self, field: str, strike: float, minutes: float = None) -> pd.Series:
+        """ Return field of strike at every snapshot """
+        i = np.searchsorted(self._sorted, strike)
+        if i == len(self._sorted) or self._sorted[i] != strike:
+            raise ValueError(f'Strike Price {strike} not found')
+        start = self._start(minutes)
+        return pd.Series(self._values[start:self._size, self._order[i], self._field_index[field]],
+                         index=self.times[start:], name=field)
+
+    def change(self, field: str = 'Call Open Interest', minutes: float = None) -> pd.Series:
+        """ Return change of field of every strike between first snapshot within minutes and last one
+
+        Strikes missing in a snapshot are compared from their first and last known value in window.
+        """
+        values = self.values(field, minutes)
+        known = ~np.isnan(values)
+        has = known.any(axis=0)
+        first = np.where(has, values[known.argmax(axis=0), np.arange(values.shape[1])], np.nan)
+        last_row = len(values) - 1 - known[::-1].argmax(axis=0)
+        last = np.where(has, values[last_row, np.arange(values.shape[1])], np.nan)
+        return pd.Series(last - first, index=pd.Index(self._sorted, name='Strike Price'), name=field)
+
+    def vwap_iv(self, side: str = 'Call', minutes: float = None) -> pd.Series:
+        """ Return implied volatility of every strike weighted by volume traded between snapshots
+
+        Args:
+            side (str, optional): Call or Put. Defaults to 'Call'.
+            minutes (float, optional): only snapshots within minutes of last one. Defaults to None, which use all.
+        """
+        start = max(self._start(minutes) - 1, 0)
+        window = slice(start, self._size)
+        volume = self._values[window, :, self._field_index[f'{side} Total Traded Volume']][:, self._order]
+        iv = self._values[window, :, self._field_index[f'{side} Implied Volatility']][:, self._order]
+        # Volume is cumulative for the day, first snapshot of window only gives base volume
+        traded = np.clip(np.diff(volume, axis=0), 0, None)
+        iv = iv[1:]
+        weight = np.where(np.isnan(traded) | np.isnan(iv) | (iv <= 0), 0.0, traded)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = np.sum(np.where(weight > 0, iv, 0.0) * weight, axis=0) / weight.sum(axis=0)
+        return pd.Series(vwap, index=pd.Index(self._sorted, name='Strike Price'), name=f'{side} VWAP IV')
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """ Return every snapshot as rows of Time Stamp, Strike Price and fields, missing strikes dropped """
+        times = np.repeat(self._times[:self._size], len(self._sorted))
+        strikes = np.tile(self._sorted, self._size)
+        values = self._values[:self._size][:, self._order].reshape(-1, len(self.fields))
+        keep = ~np.isnan(values).all(axis=1)
+        df = pd.DataFrame(values[keep], columns=self.fields)
+        df.insert(0, 'Strike Price', strikes[keep])
+        df.insert(0, 'Time Stamp', times[keep])
+        df['Underlying Value'] = np.repeat(self._underlying[:self._size], len(self._sorted))[keep]
+        return df
+
+    def __repr__(self):
+        return f'OptionChainHistory({self.symbol}, {self.expiry_date}, {self._size} snapshots, ' \
+               f'{len(self._sorted)} strikes)'
@@ -1,15 +1,68 @@
+import atexit
 import logging as _logging
-import sys, os
-from datetime import datetime as _datetime
-from typing import Union
+import os
+import queue
+import sys
+import threading
+from datetime import date as _date
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Union
 from pathlib import Path as _Path
 from nseapi.generic import validate_directory
 import nseapi.constant as c
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%d-%m-%y %I:%M:%S %p'
+MAX_BYTES = 10 * 1024 * 1024    # Log file is rotated after this size
+BACKUP_COUNT = 14               # Rotated log files kept
+
+_listeners: Dict[str, QueueListener] = {}      # logger name: listener writing its records
+_lock = threading.Lock()
+
+
+class DailyRotatingFileHandler(RotatingFileHandler):
+    """ RotatingFileHandler which also rotates on first record of a new day """
+
+    def __init__(self, filename: Union[_Path, str], max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        try:
+            self.day = _date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self.day = _date.today()
+
+    def shouldRollover(self, record: _logging.LogRecord) -> int:
+        if _date.fromtimestamp(record.created) != self.day:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.day = _date.today()
+
+
+class _QueueHandler(QueueHandler):
+    """ QueueHandler which leaves formatting of records to listener thread """
+
+    def prepare(self, record: _logging.LogRecord) -> _logging.LogRecord:
+        return record
+
+
+def _stop_listeners():
+    with _lock:
+        for listener in _listeners.values():
+            listener.stop()
+        _listeners.clear()
+
+
+atexit.register(_stop_listeners)
+
 
 def get_logger(name: str, log_dir: Union[_Path, str]=None) -> _logging.Logger:
     """ Return Logger Object
 
+    Handlers are added once per name, records are written to stdout and log_dir/name.log by
+    a background thread. Log file is rotated daily and after MAX_BYTES.
+
     Args:
         name (str): name of logger
         log_dir (Union[_Path, str], optional): path of logger. Defaults to None.
@@ -20,32 +73,34 @@ def get_logger(name: str, log_dir: Union[_Path, str]=None) -> _logging.Logger:
 
     # Create a custom logger
     logger = _logging.getLogger(name)
+    formatter = _logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
 
-    now = _datetime.now()
-    now_str = now.strftime("%d-%m-%Y")
-
-    # Create handlers
     logger.setLevel(_logging.DEBUG)
+    with _lock:
+        listener = _listeners.get(name)
+        if listener is None:
+            # Command line logger
+            c_handler = _logging.StreamHandler(stream=sys.stdout)
+            c_handler.setLevel(_logging.DEBUG)
+            c_handler.setFormatter(formatter)
 
-    # Command line logger
-    c_handler = _logging.StreamHandler(stream=sys.stdout)
-    c_handler.setLevel(_logging.DEBUG)
-    c_format = _logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt="%d-%m-%y %I:%M:%S %p")
-    c_handler.setFormatter(c_format)
-    logger.addHandler(c_handler)
-
-    # File Handler
-    if log_dir is not None:
-        if isinstance(log_dir, str):
-            log_dir = _Path(log_dir)
-
-        if validate_directory(log_dir):
-            file_name = log_dir.joinpath(name + '_' + now_str + '.log')
-            f_handler = _logging.FileHandler(file_name)
-            f_handler.setLevel(_logging.INFO)
-            f_format = _logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt="%d-%m-%y %I:%M:%S %p")
-            f_handler.setFormatter(f_format)
-            logger.addHandler(f_handler)
+            records = queue.SimpleQueue()
+            listener = _listeners[name] = QueueListener(records, c_handler, respect_handler_level=True)
+            logger.addHandler(_QueueHandler(records))
+            listener.start()
 
-    return logger
+        # File Handler
+        if log_dir is not None:
+            if isinstance(log_dir, str):
+                log_dir = _Path(log_dir)
 
+            file_name = os.path.abspath(log_dir.joinpath(name + '.log'))
+            files = [h.baseFilename for h in listener.handlers if isinstance(h, _logging.FileHandler)]
+            if file_name not in files and validate_directory(log_dir):
+                f_handler = DailyRotatingFileHandler(file_name)
+                f_handler.setLevel(_logging.INFO)
+                f_handler.setFormatter(formatter)
+                # Listener thread reads handlers on every record, so swap in a new tuple
+                listener.handlers = listener.handlers + (f_handler,)
+
+    return logger
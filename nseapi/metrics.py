@@ -0,0 +1,164 @@
+""" Counters, histograms and timing spans of NseApi hot paths
+
+Metrics go to one process wide sink, MetricsSink by default which drops everything, so
+instrumented code only pays for a method call. set_sink(PrometheusSink()) starts
+collecting, and render() of the sink returns Prometheus text exposition format::
+
+    sink = set_sink(PrometheusSink())
+    api.option_chain('NIFTY', True)
+    print(sink.render())
+"""
+import threading
+import time as t
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('sink', 'name', 'labels', 'started')
+
+    def __init__(self, sink: 'MetricsSink', name: str, labels: dict):
+        self.sink = sink
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = t.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.sink.observe(self.name, t.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsSink:
+    """ Sink which drops every metric, base of sinks """
+    enabled = False
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """ Add value to counter name """
+
+    def observe(self, name: str, value: float, **labels):
+        """ Add observation, like seconds, to histogram name """
+
+    def span(self, name: str, **labels):
+        """ Return context manager which observes seconds spent in it to histogram name """
+        return _NOOP_SPAN
+
+
+class MemorySink(MetricsSink):
+    """ Thread safe sink which keeps counters and histograms in memory """
+    enabled = True
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], list] = {}     # key: [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def span(self, name: str, **labels):
+        return _Span(self, name, labels)
+
+    def snapshot(self) -> dict:
+        """ Return counters and histogram (count, sum) by name and labels """
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {key: (h[2], h[1]) for key, h in self.histograms.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _escape(value) -> str:
+    """ Escape label value as text exposition format wants, backslash first """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels_text(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+class PrometheusSink(MemorySink):
+    """ MemorySink which renders Prometheus text exposition format """
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self.histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{_labels_text(labels)} {value}')
+
+        for (name, labels), (bucket_counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels_text(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels_text(labels)} {total}')
+            lines.append(f'{name}_count{_labels_text(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+sink: MetricsSink = MetricsSink()
+
+
+def set_sink(new_sink: MetricsSink) -> MetricsSink:
+    """ Send metrics of every NseApi to new_sink, MetricsSink() turns metrics off
+
+    Returns:
+        MetricsSink: new_sink
+    """
+    global sink
+    sink = new_sink
+    return new_sink
+
+
+def get_sink() -> MetricsSink:
+    return sink
@@ -0,0 +1,229 @@
+""" Many option chains in one columnar frame for cross symbol screening
+
+MultiChain stacks OptionChain snapshots of any symbols into one DataFrame with a
+categorical Symbol column, so screener queries are group operations over one frame
+instead of Python loops over chains::
+
+    chains = MultiChain(api.option_chains(api.index_stocks(['NIFTY']).get_stocks()), api.symbols_details)
+    chains.top('Put OI Change', n=10, strikes_around_atm=5, expiry_rank=0)
+"""
+from typing import Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from nseapi.data_models import IndexStocks, OptionChain, expand_dataframe
+
+SCREEN_INDEX = ['Symbol', 'Time Stamp']
+# Columns summary needs, kept by column projection
+SCREEN_COLUMNS = ['Strike Price', 'Expiry Date', 'Underlying Value'] + [
+    f'{side} {field}' for side in ('Call', 'Put')
+    for field in ('Open Interest', 'Change in Open Interest', 'Total Traded Volume', 'Implied Volatility')]
+# IndexStocks column: summary column
+STOCK_COLUMNS = {'previousClose': 'Previous Close', 'lastPrice': 'Last Price', 'pChange': 'P.Change'}
+
+
+def _dense_rank(group: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """ Return 0 based dense rank of values within each group """
+    order = np.lexsort((values, group))
+    sorted_group, sorted_values = group[order], values[order]
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = sorted_group[1:] != sorted_group[:-1]
+    new_value = new_group.copy()
+    new_value[1:] |= sorted_values[1:] != sorted_values[:-1]
+    counts = np.cumsum(new_value)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = counts - counts[np.flatnonzero(new_group)][np.cumsum(new_group) - 1]
+    return rank
+
+
+class MultiChain:
+    """ OptionChain snapshots of many symbols stacked in one DataFrame
+
+    Rows of snapshot i are offsets[i]:offsets[i + 1] of df. Columns are those every
+    snapshot has.
+    """
+
+    def __init__(self, chains: Iterable[Union[OptionChain, Tuple[str, Optional[OptionChain]]]],
+                 stocks: IndexStocks = None, columns: List[str] = None):
+        """ Stack option chains
+
+        Args:
+            chains (Iterable): OptionChains, or (symbol, OptionChain) like NseApi.option_chains yields.
+                None and empty chains are skipped.
+            stocks (IndexStocks, optional): quotes joined to summary. Defaults to None.
+            columns (List[str], optional): OptionChain columns kept besides SCREEN_COLUMNS. Defaults to None,
+                which keep columns every chain has.
+
+        Raises:
+            ValueError: if there is no non empty chain
+        """
+        chains = [chain[1] if isinstance(chain, tuple) else chain for chain in chains]
+        self.chains = [chain for chain in chains if chain is not None and len(chain)]
+        if not self.chains:
+            raise ValueError('no option chain to stack')
+        self.stocks = stocks
+        self._expiry_rank = None
+
+        sizes = np.array([len(chain) for chain in self.chains], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.chain_no = np.repeat(np.arange(len(self.chains)), sizes)
+        self.symbols = [chain.symbol for chain in self.chains]
+        self.time_stamps = pd.DatetimeIndex([chain.time_stamp for chain in self.chains])
+
+        # Compact chains are expanded, so every snapshot has original dtypes and identifiers
+        df = pd.concat([expand_dataframe(chain.df) for chain in self.chains], join='inner', ignore_index=True,
+                       copy=False)
+        if columns is not None:
+            df = df[[name for name in df if name in SCREEN_COLUMNS or name in columns]]
+        df.insert(0, 'Symbol', pd.Categorical(np.repeat(np.array(self.symbols, dtype=object), sizes),
+                                              categories=pd.unique(np.array(self.symbols, dtype=object))))
+        df.insert(1, 'Time Stamp', np.repeat(self.time_stamps.values, sizes))
+        self.df = df
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def chain(self, i: Union[int, str]) -> OptionChain:
+        """ Return snapshot i, or latest snapshot of symbol i, as OptionChain """
+        if isinstance(i, str):
+            positions = [n for n, symbol in enumerate(self.symbols) if symbol == i]
+            if not positions:
+                raise KeyError(f'{i} not in symbols')
+            i = positions[-1]
+        return self.chains[i]
+
+    def _values(self, column: str) -> np.ndarray:
+        return np.nan_to_num(self.df[column].to_numpy(dtype=np.float64))
+
+    @property
+    def expiry_rank(self) -> np.ndarray:
+        """ Return rank of expiry date of every row within its snapshot, 0 is current expiry """
+        if self._expiry_rank is None:
+            expiry = self.df['Expiry Date'].to_numpy().astype('datetime64[ns]').view(np.int64)
+            self._expiry_rank = _dense_rank(self.chain_no, expiry)
+        return self._expiry_rank
+
+    def atm_offset(self, rows: np.ndarray = None) -> np.ndarray:
+        """ Return strikes between strike of rows and ATM strike of their snapshot
+
+        Args:
+            rows (np.ndarray, optional): row positions, strikes are counted among these rows only.
+                Defaults to None, which use all rows.
+        """
+        rows = np.arange(len(self.df)) if rows is None else rows
+        chain_no = self.chain_no[rows]
+        strike = self.df['Strike Price'].to_numpy(dtype=np.float64)[rows]
+        rank = _dense_rank(chain_no, strike)
+
+        # ATM strike is strike nearest underlying value, lower one on ties, like OptionChain.middle_strike
+        underlying = self.df['Underlying Value'].to_numpy(dtype=np.float64)[self.offsets[:-1]]
+        distance = np.abs(strike - underlying[chain_no])
+        order = np.lexsort((strike, distance, chain_no))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = chain_no[order][1:] != chain_no[order][:-1]
+        atm_rank = np.zeros(len(self.chains), dtype=np.int64)
+        atm_rank[chain_no[order[first]]] = rank[order[first]]
+        return rank - atm_rank[chain_no]
+
+    def mask(self, strikes_around_atm: int = None, expiry_rank: Union[int, List[int]] = None) -> np.ndarray:
+        """ Return rows of expiry ranks within strikes_around_atm strikes of ATM
+
+        Same rows as trim(strikes_around_atm) of the expiries of every chain, ATM window is
+        counted among strikes of selected expiries.
+        """
+        keep = np.ones(len(self.df), dtype=bool)
+        if expiry_rank is not None:
+            keep &= np.isin(self.expiry_rank, expiry_rank)
+        if strikes_around_atm is not None:
+            rows = np.flatnonzero(keep)
+            keep[rows] = np.abs(self.atm_offset(rows)) <= strikes_around_atm
+        return keep
+
+    def select(self, strikes_around_atm: int = None, expiry_rank: Union[int, List[int]] = None) -> pd.DataFrame:
+        """ Return rows of df in ATM window and expiries, see mask """
+        return self.df[self.mask(strikes_around_atm, expiry_rank)]
+
+    def summary(self, strikes_around_atm: int = None, expiry_rank: Union[int, List[int]] = None) -> pd.DataFrame:
+        """ Open interest, volume, put call ratios and ATM implied volatility of every snapshot
+
+        Args:
+            strikes_around_atm (int, optional): only count strikes this near ATM. Defaults to None.
+            expiry_rank (Union[int, List[int]], optional): only count these expiries, 0 is current.
+                Defaults to None, which count all.
+
+        Returns:
+            pd.DataFrame: indexed by Symbol and Time Stamp, joined with quotes of stocks
+        """
+        keep = self.mask(strikes_around_atm, expiry_rank)
+        n = len(self.chains)
+        group = self.chain_no[keep]
+
+        def total(column):
+            return np.bincount(group, self._values(column)[keep], minlength=n)
+
+        summary = pd.DataFrame({
+            'Underlying Value': self.df['Underlying Value'].to_numpy(dtype=np.float64)[self.offsets[:-1]],
+            'Call OI': total('Call Open Interest'),
+            'Put OI': total('Put Open Interest'),
+            'Call OI Change': total('Call Change in Open Interest'),
+            'Put OI Change': total('Put Change in Open Interest'),
+            'Call Volume': total('Call Total Traded Volume'),
+            'Put Volume': total('Put Total Traded Volume'),
+        }, index=pd.MultiIndex.from_arrays([self.symbols, self.time_stamps], names=SCREEN_INDEX))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary['OI PCR'] = summary['Put OI'] / summary['Call OI']
+            summary['Volume PCR'] = summary['Put Volume'] / summary['Call Volume']
+
+        # Implied volatility at ATM strike of nearest counted expiry
+        counted_rank = np.where(keep, self.expiry_rank, np.iinfo(np.int64).max)
+        nearest = np.full(n, np.iinfo(np.int64).max)
+        np.minimum.at(nearest, self.chain_no, counted_rank)
+        atm = np.flatnonzero(keep & (self.expiry_rank == nearest[self.chain_no]))
+        atm = atm[self.atm_offset(atm) == 0]
+        for side in ('Call', 'Put'):
+            iv = np.full(n, np.nan)
+            iv[self.chain_no[atm]] = self.df[f'{side} Implied Volatility'].to_numpy(dtype=np.float64)[atm]
+            summary[f'ATM {side} IV'] = iv
+        strike = np.full(n, np.nan)
+        strike[self.chain_no[atm]] = self.df['Strike Price'].to_numpy(dtype=np.float64)[atm]
+        summary.insert(1, 'ATM Strike', strike)
+
+        if self.stocks is not None and 'symbol' in self.stocks.data:
+            quotes = self.stocks.data.drop_duplicates('symbol', keep='last').set_index('symbol')
+            quotes = quotes.reindex(self.symbols)
+            for column, name in STOCK_COLUMNS.items():
+                if column in quotes:
+                    summary[name] = quotes[column].to_numpy()
+        return summary
+
+    def top(self, metric: str, n: int = 10, ascending: bool = False, **kwargs) -> pd.DataFrame:
+        """ Return n snapshots with highest, or lowest if ascending, metric of summary(**kwargs) """
+        summary = self.summary(**kwargs)
+        if ascending:
+            return summary.nsmallest(n, metric)
+        return summary.nlargest(n, metric)
+
+    def aggregate(self, func: Union[str, dict, list] = 'sum', strikes_around_atm: int = None,
+                  expiry_rank: Union[int, List[int]] = None) -> pd.DataFrame:
+        """ Return func of columns of rows in ATM window and expiries, per Symbol and Time Stamp
+
+        A str or list func is applied to numeric columns only, a dict names its columns.
+        """
+        rows = self.select(strikes_around_atm, expiry_rank)
+        if not isinstance(func, dict):
+            numeric = [name for name in rows.columns[len(SCREEN_INDEX):]
+                       if pd.api.types.is_numeric_dtype(rows[name]) and not pd.api.types.is_bool_dtype(rows[name])]
+            rows = rows[SCREEN_INDEX + numeric]
+        return rows.groupby(SCREEN_INDEX, observed=True, sort=False).agg(func)
+
+    def top_strikes(self, column: str, n: int = 5, ascending: bool = False, strikes_around_atm: int = None,
+                    expiry_rank: Union[int, List[int]] = None) -> pd.DataFrame:
+        """ Return n rows with highest, or lowest if ascending, column of every snapshot """
+        keep = np.flatnonzero(self.mask(strikes_around_atm, expiry_rank))
+        values = self._values(column)[keep]
+        order = keep[np.lexsort((values if ascending else -values, self.chain_no[keep]))]
+        group = self.chain_no[order]
+        first = np.searchsorted(group, group)
+        return self.df.iloc[order[np.arange(len(order)) - first < n]]
+
+    def __repr__(self):
+        return f'MultiChain({len(self.chains)} snapshots, {len(self.df)} rows)'
@@ -0,0 +1,203 @@
+""" Bulk parsing of option chain payloads in a process pool
+
+Workers parse payloads into columns and copy numeric columns into one shared memory
+block per payload. Only column layout goes back through pickle, the parent maps the block
+and wraps its columns as OptionChain.df without copying::
+
+    chains = parse_many(record.content for record in Replayer('recording').records())
+    for chain in chains:
+        ...
+
+Raw response bodies (bytes) are the cheapest payloads to send to workers, decoded payload
+dicts have to be pickled whole.
+"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from nseapi.data_models import OptionChain
+from nseapi.requester import decode_option_chain, get_decoder
+
+ALIGNMENT = 64      # Byte alignment of columns in shared memory block
+_END = object()     # End of payloads, None is a payload like any other
+
+Payload = Union[bytes, str, dict]
+
+
+class _Column(NamedTuple):
+    name: str
+    dtype: str
+    offset: int                 # Byte offset of values in block, -1 if values are pickled
+    values: Optional[list]      # Object values, or categories of categorical column
+    categorical: bool
+
+
+class _Layout(NamedTuple):
+    shm_name: Optional[str]
+    rows: int
+    columns: Tuple[_Column, ...]
+    attrs: dict
+    time_stamp: Optional[str]
+
+
+class _Block(SharedMemory):
+    """ Attached block which stays mapped as long as arrays made from its buf """
+
+    def detach(self):
+        """ Unlink block and close its descriptor, pages are unmapped with last array using them """
+        self.unlink()
+        # Descriptor is only kept on POSIX, as private _fd of SharedMemory
+        fd = getattr(self, '_fd', -1)
+        if fd >= 0:
+            os.close(fd)
+            self._fd = -1
+
+    def __del__(self):
+        # close() would fail while arrays export buf
+        pass
+
+
+def _payload_dict(payload: Payload) -> dict:
+    content = getattr(payload, 'content', payload)
+    if isinstance(content, str):
+        content = content.encode()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return decode_option_chain(bytes(content), get_decoder())
+    return content
+
+
+def _parse(payload: Payload, compact: bool, columns: Optional[list], expiries,
+           strikes_around_atm: Optional[int]) -> _Layout:
+    """ Parse payload in worker and copy numeric columns to a new shared memory block """
+    data = _payload_dict(payload)
+    chain = OptionChain(data, compact=compact, columns=columns, expiries=expiries,
+                        strikes_around_atm=strikes_around_atm)
+    df = chain.df
+
+    arrays = []
+    layout = []
+    size = 0
+    for name in df.columns:
+        series = df[name]
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        values = series.cat.codes.values if categorical else series.values
+        if values.dtype.kind in 'biufmM':
+            arrays.append((size, values))
+            layout.append(_Column(name, values.dtype.str, size,
+                                  list(series.cat.categories) if categorical else None, categorical))
+            size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        else:
+            layout.append(_Column(name, values.dtype.str, -1, list(values), False))
+
+    shm_name = None
+    if size:
+        shm = SharedMemory(create=True, size=size)
+        try:
+            for offset, values in arrays:
+                np.ndarray(values.shape, values.dtype, buffer=shm.buf, offset=offset)[:] = values
+            shm_name = shm.name
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        # Parent unlinks block, so resource tracker of worker must not
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        shm.close()
+    time_stamp = None if chain.time_stamp is None else chain.time_stamp.isoformat()
+    return _Layout(shm_name, len(df), tuple(layout), dict(df.attrs), time_stamp)
+
+
+def _attach(layout: _Layout) -> OptionChain:
+    """ Wrap shared memory block of layout as OptionChain """
+    buffer = None
+    if layout.shm_name is not None:
+        block = _Block(layout.shm_name)
+        buffer = block.buf
+        block.detach()
+
+    columns = {}
+    for column in layout.columns:
+        if column.offset < 0:
+            columns[column.name] = np.array(column.values, dtype=column.dtype)
+            continue
+        values = np.ndarray((layout.rows,), np.dtype(column.dtype), buffer=buffer, offset=column.offset)
+        if column.categorical:
+            values = pd.Categorical.from_codes(values, categories=column.values)
+        columns[column.name] = values
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs.update(layout.attrs)
+
+    chain = OptionChain(df)
+    chain.time_stamp = None if layout.time_stamp is None else pd.Timestamp(layout.time_stamp).to_pydatetime()
+    return chain
+
+
+def _discard(layout: _Layout):
+    if layout.shm_name is not None:
+        shm = SharedMemory(layout.shm_name)
+        shm.close()
+        shm.unlink()
+
+
+def parse_many(payloads: Iterable[Payload], workers: int = None, ordered: bool = True,
+               max_pending: int = None, compact: bool = False, columns: list = None, expiries=None,
+               strikes_around_atm: int = None, mp_context=None) -> Iterator[OptionChain]:
+    """ Parse option chain payloads in worker processes
+
+    Payloads are read from iterator only as workers free up, so at most max_pending parsed
+    and unparsed payloads are held at a time.
+
+    Args:
+        payloads (Iterable[Payload]): raw response bodies, decoded payloads, or recorder.Record
+        workers (int, optional): worker processes. Defaults to None, which use os.cpu_count().
+        ordered (bool, optional): yield chains in order of payloads, else as soon as parsed. Defaults to True.
+        max_pending (int, optional): payloads submitted but not yet yielded. Defaults to 2 * workers.
+        compact (bool, optional): parse into compact DataFrames. Defaults to False.
+        columns (list, optional): columns to keep besides REQUIRED_COLUMNS. Defaults to None.
+        expiries (optional): only parse these expiries, see data_models.filter_records. Defaults to None.
+        strikes_around_atm (int, optional): only parse strikes around ATM strike. Defaults to None.
+        mp_context (optional): multiprocessing context of workers. Defaults to None.
+
+    Yields:
+        OptionChain: chain of every payload, df columns are backed by shared memory
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    if workers < 1 or max_pending < 1:
+        raise ValueError('workers and max_pending must be at least 1')
+
+    payloads = iter(payloads)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    payload = next(payloads, _END)
+                    if payload is _END:
+                        exhausted = True
+                        break
+                    pending.append(executor.submit(_parse, payload, compact, columns, expiries,
+                                                   strikes_around_atm))
+                if not pending:
+                    return
+
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = next(f for f in pending if f in done)
+                    pending.remove(future)
+                yield _attach(future.result())
+        finally:
+            # Consumer stopped early or parsing failed, free blocks of parsed payloads
+            for future in pending:
+                if not future.cancel():
+                    try:
+                        _discard(future.result())
+                    except Exception:
+                        pass
@@ -0,0 +1,377 @@
+""" Capture of raw NseApi responses and offline replay
+
+Layout of recording::
+
+    root/
+        segment-000001.nsr
+        segment-000002.nsr
+        ...
+
+A segment is a sequence of blocks, a block is::
+
+    header      magic, codec, compressed size, meta size, record count, first and last receive time
+    meta        json with symbols of records in block, not compressed
+    records     compressed with codec (zlib, zstd or none), every record is
+                    (receive time, meta size, body size) + json meta + raw response body
+
+Block headers are read without decompressing, so blocks outside a time range or without
+wanted symbols are skipped. A block left half written by a crash ends replay of its
+segment. Every run of a Recorder starts a new segment.
+
+zstd codec needs zstandard package, it decompresses several times faster than zlib.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time as t
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+import nseapi.constant as c
+from nseapi.data_models import IndexStocks, OptionChain
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+MAGIC = b'NSR1'
+BLOCK_HEADER = struct.Struct('<4sBIIIdd')   # magic, codec, compressed size, meta size, count, first, last
+RECORD_HEADER = struct.Struct('<dII')       # receive time, meta size, body size
+SEGMENT_GLOB = 'segment-*.nsr'
+
+TimeLike = Union[datetime, float, None]
+
+
+# Codec ids of block header
+CODECS = {'none': 0, 'zlib': 1, 'zstd': 2}
+# Raised by decompressors on corrupt block, replay stops at it like at a half written block
+DECOMPRESS_ERRORS = (zlib.error,) + ((_zstd.ZstdError,) if _zstd is not None else ())
+
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    if codec == 'zlib':
+        return zlib.compress(data, level)
+    if codec == 'zstd':
+        return _zstd.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def _decompress(codec_id: int, data: bytes) -> bytes:
+    if codec_id == CODECS['zlib']:
+        return zlib.decompress(data)
+    if codec_id == CODECS['zstd']:
+        if _zstd is None:
+            raise ImportError('zstandard is needed to replay zstd segments')
+        return _zstd.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _epoch(value: TimeLike) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def record_symbol(params: Optional[dict]) -> Optional[str]:
+    """ Return symbol a request was for, like NIFTY for option chain or stock list of NIFTY 50 """
+    if not params:
+        return None
+    symbol = params.get('symbol')
+    if symbol is None:
+        index = params.get('index')
+        symbol = c.NAME_TO_INDICES.get(index, index)
+    return symbol
+
+
+class Record(NamedTuple):
+    """ One recorded response """
+    received: float             # time.time() when response was recorded
+    url: str
+    params: dict
+    name: str                   # request_name given to NseApi._get
+    content: bytes              # raw response body
+
+    @property
+    def symbol(self) -> Optional[str]:
+        return record_symbol(self.params)
+
+    @property
+    def payload(self):
+        """ Return decoded json of response """
+        return json.loads(self.content)
+
+
+class _Block(NamedTuple):
+    """ Buffered records sealed for writing """
+    chunks: list
+    size: int
+    count: int
+    symbols: list
+    first: float
+    last: float
+
+
+class Recorder:
+    """ Stream raw responses to compressed segment files
+
+    Records are buffered and sealed as a block when block_bytes of responses are buffered,
+    on flush() and on close(). Blocks are compressed and written by a background thread,
+    so recording does not delay the request which filled a block. Segments are rolled
+    over after segment_bytes.
+    """
+    BLOCK_BYTES = 1024 * 1024
+    SEGMENT_BYTES = 256 * 1024 * 1024
+    QUEUE_BLOCKS = 8        # Sealed blocks waiting for writer thread before record() waits
+
+    def __init__(self, root: Union[str, Path], block_bytes: int = BLOCK_BYTES,
+                 segment_bytes: int = SEGMENT_BYTES, codec: str = 'zlib', level: int = 1, fsync: bool = False):
+        """ Stream raw responses to compressed segment files
+
+        Args:
+            root (Union[str, Path]): directory of segments
+            block_bytes (int, optional): uncompressed bytes buffered before a block is written.
+                Defaults to 1 MiB.
+            segment_bytes (int, optional): size after which a new segment is started. Defaults to 256 MiB.
+            codec (str, optional): zlib, zstd or none. Defaults to zlib.
+            level (int, optional): compression level. Defaults to 1.
+            fsync (bool, optional): fsync segment after every block. Defaults to False.
+        """
+        if codec not in CODECS:
+            raise ValueError(f'codec must be one of {list(CODECS)}')
+        if codec == 'zstd' and _zstd is None:
+            raise ImportError('zstd codec needs zstandard package')
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.block_bytes = block_bytes
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.fsync = fsync
+        self.records = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        self._buffer = []
+        self._buffered = 0
+        self._symbols = set()
+        self._first = None
+        self._last = None
+        self._file = None
+        self._segment = max((int(p.stem.split('-')[1]) for p in self.root.glob(SEGMENT_GLOB)), default=0)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(self.QUEUE_BLOCKS)
+        self._writer = None
+        self._error = None
+
+    def record(self, url: str, params: Optional[dict], name: Optional[str], content: bytes,
+               received: Optional[float] = None):
+        """ Buffer raw response body with request metadata
+
+        Args:
+            url (str): url of request
+            params (dict, optional): params of request
+            name (str, optional): request name
+            content (bytes): raw response body
+            received (float, optional): time.time() of response. Defaults to None, which use now.
+        """
+        meta = json.dumps([url, params or {}, name], separators=(',', ':')).encode()
+        with self._lock:
+            if received is None:
+                received = t.time()
+            self._buffer.append(RECORD_HEADER.pack(received, len(meta), len(content)))
+            self._buffer.append(meta)
+            self._buffer.append(content)
+            self._buffered += RECORD_HEADER.size + len(meta) + len(content)
+            self._first = received if self._first is None else min(self._first, received)
+            self._last = received if self._last is None else max(self._last, received)
+            symbol = record_symbol(params)
+            if symbol is not None:
+                self._symbols.add(symbol)
+            self.records += 1
+            if self._buffered >= self.block_bytes:
+                self._submit(self._seal())
+
+    def flush(self):
+        """ Write buffered records and wait till every sealed block is written
+
+        Raises:
+            OSError: if writing a block failed since last flush
+        """
+        with self._lock:
+            block = self._seal()
+            if block is not None:
+                self._submit(block)
+        self._queue.join()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """ Write buffered records, stop writer thread and close segment """
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._writer is not None:
+                    self._queue.put(None)
+                    self._writer.join()
+                    self._writer = None
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+    def _seal(self) -> Optional[_Block]:
+        """ Return buffered records as block and start a new buffer, called with lock held """
+        if not self._buffer:
+            return None
+        block = _Block(self._buffer, self._buffered, len(self._buffer) // 3, sorted(self._symbols),
+                       self._first, self._last)
+        self._buffer = []
+        self._buffered = 0
+        self._symbols = set()
+        self._first = None
+        self._last = None
+        return block
+
+    def _submit(self, block: _Block):
+        """ Queue block for writer thread, called with lock held so blocks keep their order """
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name='NseApi-Recorder', daemon=True)
+            self._writer.start()
+        self._queue.put(block)
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            try:
+                if block is None:
+                    return
+                self._write_block(block)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_block(self, block: _Block):
+        data = _compress(self.codec, b''.join(block.chunks), self.level)
+        meta = json.dumps({'symbols': block.symbols}, separators=(',', ':')).encode()
+        header = BLOCK_HEADER.pack(MAGIC, CODECS[self.codec], len(data), len(meta), block.count, block.first,
+                                   block.last)
+
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            if self._file is not None:
+                self._file.close()
+            self._segment += 1
+            self._file = open(self.root.joinpath(f'segment-{self._segment:06d}.nsr'), 'ab')
+        self._file.write(header + meta + data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+        self.bytes_in += block.size
+        self.bytes_out += len(header) + len(meta) + len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Replayer:
+    """ Iterate responses recorded by Recorder in time order
+
+    records() yields raw Record without decoding json, iterating a Replayer yields
+    (Record, OptionChain or IndexStocks) built from every option chain and stock list
+    response.
+    """
+
+    def __init__(self, root: Union[str, Path], start: TimeLike = None, end: TimeLike = None,
+                 symbols: Iterable[str] = None, compact: bool = False):
+        """ Replay recorded responses
+
+        Args:
+            root (Union[str, Path]): directory of segments
+            start (TimeLike, optional): first receive time, datetime or time.time(). Defaults to None.
+            end (TimeLike, optional): last receive time. Defaults to None.
+            symbols (Iterable[str], optional): only replay these symbols. Defaults to None, which replay all.
+            compact (bool, optional): build compact OptionChains. Defaults to False.
+        """
+        self.root = Path(root)
+        self.start = _epoch(start)
+        self.end = _epoch(end)
+        self.symbols = None if symbols is None else {s.upper() for s in symbols}
+        self.compact = compact
+
+    def seek(self, when: TimeLike) -> 'Replayer':
+        """ Start next iteration at first record received at or after when """
+        self.start = _epoch(when)
+        return self
+
+    @property
+    def segments(self) -> list:
+        return sorted(self.root.glob(SEGMENT_GLOB))
+
+    def records(self) -> Iterator[Record]:
+        """ Yield raw records in range and of symbols """
+        for path in self.segments:
+            yield from self._segment_records(path)
+
+    def _blocks(self, path: Path) -> Iterator[bytes]:
+        """ Yield decompressed blocks of segment which may hold wanted records """
+        start, end, symbols = self.start, self.end, self.symbols
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(BLOCK_HEADER.size)
+                if len(header) < BLOCK_HEADER.size:
+                    return
+                magic, codec_id, size, meta_size, count, first, last = BLOCK_HEADER.unpack(header)
+                if magic != MAGIC:
+                    return
+                meta = f.read(meta_size)
+                skip = (start is not None and last < start) or (end is not None and first > end)
+                if not skip and symbols is not None:
+                    block_symbols = json.loads(meta)['symbols']
+                    skip = symbols.isdisjoint(block_symbols)
+                if skip:
+                    f.seek(size, os.SEEK_CUR)
+                    continue
+                data = f.read(size)
+                if len(data) < size:
+                    # Half written block
+                    return
+                try:
+                    block = _decompress(codec_id, data)
+                except DECOMPRESS_ERRORS:
+                    return
+                yield block
+
+    def _segment_records(self, path: Path) -> Iterator[Record]:
+        start, end, symbols = self.start, self.end, self.symbols
+        unpack = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        for block in self._blocks(path):
+            view = memoryview(block)
+            position = 0
+            while position < len(block):
+                received, meta_size, body_size = unpack(block, position)
+                position += header_size
+                meta_end = position + meta_size
+                body_end = meta_end + body_size
+                if (start is None or received >= start) and (end is None or received <= end):
+                    url, params, name = json.loads(block[position:meta_end])
+                    if symbols is None or record_symbol(params) in symbols:
+                        yield Record(received, url, params, name, bytes(view[meta_end:body_end]))
+                position = body_end
+
+    def __iter__(self) -> Iterator[Tuple[Record, Union[OptionChain, IndexStocks]]]:
+        # Dispatched on request name, urls differ between NSE, FakeNseServer and older recordings
+        for record in self.records():
+            if record.name == c.REQUEST_OPTION_CHAIN:
+                yield record, OptionChain(record.payload, compact=self.compact)
+            elif record.name == c.REQUEST_STOCK_LIST:
+                yield record, IndexStocks().add_data(record.payload)
@@ -1,16 +1,44 @@
 import os
 import json
-import pickle
 import requests
 import urllib3
 import nseapi.constant as c
 from nseapi.logger import get_logger
 from nseapi.data_models import IndexStocks, OptionChain
+from nseapi.stream import ChainDiff, ChainStream
+from nseapi.cache import ResponseCache
+import nseapi.metrics as m
+from nseapi.recorder import Recorder
+from nseapi.retry import AUTH, FATAL, CircuitBreaker, RetryMetrics, RetryPolicy, classify_exception, \
+    classify_status
 import time as t
 import socket
-from nseapi.generic import validate_directory
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+from nseapi.session import SessionManager, default_cookie_path
+from nseapi.transport import Transport
 import logging as _logging
 
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+try:
+    import ujson as _ujson
+except ImportError:
+    _ujson = None
+
+# Json decoders of response bytes by name, fastest first
+JSON_DECODERS = {}
+if _orjson is not None:
+    JSON_DECODERS['orjson'] = _orjson.loads
+if _ujson is not None:
+    JSON_DECODERS['ujson'] = _ujson.loads
+JSON_DECODERS['json'] = json.loads
+
 
 def gen_cookie_from_main_page(res):
     cookies = {}
@@ -36,10 +64,48 @@ def validate_res(res):
     else:
         return False
 
+
+def get_decoder(decoder: Union[str, Callable[[bytes], object], None] = None) -> Callable[[bytes], object]:
+    """ Return json decoder of response bytes
+
+    Args:
+        decoder (Union[str, Callable], optional): name in JSON_DECODERS or function decoding bytes.
+            Defaults to None, which return fastest installed decoder.
+
+    Returns:
+        Callable[[bytes], object]: decoder
+    """
+    if decoder is None:
+        return next(iter(JSON_DECODERS.values()))
+    if callable(decoder):
+        return decoder
+    try:
+        return JSON_DECODERS[decoder]
+    except KeyError:
+        raise ValueError(f'decoder must be one of {list(JSON_DECODERS)}') from None
+
+
+def decode_option_chain(content: bytes, decoder: Callable[[bytes], object] = json.loads) -> dict:
+    """ Decode option chain response and drop its filtered section, which is not parsed """
+    data = decoder(content)
+    if isinstance(data, dict):
+        data.pop('filtered', None)
+    return data
+
+
+def is_index(symbol: str) -> bool:
+    """ Return True if option chain of symbol is served from URL_INDICES """
+    return symbol.upper() in c.OPTION_INDICES
+
+
 class NseApi:
     RETRY_INTERVAL = 0.5    # In seconds
     MAX_RETRY = 3
     TIMEOUT = 10
+    CONCURRENCY = 8         # Max in-flight requests for batch methods
+    DEADLINE = 30           # Max seconds per request including retries
+    BREAKER_FAILURES = 5    # Consecutive failures which open circuit breaker of endpoint
+    BREAKER_RESET = 30      # Seconds circuit breaker stays open
     REQUEST_EXCEPTION = (requests.exceptions.Timeout,
                          requests.exceptions.ConnectionError,
                          requests.exceptions.HTTPError,
@@ -49,71 +115,250 @@ class NseApi:
                          urllib3.exceptions.NewConnectionError
                          )
 
-    def __init__(self, debug: bool=False, save_path=None, cache: bool = False):
+    def __init__(self, debug: bool=False, save_path=None, cache: bool = False,
+                 response_cache: ResponseCache = None, cookie_path: Union[str, Path] = None,
+                 session_pool: int = 2, background_refresh: bool = True, retry_policy: RetryPolicy = None,
+                 compact: bool = False, recorder: Recorder = None, lazy: bool = False,
+                 json_decoder: Union[str, Callable[[bytes], object]] = None, transport: Transport = None):
         """ NSE website scrapper
 
         Args:
             debug (bool, optional): True will log. Defaults to False.
             save_path ([type], optional): path to save log report. Defaults to None.
-            cache (bool, optional): save cookies. Defaults to False.
+            cache (bool, optional): save cookies to session.default_cookie_path() if cookie_path
+                is not given. Defaults to False.
+            response_cache (ResponseCache, optional): cache of responses shared by requests. Defaults to None.
+            cookie_path (Union[str, Path], optional): json file to save cookies. Defaults to None.
+            session_pool (int, optional): number of cookie-warmed sessions kept ready. Defaults to 2.
+            background_refresh (bool, optional): refresh cookies in background before they expire.
+                Defaults to True.
+            retry_policy (RetryPolicy, optional): backoff of failed requests. Defaults to None,
+                which use MAX_RETRY, RETRY_INTERVAL and DEADLINE.
+            compact (bool, optional): parse option chains into compact DataFrames. Defaults to False.
+            recorder (Recorder, optional): records raw body of every response. Defaults to None.
+            lazy (bool, optional): do not load main page here. It is loaded by background refresh
+                if background_refresh is True, else by first request. Defaults to False.
+            json_decoder (Union[str, Callable], optional): orjson, ujson, json or function decoding
+                response bytes. Defaults to None, which use fastest installed.
+            transport (Transport, optional): keep-alive connection pools and byte counters of sessions.
+                Defaults to None, which use Transport.shared() of the process.
         """
         self._internet_connectivity = False
-        self.__cache = cache
-        self.__cache_path = None
+        if cookie_path is None and cache:
+            cookie_path = default_cookie_path()
+        self.response_cache = response_cache
+        self.compact = compact
+        self.recorder = recorder
+        self.json_decoder = get_decoder(json_decoder)
+        self.transport = transport or Transport.shared()
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=self.MAX_RETRY,
+                                                        base_delay=self.RETRY_INTERVAL, deadline=self.DEADLINE)
+        self.retry_metrics = RetryMetrics()
+        self.breakers = {}
+        self._init_lock = threading.Lock()
+        self._session_generation = 0
 
         self.logger = get_logger('NseApi', save_path)
         if not debug:
             self.logger.setLevel(_logging.WARNING)
 
         self.symbols_details = IndexStocks()
-        self.session = requests.Session()
-        self.session.headers.update(c.HEADER)
-        self.main_page_loaded = False
-        self._validate_directories()
-        self.init()
+        self.sessions = SessionManager(c.HEADER, pool_size=session_pool, cookie_path=cookie_path,
+                                       timeout=self.TIMEOUT, background=False, logger=self.logger,
+                                       transport=self.transport)
+        self.mount_adapters(self.CONCURRENCY)
+        if not lazy:
+            self.ensure_init()
+        if background_refresh:
+            self.sessions.start()
+
+    @property
+    def session(self) -> requests.Session:
+        """ Return active cookie-warmed session """
+        return self.sessions.session
+
+    @property
+    def main_page_loaded(self) -> bool:
+        """ True if active session has unexpired main page cookies """
+        return self.sessions.ready
 
-    def option_chain(self, symbol: str, index: bool):
+    def option_chain(self, symbol: str, index: bool, expiries=None, strikes_around_atm: int = None,
+                     columns: list = None):
         """ Return OptionChain Data for symobl
 
+        Filters are applied to raw records, so records left out are never parsed.
+
         Args:
             symbol (str): symbol of stock or index
             index (bool): True if symbol is index else False
+            expiries (optional): expiry group like near or monthly, number of nearest expiries, or
+                expiry dates, see data_models.filter_records. Defaults to None, which keep all.
+            strikes_around_atm (int, optional): strikes kept below and above ATM strike. Defaults to None.
+            columns (list, optional): columns to keep besides REQUIRED_COLUMNS. Defaults to None.
 
         Returns:
             [pandas.DataFrame]:
         """
-        params = {'symbol': symbol.upper()}
         try:
-            res = None
-            if index:
-                res = self._get(c.URL_INDICES, params, 'Open Interest')
-            else:
-                res = self._get(c.URL_EQUITIES, params, 'Open Interest')
-
+            res = self.option_chain_payload(symbol, index)
             if res is None:
                 return None
+            elif expiries is not None or strikes_around_atm is not None or columns is not None:
+                # Parsed cache holds whole chains only
+                return OptionChain(res, compact=self.compact, columns=columns, expiries=expiries,
+                                   strikes_around_atm=strikes_around_atm)
             else:
-                return OptionChain(res)
+                return self.parse_option_chain(res, symbol, index)
         except KeyError as e:
             self.logger.exception('Symbol: {} has error:'.format(symbol), exc_info=True)
 
-    def index_stocks(self, indices_symbols: list):
+    @staticmethod
+    def _option_chain_request(symbol: str, index: bool) -> Tuple[str, dict]:
+        params = {'symbol': symbol.upper()}
+        if index:
+            return c.URL_INDICES, params
+        else:
+            return c.URL_EQUITIES, params
+
+    def option_chain_payload(self, symbol: str, index: bool) -> Optional[dict]:
+        """ Return decoded option chain payload of symbol, None if request failed
+
+        Parse it with parse_option_chain, so wrappers like AsyncNseApi and PollScheduler can
+        look at records timestamp before paying for parsing.
+        """
+        url, params = self._option_chain_request(symbol, index)
+        return self._get(url, params, c.REQUEST_OPTION_CHAIN, decode=self._decode_option_chain)
+
+    def _decode_option_chain(self, content: bytes) -> dict:
+        return decode_option_chain(content, self.json_decoder)
+
+    def parse_option_chain(self, res: dict, symbol: str, index: bool) -> OptionChain:
+        """ Return OptionChain of option_chain_payload, reusing cached OptionChain of same records timestamp """
+        if self.response_cache is None:
+            return OptionChain(res, compact=self.compact)
+
+        key = self.response_cache.key(*self._option_chain_request(symbol, index))
+        time_stamp = res['records'].get('timestamp')
+        chain = self.response_cache.get_parsed(key, time_stamp)
+        if chain is not None:
+            m.sink.increment('nseapi_cache_hits_total', kind='parsed')
+        else:
+            chain = OptionChain(res, compact=self.compact)
+            self.response_cache.put_parsed(key, time_stamp, chain)
+        # Cached chain is shared, callers get a copy they can set columns of
+        return chain.copy()
+
+    def option_chains(self, symbols: Iterable[str], index: Optional[bool] = None,
+                      concurrency: int = CONCURRENCY) -> Iterator[Tuple[str, Optional[OptionChain]]]:
+        """ Fetch OptionChain of many symbols concurrently over the shared session
+
+        Main page cookies are loaded once before any request is sent, all workers then
+        reuse the same cookie-warmed connection pool.
+
+        Args:
+            symbols (Iterable[str]): symbols of stocks and/or indices
+            index (bool, optional): True if all symbols are indices, False if all are stocks.
+                Defaults to None, which decide per symbol from constant.OPTION_INDICES.
+            concurrency (int, optional): max requests in flight. Defaults to CONCURRENCY.
+
+        Yields:
+            Tuple[str, OptionChain]: (symbol, OptionChain) in order of completion.
+                OptionChain is None if symbol could not be fetched.
+        """
+        symbols = [s.upper() for s in symbols]
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        if not symbols:
+            return
+
+        self.mount_adapters(concurrency)
+        self.ensure_init()
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(symbols)),
+                                thread_name_prefix='NseApi') as executor:
+            futures = {}
+            for symbol in symbols:
+                symbol_index = is_index(symbol) if index is None else index
+                futures[executor.submit(self.option_chain, symbol, symbol_index)] = symbol
+
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def subscribe(self, symbols: Iterable[str], callback: Callable[[ChainDiff], None], interval: float = 60,
+                  index: Optional[bool] = None, fields: List[str] = None, concurrency: int = CONCURRENCY,
+                  stop_event: threading.Event = None, stream: ChainStream = None):
+        """ Poll option chain of symbols and call callback with changes of every new snapshot
+
+        Polls whose records timestamp has not moved since last snapshot of symbol are dropped
+        before parsing. First snapshot of every symbol is passed with all strikes marked New.
+        Blocks until stop_event is set.
+
+        Args:
+            symbols (Iterable[str]): symbols of stocks and/or indices
+            callback (Callable[[ChainDiff], None]): called from this thread for every new snapshot
+            interval (float, optional): seconds between polls of a symbol. Defaults to 60.
+            index (bool, optional): True if all symbols are indices. Defaults to None, which decide per symbol.
+            fields (List[str], optional): fields compared for Call and Put. Defaults to stream.DIFF_FIELDS.
+            concurrency (int, optional): max requests in flight. Defaults to CONCURRENCY.
+            stop_event (threading.Event, optional): set to stop polling. Defaults to None, which poll forever.
+            stream (ChainStream, optional): last snapshots to continue from. Defaults to None.
+        """
+        symbols = [s.upper() for s in symbols]
+        stop_event = stop_event or threading.Event()
+        stream = stream or ChainStream(fields)
+        self.mount_adapters(concurrency)
+
+        def poll(symbol):
+            symbol_index = is_index(symbol) if index is None else index
+            res = self.option_chain_payload(symbol, symbol_index)
+            if res is None or not stream.is_new(symbol, res['records'].get('timestamp')):
+                return None
+            return stream.update(self.parse_option_chain(res, symbol, symbol_index), symbol)
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(symbols)) or 1,
+                                thread_name_prefix='NseApi') as executor:
+            while not stop_event.is_set():
+                started = t.monotonic()
+                futures = [executor.submit(poll, symbol) for symbol in symbols]
+                for future in as_completed(futures):
+                    try:
+                        diff = future.result()
+                    except Exception:
+                        self.logger.exception('Subscription poll has error', exc_info=True)
+                        continue
+                    if diff is not None:
+                        callback(diff)
+                stop_event.wait(max(0.0, interval - (t.monotonic() - started)))
+
+    def index_stocks(self, indices_symbols: list, concurrency: int = CONCURRENCY):
         """ Return combine list of stocks for indices stocks
         :param indices_symbols: (str): name of index like NIFTY, BANKNIFTY
+        :param concurrency: (int): max requests in flight
         :return: IndexStocks
         """
         self.logger.info('Requesting stock list of Index')
 
+        names = [c.INDICES_TO_NAME[i.upper()] for i in indices_symbols]
+        if not names:
+            return self.symbols_details
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+
+        self.mount_adapters(concurrency)
+        self.ensure_init()
+
         none_result = set()
-        for i in indices_symbols:
-            i = c.INDICES_TO_NAME[i.upper()]
-            params = {'index': i}
-            res = self._get(c.URL_STOCK_LIST, params=params, request_name='Stock List')
-            if res is not None:
-                self.symbols_details.add_data(res)
-            else:
-                self.logger.error(f'Indices: {i} has none response')
-                none_result.add(res)
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(names)),
+                                thread_name_prefix='NseApi') as executor:
+            futures = [executor.submit(self._get, c.URL_STOCK_LIST, {'index': i}, c.REQUEST_STOCK_LIST) for i in names]
+            # Added in request order, so symbols in many indices keep row of last index asked
+            for i, future in zip(names, futures):
+                res = future.result()
+                if res is not None:
+                    self.symbols_details.add_data(res)
+                else:
+                    self.logger.error(f'Indices: {i} has none response')
+                    none_result.add(i)
         if len(none_result) > 0:
             self.logger.error(f"indices: {str(indices_symbols)} has one or more than none response")
             return None
@@ -123,67 +368,142 @@ class NseApi:
     def init(self):
         """ this will load main page of nse website
         """
-        try:
-            self.logger.debug('main page - Requesting ')
-            res = self.session.get(c.URL_MAIN, timeout=self.TIMEOUT)
-            if validate_res(res):
-                self.main_page_loaded = True
-                
-                # Save cookies
-                if self.__cache:
-                    with open(self.__cache_path, 'wb') as f:
-                        pickle.dump(self.session.cookies, f)
-                self.logger.debug('Main Page - loaded')
-            else:
-                self.logger.error(f'Main Page - loading Failed - Not valid response, Status Code: {res.status_code}')
-        except self.REQUEST_EXCEPTION as e:
-            self.logger.error(f'Main Page - Network error in load Main Page')
-        except Exception:
-            self.logger.exception('Main page - has an error', exc_info=True)
+        with self._init_lock:
+            self._init()
 
-    def _get(self, url, params=None, request_name=None, timeout=TIMEOUT):
+    def ensure_init(self):
+        """ Load main page unless active session is warm, waiting for a background warm-up in progress """
+        with self._init_lock:
+            if not self.main_page_loaded and self.sessions.ensure_ready():
+                self._session_generation += 1
+
+    def _reinit(self, generation: int):
+        """ Swap in fresh session unless another thread already did it after generation """
+        with self._init_lock:
+            if self._session_generation == generation:
+                self.sessions.invalidate()
+                self._init()
+
+    def _init(self):
+        if self.sessions.refresh():
+            self._session_generation += 1
+            m.sink.increment('nseapi_reinits_total')
+
+    def close(self):
+        """ Stop background cookie refresh and close sessions, pooled connections of transport stay open """
+        self.sessions.close()
+        if self.recorder is not None:
+            self.recorder.flush()
+
+    def _get(self, url, params=None, request_name=None, timeout=TIMEOUT,
+             decode: Callable[[bytes], object] = None):
         res_data = None
-        for i in range(1, self.MAX_RETRY + 1):
-            self.logger.debug(f'{request_name} - Sending Request - Try: {i} - params: {str(params)}')
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.key(url, params)
+            res_data = self.response_cache.get(cache_key)
+            if res_data is not None:
+                m.sink.increment('nseapi_cache_hits_total', kind='response')
+                self.logger.debug('%s - Served from cache %s', request_name, params)
+                return res_data
+            m.sink.increment('nseapi_cache_misses_total', kind='response')
+
+        sink = m.sink
+        breaker = self._breaker(url)
+        if not breaker.allow():
+            sink.increment('nseapi_breaker_rejections_total', endpoint=request_name)
+            self.retry_metrics.increment('breaker_rejections')
+            self.logger.error('%s: circuit breaker open, request not sent', request_name)
+            return None
+
+        started = t.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.logger.debug('%s - Sending Request - Try: %s - params: %s', request_name, attempt, params)
+            self.retry_metrics.increment('attempts')
+            generation = self._session_generation
 
             try:
-                if self.main_page_loaded:
-                    res = self.session.get(url, params=params, timeout=timeout)
-                    if validate_res(res):
-                        self.logger.debug(f'{request_name} - Response Received {str(params)}')
-                        return res.json()
-                    else:
-                        self.logger.error(f'{request_name}: Not Validate Response, Status Code: {res.status_code}')
-                        t.sleep(self.RETRY_INTERVAL)
-                        self.main_page_loaded = False
-                        self.init()
-                else:
-                    self.logger.error('Main Page still not loaded. Load Main Page First')
-                    self.init()
-
-            except self.REQUEST_EXCEPTION as rc:
-                self.logger.error(f'{request_name}: has network error')
-                break
-            except json.decoder.JSONDecodeError as e:
-                self.logger.exception(f'{request_name}: Not Valid Json Data')
+                if not self.main_page_loaded:
+                    self.logger.debug('Main Page not loaded, loading it')
+                    self.ensure_init()
+                request_timeout = max(0.1, min(timeout, self.retry_policy.remaining(started)))
+                sent = t.perf_counter()
+                res = self.session.get(url, params=params, timeout=request_timeout)
+                wire = self.transport.record(request_name, res)
+                if sink.enabled:
+                    # elapsed is time till headers arrived, connecting included
+                    ttfb = res.elapsed.total_seconds()
+                    sink.observe('nseapi_request_seconds', ttfb, endpoint=request_name, phase='ttfb')
+                    sink.observe('nseapi_request_seconds', max(0.0, t.perf_counter() - sent - ttfb),
+                                 endpoint=request_name, phase='download')
+                    sink.increment('nseapi_requests_total', endpoint=request_name, status=res.status_code)
+                    sink.increment('nseapi_response_bytes_total', len(res.content), endpoint=request_name)
+                    sink.increment('nseapi_wire_bytes_total', wire, endpoint=request_name)
+                if validate_res(res):
+                    self.logger.debug('%s - Response Received %s', request_name, params)
+                    with sink.span('nseapi_stage_seconds', stage='decode'):
+                        res_data = (decode or self.json_decoder)(res.content)
+                    if self.recorder is not None:
+                        self.recorder.record(url, params, request_name, res.content)
+                    breaker.record_success()
+                    self.retry_metrics.increment('successes')
+                    if cache_key is not None:
+                        self.response_cache.put(cache_key, res_data, len(res.content))
+                    return res_data
+                error = classify_status(res.status_code)
+                self.logger.error('%s: Not Validate Response, Status Code: %s', request_name, res.status_code)
+            except self.REQUEST_EXCEPTION as e:
+                error = classify_exception(e)
+                sink.increment('nseapi_requests_total', endpoint=request_name, status='network_error')
+                self.logger.error('%s: has network error', request_name)
+            except ValueError as e:
+                error = classify_exception(e)
+                self.logger.exception('%s: Not Valid Json Data', request_name)
             except Exception as e:
-                self.main_page_loaded = False
-                t.sleep(self.RETRY_INTERVAL)
-                self.init()
-                self.logger.exception(f'Name:{request_name}, Params: {params}', exc_info=True)
-
-        return res_data
-
-    def _validate_directories(self):
-        dir_path = c.HOME_DIR_PATH.joinpath('bin')
-        validate_directory(dir_path)
-        self.__cache_path = dir_path.joinpath('main_page_cookies.pickle')
-    
-    def _load_main_page_cookies(self):
-        if self.__cache:
-            try:
-                self.logger.debug('loading cached cookies')
-                with open(self.__cache_path, 'rb') as f:
-                    self.session.cookies = pickle.load(f)
-            except FileNotFoundError:
-                self.init()
+                error = classify_exception(e)
+                self.logger.exception('Name:%s, Params: %s', request_name, params, exc_info=True)
+
+            self.retry_metrics.increment(f'errors_{error}')
+            sink.increment('nseapi_errors_total', endpoint=request_name, error=error)
+            if error == AUTH:
+                # Cookies rejected, NSE itself is fine
+                self._reinit(generation)
+                breaker.release()
+            elif error == FATAL:
+                breaker.release()
+            else:
+                breaker.record_failure()
+
+            delay = self.retry_policy.delay(attempt, error)
+            if not self.retry_policy.should_retry(error, attempt, started, delay):
+                if self.retry_policy.remaining(started) <= delay:
+                    self.retry_metrics.increment('deadline_exceeded')
+                self.retry_metrics.increment('failures')
+                sink.increment('nseapi_failures_total', endpoint=request_name)
+                return None
+            if not breaker.allow():
+                sink.increment('nseapi_breaker_rejections_total', endpoint=request_name)
+                self.retry_metrics.increment('breaker_rejections')
+                self.logger.error('%s: circuit breaker open, giving up', request_name)
+                self.retry_metrics.increment('failures')
+                return None
+            self.retry_metrics.increment('retries')
+            sink.increment('nseapi_retries_total', endpoint=request_name)
+            t.sleep(delay)
+
+    @property
+    def metrics(self) -> dict:
+        """ Return request, retry and circuit breaker counters """
+        return self.retry_metrics.as_dict(self.breakers)
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = self.breakers.setdefault(url, CircuitBreaker(self.BREAKER_FAILURES, self.BREAKER_RESET))
+        return breaker
+
+    def mount_adapters(self, pool_size: int):
+        """ Size session connection pool so concurrent requests reuse keep-alive connections """
+        self.sessions.mount_adapters(pool_size)
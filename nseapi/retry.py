@@ -0,0 +1,168 @@
+import random
+import threading
+import time as t
+from collections import Counter
+from typing import Optional
+import requests
+import urllib3
+
+# Error classes
+THROTTLED = 'throttled'     # NSE asks to slow down
+AUTH = 'auth'               # Cookies rejected, session has to be refreshed
+TRANSIENT = 'transient'     # Network error or server error, worth retrying
+BAD_JSON = 'bad_json'       # 200 response with body which is not json, like an error page
+FATAL = 'fatal'             # Request itself is wrong, or a local bug, retrying does not help
+
+THROTTLED_STATUS = {429, 503}
+AUTH_STATUS = {401, 403}
+
+
+def classify_status(status_code: int) -> str:
+    """ Return error class of non 200 response status code """
+    if status_code in THROTTLED_STATUS:
+        return THROTTLED
+    if status_code in AUTH_STATUS:
+        return AUTH
+    if status_code >= 500 or status_code == 408:
+        return TRANSIENT
+    return FATAL
+
+
+def classify_exception(exception: BaseException) -> str:
+    """ Return error class of exception raised while sending request or decoding response """
+    if isinstance(exception, ValueError):
+        # json.JSONDecodeError and requests JSONDecodeError are both ValueError
+        return BAD_JSON
+    if isinstance(exception, (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError)):
+        return TRANSIENT
+    # Anything unexpected, like TypeError in decoding or recording, says nothing about endpoint health
+    return FATAL
+
+
+class RetryPolicy:
+    """ Exponential backoff with full jitter bounded by a per request deadline """
+    RETRYABLE = {THROTTLED, AUTH, TRANSIENT, BAD_JSON}
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 30.0, throttle_factor: float = 4.0, jitter: bool = True):
+        """ Exponential backoff with jitter
+
+        Args:
+            max_attempts (int, optional): max requests sent for one call. Defaults to 3.
+            base_delay (float, optional): delay before first retry in seconds. Defaults to 0.5.
+            max_delay (float, optional): max delay between attempts in seconds. Defaults to 8.0.
+            deadline (float, optional): max seconds spent on one call including retries. Defaults to 30.0.
+            throttle_factor (float, optional): delay multiplier when NSE throttles. Defaults to 4.0.
+            jitter (bool, optional): randomize delay between 0 and backoff. Defaults to True.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.throttle_factor = throttle_factor
+        self.jitter = jitter
+
+    def delay(self, attempt: int, error: str) -> float:
+        """ Return seconds to wait after failed attempt (1 based) """
+        if error == AUTH and attempt == 1:
+            # Fresh session is swapped in, no need to wait
+            return 0.0
+        backoff = self.base_delay * 2 ** (attempt - 1)
+        if error == THROTTLED:
+            backoff *= self.throttle_factor
+        backoff = min(backoff, self.max_delay)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+    def remaining(self, started: float) -> float:
+        """ Return seconds left till deadline of call started at time.monotonic() started """
+        return self.deadline - (t.monotonic() - started)
+
+    def should_retry(self, error: str, attempt: int, started: float, delay: float) -> bool:
+        """ Return True if another attempt fits in attempts and deadline """
+        return error in self.RETRYABLE and attempt < self.max_attempts and delay < self.remaining(started)
+
+
+class CircuitBreaker:
+    """ Fail fast while an endpoint keeps failing
+
+    After failure_threshold consecutive failures the breaker opens and calls are rejected
+    for reset_timeout seconds, then one trial call is let through (half open). Success of
+    trial closes the breaker, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self.rejections = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and t.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """ Return True if a call may be sent now """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and t.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def release(self):
+        """ Finish call whose outcome says nothing about endpoint health, like rejected cookies """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = t.monotonic()
+                self._trial_in_flight = False
+
+
+class RetryMetrics:
+    """ Thread safe counters of NseApi requests, retries and breaker activity """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+
+    def as_dict(self, breakers: Optional[dict] = None) -> dict:
+        """ Return counters, with trips and rejections of breakers by endpoint if given """
+        with self._lock:
+            data = dict(self.counts)
+        if breakers:
+            data['breakers'] = {url: {'state': b.state, 'trips': b.trips, 'rejections': b.rejections}
+                                for url, b in breakers.items()}
+        return data
@@ -0,0 +1,346 @@
+import heapq
+import itertools
+import random
+import threading
+import time as t
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from nseapi.data_models import OptionChain, parse_time_stamp
+from nseapi.requester import NseApi, is_index
+
+
+class TokenBucket:
+    """ Thread safe token bucket rate limiter """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """ Token bucket rate limiter
+
+        Args:
+            rate (float): tokens added per second
+            burst (int, optional): max tokens in bucket. Defaults to 1.
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = t.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """ Return tokens available now """
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self) -> float:
+        """ Take one token if available
+
+        Returns:
+            float: 0 if token was taken else seconds to wait for next token
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """ Block till a token is taken or timeout is over
+
+        Returns:
+            bool: True if token was taken
+        """
+        deadline = None if timeout is None else t.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - t.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            t.sleep(wait)
+
+    def _refill(self):
+        now = t.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class SymbolState:
+    """ Polling state of one symbol
+
+    Attributes:
+        interval (float): seconds between polls until update cadence is learned
+        cadence (float): learned seconds between NSE updates of symbol, None until learned
+        time_stamp (datetime): records timestamp of last snapshot
+        due (float): time.monotonic() of next poll
+    """
+
+    def __init__(self, symbol: str, index: bool, priority: int, interval: float):
+        self.symbol = symbol
+        self.index = index
+        self.priority = priority
+        self.interval = interval
+        self.cadence = None
+        self.time_stamp = None
+        self.due = t.monotonic()
+        self.polls = 0
+        self.changes = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.failures = 0
+        self.lag = 0.0
+
+
+class PollScheduler:
+    """ Poll option chains of many symbols with global rate limit
+
+    Every symbol is polled on its own schedule. Until NSE update cadence of a symbol is
+    learned it is polled every interval seconds, after that it is polled just after its
+    next update is expected. Due polls are dispatched by priority (lower first) through
+    a token bucket shared by all symbols.
+    """
+    INDEX_INTERVAL = 30         # In seconds
+    STOCK_INTERVAL = 120        # In seconds
+    INDEX_PRIORITY = 0
+    STOCK_PRIORITY = 1
+    CADENCE_ALPHA = 0.3         # Weight of latest observation in learned cadence
+    POLL_DELAY = 1.0            # Poll this many seconds after expected update
+    MIN_INTERVAL = 3.0          # In seconds
+    MAX_INTERVAL = 600.0        # In seconds
+
+    def __init__(self, api: NseApi, rate: float = 2.0, burst: int = 4, jitter: float = 1.0,
+                 workers: int = NseApi.CONCURRENCY, adaptive: bool = True):
+        """ Poll option chains of many symbols with global rate limit
+
+        Args:
+            api (NseApi): api used to fetch option chains
+            rate (float, optional): max requests per second. Defaults to 2.0.
+            burst (int, optional): max requests sent at once. Defaults to 4.
+            jitter (float, optional): max random seconds added to every poll time. Defaults to 1.0.
+            workers (int, optional): max requests in flight. Defaults to NseApi.CONCURRENCY.
+            adaptive (bool, optional): learn update cadence of symbols. Defaults to True.
+        """
+        self.api = api
+        self.bucket = TokenBucket(rate, burst)
+        self.jitter = jitter
+        self.workers = workers
+        self.adaptive = adaptive
+        self.symbols: Dict[str, SymbolState] = {}
+
+        # Entries hold SymbolState, so entries of a removed symbol are dropped even if it is added again
+        self._waiting = []          # (due, seq, state)
+        self._ready = []            # (priority, due, seq, state)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._lock = threading.Condition()
+        self._clock_offset = None   # min seen (receive time - records timestamp) in seconds
+        self._stop_event = None
+        self._thread = None
+        self.api.mount_adapters(workers)
+
+    def add(self, symbol: str, index: Optional[bool] = None, priority: Optional[int] = None,
+            interval: Optional[float] = None):
+        """ Add symbol to schedule, it is polled as soon as possible
+
+        Args:
+            symbol (str): symbol of stock or index
+            index (bool, optional): True if symbol is index. Defaults to None, which decide from symbol.
+            priority (int, optional): lower is polled first. Defaults to INDEX_PRIORITY or STOCK_PRIORITY.
+            interval (float, optional): seconds between polls. Defaults to INDEX_INTERVAL or STOCK_INTERVAL.
+        """
+        symbol = symbol.upper()
+        index = is_index(symbol) if index is None else index
+        if priority is None:
+            priority = self.INDEX_PRIORITY if index else self.STOCK_PRIORITY
+        if interval is None:
+            interval = self.INDEX_INTERVAL if index else self.STOCK_INTERVAL
+
+        with self._lock:
+            if symbol in self.symbols:
+                state = self.symbols[symbol]
+                state.index, state.priority, state.interval = index, priority, interval
+                return
+            state = SymbolState(symbol, index, priority, interval)
+            self.symbols[symbol] = state
+            heapq.heappush(self._waiting, (state.due, next(self._seq), state))
+            self._lock.notify()
+
+    def remove(self, symbol: str):
+        """ Remove symbol from schedule, a poll already in flight still completes """
+        with self._lock:
+            self.symbols.pop(symbol.upper(), None)
+
+    @property
+    def stats(self) -> dict:
+        """ Return scheduler counters
+
+        queue_depth is number of polls which are due but not yet sent, lag is seconds
+        between due time and send time of polls.
+        """
+        with self._lock:
+            states = list(self.symbols.values())
+            now = t.monotonic()
+            overdue = [now - due for _, due, _, _ in self._ready]
+            return {
+                'symbols': len(states),
+                'queue_depth': len(self._ready),
+                'in_flight': self._in_flight,
+                'oldest_due': max(overdue, default=0.0),
+                'lag_max': max((s.lag for s in states), default=0.0),
+                'lag_mean': sum(s.lag for s in states) / len(states) if states else 0.0,
+                'polls': sum(s.polls for s in states),
+                'changes': sum(s.changes for s in states),
+                'unchanged': sum(s.unchanged for s in states),
+                'skipped': sum(s.skipped for s in states),
+                'failures': sum(s.failures for s in states),
+                'tokens': self.bucket.tokens,
+            }
+
+    def run(self, callback: Callable[[str, OptionChain], None], stop_event: threading.Event = None):
+        """ Poll symbols until stop_event is set
+
+        Args:
+            callback (Callable[[str, OptionChain], None]): called with (symbol, OptionChain) for every
+                snapshot with new records timestamp, from worker threads
+            stop_event (threading.Event, optional): set to stop. Defaults to None, which run forever.
+        """
+        stop_event = stop_event or threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='PollScheduler') as executor:
+            while not stop_event.is_set():
+                state = self._next_ready(stop_event)
+                if state is None:
+                    continue
+
+                # Wait for token, keeping an eye on stop_event
+                while not self.bucket.acquire(timeout=0.5):
+                    if stop_event.is_set():
+                        return
+
+                with self._lock:
+                    state.lag = max(0.0, t.monotonic() - state.due)
+                    # Polls which could not be sent for whole intervals are skipped
+                    state.skipped += int(state.lag // max(state.interval, self.MIN_INTERVAL))
+                    self._in_flight += 1
+                executor.submit(self._poll, state, callback)
+
+    def start(self, callback: Callable[[str, OptionChain], None]) -> threading.Event:
+        """ Run scheduler in background thread
+
+        Returns:
+            threading.Event: set to stop scheduler, or call stop()
+        """
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.run, args=(callback, self._stop_event),
+                                        name='PollScheduler', daemon=True)
+        self._thread.start()
+        return self._stop_event
+
+    def stop(self, timeout: Optional[float] = None):
+        """ Stop background thread started by start() """
+        if self._stop_event is not None:
+            self._stop_event.set()
+            with self._lock:
+                self._lock.notify_all()
+            self._thread.join(timeout)
+
+    def _next_ready(self, stop_event: threading.Event) -> Optional[SymbolState]:
+        """ Wait for a due poll and return its symbol state, highest priority first """
+        with self._lock:
+            while not stop_event.is_set():
+                now = t.monotonic()
+                while self._waiting and self._waiting[0][0] <= now:
+                    due, seq, state = heapq.heappop(self._waiting)
+                    if self._scheduled(state):
+                        heapq.heappush(self._ready, (state.priority, due, seq, state))
+
+                while self._ready:
+                    _, _, _, state = heapq.heappop(self._ready)
+                    if self._scheduled(state):
+                        return state
+
+                timeout = self._waiting[0][0] - now if self._waiting else 1.0
+                self._lock.wait(min(timeout, 1.0))
+        return None
+
+    def _poll(self, state: SymbolState, callback: Callable[[str, OptionChain], None]):
+        chain = None
+        failed = unchanged = False
+        received = t.time()
+        try:
+            res = self.api.option_chain_payload(state.symbol, state.index)
+            received = t.time()
+            time_stamp = None if res is None else res['records'].get('timestamp')
+            if res is None:
+                failed = True
+            elif time_stamp is None or state.time_stamp is None or \
+                    parse_time_stamp(time_stamp) > state.time_stamp:
+                chain = self.api.parse_option_chain(res, state.symbol, state.index)
+            else:
+                unchanged = True
+        except Exception:
+            failed = True
+            self.api.logger.exception(f'Scheduler: {state.symbol} poll has error', exc_info=True)
+        finally:
+            # Counters are summed by stats under lock, workers of other symbols update theirs meanwhile
+            with self._lock:
+                state.polls += 1
+                state.failures += failed
+                state.unchanged += unchanged
+                self._in_flight -= 1
+                if chain is not None:
+                    self._learn(state, chain.time_stamp, received)
+                self._reschedule(state, chain is not None, received)
+
+        if chain is not None:
+            try:
+                callback(state.symbol, chain)
+            except Exception:
+                self.api.logger.exception(f'Scheduler: {state.symbol} callback has error', exc_info=True)
+
+    def _learn(self, state: SymbolState, time_stamp: Optional[datetime], received: float):
+        state.changes += 1
+        if time_stamp is None:
+            return
+        if state.time_stamp is not None:
+            period = (time_stamp - state.time_stamp).total_seconds()
+            # Ignore gaps of missed updates, like market close or long outages
+            if 0 < period <= self.MAX_INTERVAL and (state.cadence is None or period < 3 * state.cadence):
+                if state.cadence is None:
+                    state.cadence = period
+                else:
+                    state.cadence += self.CADENCE_ALPHA * (period - state.cadence)
+        state.time_stamp = time_stamp
+
+        offset = received - time_stamp.timestamp()
+        if self._clock_offset is None or offset < self._clock_offset:
+            self._clock_offset = offset
+
+    def _scheduled(self, state: SymbolState) -> bool:
+        """ True if state is current state of its symbol, not of a removed symbol """
+        return self.symbols.get(state.symbol) is state
+
+    def _reschedule(self, state: SymbolState, changed: bool, received: float):
+        if not self._scheduled(state):
+            return
+
+        delay = state.interval
+        if self.adaptive and state.cadence is not None and state.time_stamp is not None:
+            if changed:
+                expected = state.time_stamp.timestamp() + self._clock_offset + state.cadence
+                delay = expected - received + self.POLL_DELAY
+            else:
+                # Update is late, look again soon
+                delay = state.cadence / 4
+        delay = min(max(delay, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        delay += random.uniform(0, self.jitter)
+
+        state.due = t.monotonic() + delay
+        heapq.heappush(self._waiting, (state.due, next(self._seq), state))
+        self._lock.notify()
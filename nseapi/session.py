@@ -0,0 +1,305 @@
+import json
+import logging as _logging
+import os
+import threading
+import time as t
+from pathlib import Path
+from typing import List, Optional, Union
+import requests
+from requests.adapters import HTTPAdapter
+import nseapi.constant as c
+from nseapi.transport import Transport
+
+
+def default_cookie_path() -> Path:
+    """ Return default path of persisted cookies
+
+    $NSEAPI_CACHE_DIR/cookies.json if NSEAPI_CACHE_DIR is set, else nseapi/cookies.json
+    under $XDG_CACHE_HOME or ~/.cache
+    """
+    cache_dir = os.environ.get('NSEAPI_CACHE_DIR')
+    if cache_dir:
+        return Path(cache_dir).joinpath('cookies.json')
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home().joinpath('.cache')
+    return Path(cache_home).joinpath('nseapi', 'cookies.json')
+
+
+def cookies_expiry(jar: requests.cookies.RequestsCookieJar, default: float) -> float:
+    """ Return earliest expiry (epoch seconds) of cookies in jar, capped at default """
+    expires = [cookie.expires for cookie in jar if cookie.expires]
+    return min(expires + [default])
+
+
+class _Slot:
+    """ A session and validity of its main page cookies """
+    __slots__ = ('session', 'warmed_at', 'expires_at')
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.warmed_at = None
+        self.expires_at = 0.0
+
+    def valid(self, margin: float = 0.0) -> bool:
+        return self.expires_at - margin > t.time()
+
+    def expire(self):
+        self.expires_at = 0.0
+
+
+class SessionManager:
+    """ Keep cookie-warmed requests.Session objects ready for NseApi
+
+    Cookie expiry is tracked from the main page response. A pool of sessions is kept
+    warm, so refresh() swaps in a standby session instead of loading the main page on
+    the request path, and a background thread re-warms sessions before their cookies
+    expire. Cookies of the active session can be persisted to cookie_path as json so a
+    restarted process starts fetching without a main page load.
+    """
+    REFRESH_MARGIN = 60.0       # Re-warm sessions this many seconds before expiry
+    MAX_AGE = 600.0             # Max seconds main page cookies are trusted
+    CHECK_INTERVAL = 5.0        # Seconds between background checks
+
+    def __init__(self, headers: dict = None, pool_size: int = 2, cookie_path: Union[str, Path] = None,
+                 timeout: float = 10, background: bool = True, logger: _logging.Logger = None,
+                 transport: Transport = None):
+        """ Keep cookie-warmed sessions ready
+
+        Args:
+            headers (dict, optional): headers of sessions. Defaults to constant.HEADER.
+            pool_size (int, optional): number of sessions kept warm. Defaults to 2.
+            cookie_path (Union[str, Path], optional): json file to persist cookies. Defaults to None.
+            timeout (float, optional): main page request timeout. Defaults to 10.
+            background (bool, optional): re-warm sessions in background thread. Defaults to True.
+            logger (logging.Logger, optional): Defaults to None.
+            transport (Transport, optional): connection pools mounted in sessions. Defaults to None,
+                which mount an adapter per session.
+        """
+        self.headers = c.HEADER if headers is None else headers
+        self.cookie_path = None if cookie_path is None else Path(cookie_path)
+        self.timeout = timeout
+        self.logger = logger or _logging.getLogger('NseApi')
+        self.transport = transport
+        self.refreshes = 0
+        self.swaps = 0
+        self.failures = 0
+
+        self._pool_maxsize = None
+        self._slots: List[_Slot] = [_Slot(self._new_session()) for _ in range(max(1, pool_size))]
+        self._active = 0
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if self.cookie_path is not None:
+            self.load()
+        if background:
+            self.start()
+
+    @property
+    def session(self) -> requests.Session:
+        """ Return active session """
+        return self._slots[self._active].session
+
+    @property
+    def ready(self) -> bool:
+        """ True if active session has unexpired main page cookies """
+        return self._slots[self._active].valid()
+
+    @property
+    def expires_in(self) -> float:
+        """ Return seconds till cookies of active session expire """
+        return self._slots[self._active].expires_at - t.time()
+
+    @property
+    def age(self) -> Optional[float]:
+        """ Return seconds since main page was loaded in active session """
+        warmed_at = self._slots[self._active].warmed_at
+        return None if warmed_at is None else t.time() - warmed_at
+
+    def refresh(self) -> bool:
+        """ Make a warm session active
+
+        Nothing is done while active session is warm beyond REFRESH_MARGIN, so callers racing
+        to refresh do not clear cookies of requests in flight. Else a standby session with
+        valid cookies is swapped in if there is one, otherwise main page is loaded in active
+        session. Swapped out session is re-warmed in background.
+
+        Returns:
+            bool: True if active session is warm
+        """
+        with self._lock:
+            if self._slots[self._active].valid(self.REFRESH_MARGIN):
+                return True
+            for i, slot in enumerate(self._slots):
+                if i != self._active and slot.valid(self.REFRESH_MARGIN):
+                    self._slots[self._active].expire()
+                    self._active = i
+                    self.swaps += 1
+                    self.logger.debug('Session - swapped in warm session')
+                    self.save()
+                    return True
+
+            slot = self._slots[self._active]
+            if self._warm(slot):
+                self.save()
+                return True
+            return False
+
+    def ensure_ready(self) -> bool:
+        """ Refresh unless active session is warm, like after a background warm-up finished
+
+        Returns:
+            bool: True if active session is warm
+        """
+        with self._lock:
+            return self.ready or self.refresh()
+
+    def invalidate(self):
+        """ Mark cookies of active session as expired """
+        with self._lock:
+            self._slots[self._active].expire()
+
+    def maintain(self):
+        """ Re-warm sessions whose cookies are about to expire """
+        with self._lock:
+            standby = [s for i, s in enumerate(self._slots) if i != self._active]
+
+        for slot in standby:
+            if not slot.valid(self.REFRESH_MARGIN) and not self._stop_event.is_set():
+                self._warm(slot)
+
+        with self._lock:
+            if not self._slots[self._active].valid(self.REFRESH_MARGIN) and not self._stop_event.is_set():
+                self.refresh()
+
+    def start(self):
+        """ Start background thread which keeps sessions warm """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='NseApi-SessionManager', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """ Stop background thread """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        """ Stop background thread and close sessions """
+        self.stop()
+        for slot in self._slots:
+            slot.session.close()
+
+    def mount_adapters(self, pool_maxsize: int):
+        """ Size connection pool of every session for pool_maxsize concurrent requests """
+        if self.transport is not None:
+            self.transport.resize(pool_maxsize)
+            return
+        with self._lock:
+            if self._pool_maxsize is not None and self._pool_maxsize >= pool_maxsize:
+                return
+            self._pool_maxsize = pool_maxsize
+            for slot in self._slots:
+                self._mount(slot.session)
+
+    def save(self):
+        """ Persist cookies of active session to cookie_path """
+        if self.cookie_path is None:
+            return
+        slot = self._slots[self._active]
+        if not slot.valid():
+            return
+        data = {
+            'warmed_at': slot.warmed_at,
+            'expires_at': slot.expires_at,
+            'cookies': [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                         'path': cookie.path, 'expires': cookie.expires, 'secure': cookie.secure}
+                        for cookie in slot.session.cookies]
+        }
+        try:
+            self.cookie_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cookie_path.with_name(self.cookie_path.name + '.tmp')
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cookie_path)
+        except OSError:
+            self.logger.exception('Session - saving cookies failed', exc_info=True)
+
+    def load(self) -> bool:
+        """ Load persisted cookies into active session
+
+        Returns:
+            bool: True if unexpired cookies were loaded
+        """
+        try:
+            with open(self.cookie_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            self.logger.exception('Session - loading cookies failed', exc_info=True)
+            return False
+
+        if data.get('expires_at', 0) - self.REFRESH_MARGIN <= t.time():
+            return False
+        with self._lock:
+            slot = self._slots[self._active]
+            for cookie in data['cookies']:
+                slot.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                         path=cookie['path'], expires=cookie['expires'],
+                                         secure=cookie['secure'])
+            slot.warmed_at = data['warmed_at']
+            slot.expires_at = data['expires_at']
+        self.logger.debug('Session - loaded cached cookies')
+        return True
+
+    def _warm(self, slot: _Slot) -> bool:
+        """ Load main page in session of slot """
+        try:
+            self.logger.debug('main page - Requesting ')
+            slot.session.cookies.clear()
+            res = slot.session.get(c.URL_MAIN, timeout=self.timeout)
+            if self.transport is not None:
+                self.transport.record('Main Page', res)
+            if res.status_code == 200:
+                now = t.time()
+                slot.warmed_at = now
+                slot.expires_at = cookies_expiry(slot.session.cookies, now + self.MAX_AGE)
+                self.refreshes += 1
+                self.logger.debug('Main Page - loaded')
+                return True
+            self.logger.error(f'Main Page - loading Failed - Not valid response, Status Code: {res.status_code}')
+        except requests.exceptions.RequestException:
+            self.logger.error('Main Page - Network error in load Main Page')
+        except Exception:
+            self.logger.exception('Main page - has an error', exc_info=True)
+        self.failures += 1
+        return False
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(self.headers)
+        self._mount(session)
+        return session
+
+    def _mount(self, session: requests.Session):
+        if self.transport is not None:
+            self.transport.mount(session)
+            return
+        if self._pool_maxsize is None:
+            return
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.maintain()
+            except Exception:
+                self.logger.exception('Session - background refresh has error', exc_info=True)
+            self._stop_event.wait(self.CHECK_INTERVAL)
@@ -0,0 +1,412 @@
+""" Append-only on-disk store of OptionChain snapshots
+
+Layout of store::
+
+    root/
+        NIFTY/
+            2021-02-19/
+                schema.json     column names and dtypes, written once
+                index.bin       one (time stamp, first row, row count) record per snapshot
+                c000.bin        raw fixed width values of column 0
+                c003.txt        dictionary of text column 3, one json string per line
+                ...
+
+Column files are appended first and index.bin last, so a snapshot is visible only after
+its index record is written. Rows left behind by a crash are beyond the last index record
+and are truncated when the partition is opened for writing again, as is a partially
+written dictionary line. Complete dictionary lines of an uncommitted snapshot are kept as
+unused codes. An append which fails before its commit truncates every file back.
+Reads memory map only the row range of requested snapshots and only requested columns.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from nseapi.data_models import OptionChain, expand_dataframe
+
+INDEX_DTYPE = np.dtype([('time_stamp', '<i8'), ('start', '<i8'), ('count', '<i8')])
+TIME_STAMP = 'Time Stamp'
+KEY_COLUMNS = ['Strike Price', 'Expiry Date']
+
+# Storage kind of columns
+FLOAT = 'float'
+DATETIME = 'datetime'
+TEXT = 'text'
+_STORAGE_DTYPE = {FLOAT: np.dtype('<f8'), DATETIME: np.dtype('<i8'), TEXT: np.dtype('<i4')}
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return DATETIME
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return FLOAT
+    return TEXT
+
+
+def _to_datetime64(value: Union[datetime, date, str, None]) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), 'ns')
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class _Partition:
+    """ Snapshots of one symbol on one trade date """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.schema = None
+        schema_path = path.joinpath('schema.json')
+        if schema_path.exists():
+            with open(schema_path) as f:
+                self.schema = json.load(f)
+
+    def column_path(self, i: int, suffix: str = '.bin') -> Path:
+        return self.path.joinpath(f'c{i:03d}{suffix}')
+
+    def read_index(self) -> np.ndarray:
+        """ Return committed index records, ignoring a partially written last record """
+        index_path = self.path.joinpath('index.bin')
+        if not index_path.exists():
+            return np.empty(0, dtype=INDEX_DTYPE)
+        count = index_path.stat().st_size // INDEX_DTYPE.itemsize
+        return np.fromfile(index_path, dtype=INDEX_DTYPE, count=count)
+
+    def read_dictionary(self, i: int) -> List[str]:
+        path = self.column_path(i, '.txt')
+        if not path.exists():
+            return []
+        with open(path, 'rb') as f:
+            lines = f.read().split(b'\n')
+        # Last element is either empty or a partially written line
+        return [json.loads(line) for line in lines[:-1]]
+
+    def read_column(self, i: int, start: int, stop: int) -> np.ndarray:
+        """ Memory map rows [start, stop) of column i """
+        column = self.schema['columns'][i]
+        dtype = _STORAGE_DTYPE[column['kind']]
+        if stop <= start:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.column_path(i), dtype=dtype, mode='r',
+                         offset=start * dtype.itemsize, shape=(stop - start,))
+
+
+class _PartitionWriter:
+    """ Open partition for appending """
+
+    def __init__(self, partition: _Partition, df: pd.DataFrame, fsync: bool = True):
+        self.partition = partition
+        self.fsync = fsync
+        partition.path.mkdir(parents=True, exist_ok=True)
+        if partition.schema is None:
+            self._write_schema(df)
+        self.columns = partition.schema['columns']
+
+        # Drop rows which are not covered by index and partially written dictionary lines
+        index = partition.read_index()
+        with open(partition.path.joinpath('index.bin'), 'ab') as f:
+            f.truncate(len(index) * INDEX_DTYPE.itemsize)
+        self.rows = int(index['start'][-1] + index['count'][-1]) if len(index) else 0
+        self.last_time_stamp = int(index['time_stamp'][-1]) if len(index) else None
+
+        self.files = []
+        self.dictionaries = {}
+        for i, column in enumerate(self.columns):
+            f = open(partition.column_path(i), 'ab')
+            f.truncate(self.rows * _STORAGE_DTYPE[column['kind']].itemsize)
+            self.files.append(f)
+            if column['kind'] == TEXT:
+                values = partition.read_dictionary(i)
+                d = open(partition.column_path(i, '.txt'), 'ab')
+                d.truncate(sum(len(json.dumps(v).encode()) + 1 for v in values))
+                self.dictionaries[i] = (d, {v: code for code, v in enumerate(values)})
+        self.index_file = open(partition.path.joinpath('index.bin'), 'ab')
+
+    def _write_schema(self, df: pd.DataFrame):
+        schema = {'columns': [{'name': name, 'kind': _column_kind(df[name]), 'dtype': str(df[name].dtype)}
+                              for name in df.columns]}
+        tmp_path = self.partition.path.joinpath('schema.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(schema, f, indent=1)
+            _fsync(f)
+        os.replace(tmp_path, self.partition.path.joinpath('schema.json'))
+        self.partition.schema = schema
+
+    def _encode(self, i: int, series: pd.Series) -> Tuple[np.ndarray, dict]:
+        """ Return codes of values and codes of values not in dictionary yet, dictionary is not changed """
+        _, codes = self.dictionaries[i]
+        values = series.astype(object).where(series.notna(), None).tolist()
+        new_codes = {}
+        for v in dict.fromkeys(values):
+            if v not in codes:
+                new_codes[v] = len(codes) + len(new_codes)
+        lookup = {**codes, **new_codes} if new_codes else codes
+        return np.fromiter((lookup[v] for v in values), dtype='<i4', count=len(values)), new_codes
+
+    def _convert(self, df: pd.DataFrame) -> Tuple[List[np.ndarray], Dict[int, dict]]:
+        """ Return storage array of every column and new dictionary codes of text columns """
+        n = len(df)
+        arrays = []
+        new_codes = {}
+        for i, column in enumerate(self.columns):
+            kind = column['kind']
+            if column['name'] in df.columns:
+                series = df[column['name']]
+            else:
+                series = pd.Series([None] * n, dtype=object if kind == TEXT else 'float64')
+
+            if kind == FLOAT:
+                array = np.asarray(series, dtype='<f8')
+            elif kind == DATETIME:
+                array = np.asarray(pd.to_datetime(series), dtype='datetime64[ns]').view('<i8')
+            else:
+                array, new_codes[i] = self._encode(i, series)
+            arrays.append(array)
+        return arrays, new_codes
+
+    def append(self, df: pd.DataFrame, time_stamp: int) -> bool:
+        if self.last_time_stamp is not None and time_stamp <= self.last_time_stamp:
+            return False
+
+        # Nothing is written until every column is converted
+        n = len(df)
+        arrays, new_codes = self._convert(df)
+
+        dictionary_files = [f for f, _ in self.dictionaries.values()]
+        files = self.files + dictionary_files + [self.index_file]
+        sizes = [f.tell() for f in files]
+        try:
+            for i, array in enumerate(arrays):
+                if new_codes.get(i):
+                    self.dictionaries[i][0].write(b''.join(json.dumps(v).encode() + b'\n' for v in new_codes[i]))
+                self.files[i].write(array.tobytes())
+
+            for f in self.files + dictionary_files:
+                f.flush()
+            if self.fsync:
+                for f in self.files + dictionary_files:
+                    os.fsync(f.fileno())
+
+            # Commit
+            record = np.array([(time_stamp, self.rows, n)], dtype=INDEX_DTYPE)
+            self.index_file.write(record.tobytes())
+            if self.fsync:
+                _fsync(self.index_file)
+            else:
+                self.index_file.flush()
+        except BaseException:
+            # Files must end where committed snapshots end, so offsets of next snapshot stay right
+            for f, size in zip(files, sizes):
+                f.truncate(size)
+            raise
+
+        for i, codes in new_codes.items():
+            self.dictionaries[i][1].update(codes)
+        self.rows += n
+        self.last_time_stamp = time_stamp
+        return True
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        for f, _ in self.dictionaries.values():
+            f.close()
+        self.index_file.close()
+
+
+class SnapshotStore:
+    """ Append-only columnar store of OptionChain snapshots partitioned by symbol and trade date
+
+    One process should write a store at a time, any number of processes can read it.
+    """
+
+    def __init__(self, root: Union[str, Path], fsync: bool = True):
+        """ Append-only columnar store of OptionChain snapshots
+
+        Args:
+            root (Union[str, Path]): directory of store
+            fsync (bool, optional): fsync files on every append. Defaults to True.
+        """
+        self.root = Path(root)
+        self.fsync = fsync
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def append(self, chain: OptionChain, symbol: str = None) -> bool:
+        """ Append snapshot to store
+
+        Args:
+            chain (OptionChain): snapshot with time_stamp
+            symbol (str, optional): partition symbol. Defaults to None, which use chain.symbol.
+
+        Returns:
+            bool: False if snapshot was skipped because it is not newer than last stored snapshot
+        """
+        if chain.time_stamp is None:
+            raise ValueError('OptionChain has no time_stamp')
+        symbol = self._symbol(symbol or chain.symbol)
+        trade_date = chain.time_stamp.date()
+        time_stamp = int(_to_datetime64(chain.time_stamp).astype('<i8'))
+
+        # Compact chains are stored with original dtypes and identifier columns
+        df = expand_dataframe(chain.df)
+        with self._lock:
+            writer = self._writers.get(symbol)
+            if writer is None or writer[0] != trade_date:
+                if writer is not None:
+                    writer[1].close()
+                partition = _Partition(self._partition_path(symbol, trade_date))
+                writer = (trade_date, _PartitionWriter(partition, df, self.fsync))
+                self._writers[symbol] = writer
+            return writer[1].append(df, time_stamp)
+
+    def symbols(self) -> List[str]:
+        """ Return symbols in store """
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def trade_dates(self, symbol: str) -> List[date]:
+        """ Return trade dates stored for symbol """
+        path = self.root.joinpath(self._symbol(symbol))
+        if not path.exists():
+            return []
+        return sorted(datetime.strptime(p.name, '%Y-%m-%d').date() for p in path.iterdir()
+                      if p.joinpath('schema.json').exists())
+
+    def time_stamps(self, symbol: str, start: Union[datetime, str] = None,
+                    end: Union[datetime, str] = None) -> pd.DatetimeIndex:
+        """ Return time stamps of stored snapshots of symbol between start and end """
+        values = [index['time_stamp'] for _, index in self._indexes(symbol, start, end)]
+        values = np.concatenate(values) if values else np.empty(0, dtype='<i8')
+        return pd.DatetimeIndex(values.view('datetime64[ns]'), name=TIME_STAMP)
+
+    def read(self, symbol: str, start: Union[datetime, str] = None, end: Union[datetime, str] = None,
+             strikes: Tuple[float, float] = None, columns: Iterable[str] = None) -> pd.DataFrame:
+        """ Read snapshots of symbol between start and end
+
+        Only row range of selected snapshots of requested columns is read from disk.
+
+        Args:
+            symbol (str): symbol
+            start (Union[datetime, str], optional): first time stamp, inclusive. Defaults to None.
+            end (Union[datetime, str], optional): last time stamp, inclusive. Defaults to None.
+            strikes (Tuple[float, float], optional): (low, high) strike price, inclusive. Defaults to None.
+            columns (Iterable[str], optional): columns to read besides Time Stamp, Strike Price
+                and Expiry Date. Defaults to None, which read all columns.
+
+        Returns:
+            pd.DataFrame: rows of all snapshots with Time Stamp column first
+        """
+        frames = []
+        for partition, index in self._indexes(symbol, start, end):
+            if len(index) == 0:
+                continue
+            frames.append(self._read_partition(partition, index, strikes, columns))
+
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def snapshots(self, symbol: str, start: Union[datetime, str] = None, end: Union[datetime, str] = None,
+                  strikes: Tuple[float, float] = None, columns: Iterable[str] = None) -> Iterator[OptionChain]:
+        """ Yield stored snapshots of symbol as OptionChain in time order, arguments are same as read """
+        for partition, index in self._indexes(symbol, start, end):
+            for i in range(len(index)):
+                df = self._read_partition(partition, index[i:i + 1], strikes, columns)
+                time_stamp = df.pop(TIME_STAMP)
+                if df.empty:
+                    continue
+                chain = OptionChain(df)
+                chain.time_stamp = time_stamp.iloc[0].to_pydatetime()
+                yield chain
+
+    def close(self):
+        """ Close open files of writers """
+        with self._lock:
+            for _, writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+    def _read_partition(self, partition: _Partition, index: np.ndarray, strikes, columns) -> pd.DataFrame:
+        schema = partition.schema['columns']
+        positions = {column['name']: i for i, column in enumerate(schema)}
+        if columns is None:
+            names = [column['name'] for column in schema]
+        else:
+            names = list(dict.fromkeys(KEY_COLUMNS + [n for n in columns if n not in KEY_COLUMNS]))
+            missing = [n for n in names if n not in positions]
+            if missing:
+                raise KeyError(f'{missing} not in store columns')
+
+        # Selected snapshots are consecutive records, so their rows are one range
+        start = int(index['start'][0])
+        stop = int(index['start'][-1] + index['count'][-1])
+        time_stamps = np.repeat(index['time_stamp'], index['count'])
+
+        selection = None
+        if strikes is not None:
+            strike = partition.read_column(positions['Strike Price'], start, stop)
+            selection = np.flatnonzero((strike >= strikes[0]) & (strike <= strikes[1]))
+            time_stamps = time_stamps[selection]
+
+        data = {TIME_STAMP: time_stamps.view('datetime64[ns]')}
+        for name in names:
+            i = positions[name]
+            column = schema[i]
+            values = partition.read_column(i, start, stop)
+            values = np.array(values if selection is None else values[selection])
+            if column['kind'] == DATETIME:
+                values = values.view('datetime64[ns]')
+            elif column['kind'] == TEXT:
+                values = np.array(partition.read_dictionary(i), dtype=object)[values]
+            elif column['dtype'] != 'float64':
+                # Integer columns are restored unless missing values were stored as NaN
+                dtype = np.dtype(column['dtype'])
+                if dtype.kind == 'f' or not np.isnan(values).any():
+                    values = values.astype(dtype)
+            data[name] = values
+        return pd.DataFrame(data)
+
+    def _indexes(self, symbol: str, start, end) -> Iterator[Tuple[_Partition, np.ndarray]]:
+        start = _to_datetime64(start)
+        end = _to_datetime64(end)
+        for trade_date in self.trade_dates(symbol):
+            day = np.datetime64(trade_date, 'ns')
+            if start is not None and day + np.timedelta64(1, 'D') <= start:
+                continue
+            if end is not None and day > end:
+                continue
+
+            partition = _Partition(self._partition_path(self._symbol(symbol), trade_date))
+            index = partition.read_index()
+            time_stamps = index['time_stamp']
+            lo = 0 if start is None else np.searchsorted(time_stamps, start.astype('<i8'), side='left')
+            hi = len(index) if end is None else np.searchsorted(time_stamps, end.astype('<i8'), side='right')
+            yield partition, index[lo:hi]
+
+    def _partition_path(self, symbol: str, trade_date: date) -> Path:
+        return self.root.joinpath(symbol, trade_date.strftime('%Y-%m-%d'))
+
+    @staticmethod
+    def _symbol(symbol: str) -> str:
+        symbol = symbol.upper()
+        if not symbol or os.sep in symbol or symbol.startswith('.'):
+            raise ValueError(f'Not valid symbol: {symbol}')
+        return symbol
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
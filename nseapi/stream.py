@@ -0,0 +1,149 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from nseapi.data_models import OptionChain, parse_time_stamp
+
+KEY_COLUMNS = ['Strike Price', 'Expiry Date']
+DIFF_FIELDS = ['Open Interest', 'Total Traded Volume', 'Implied Volatility', 'Last Price']
+
+
+def diff_columns(fields: List[str] = None) -> List[str]:
+    """ Return Call and Put columns of fields """
+    fields = DIFF_FIELDS if fields is None else fields
+    return [f'{side} {field}' for side in ('Call', 'Put') for field in fields]
+
+
+class ChainDiff:
+    """ Change between two consecutive snapshots of a symbol
+
+    Attributes:
+        symbol (str): underlying symbol
+        time_stamp (datetime): time stamp of current snapshot
+        previous_time_stamp (datetime): time stamp of previous snapshot, None for first snapshot
+        changed (pd.DataFrame): strikes of current snapshot which are new or have a changed field,
+            with current values, '<column> Delta' columns and New column which is True for
+            strikes not in previous snapshot. Delta of new strikes is NaN.
+        removed (pd.DataFrame): Strike Price and Expiry Date of strikes not in current snapshot
+        underlying_value: underlying value of current snapshot
+    """
+
+    def __init__(self, symbol: str, time_stamp: datetime, previous_time_stamp: Optional[datetime],
+                 changed: pd.DataFrame, removed: pd.DataFrame, underlying_value=None):
+        self.symbol = symbol
+        self.time_stamp = time_stamp
+        self.previous_time_stamp = previous_time_stamp
+        self.changed = changed
+        self.removed = removed
+        self.underlying_value = underlying_value
+
+    @property
+    def empty(self) -> bool:
+        """ True if nothing changed """
+        return self.changed.empty and self.removed.empty
+
+    @property
+    def added(self) -> pd.DataFrame:
+        """ Return strikes which are not in previous snapshot """
+        return self.changed.loc[self.changed['New'].values]
+
+    def __len__(self):
+        return len(self.changed) + len(self.removed)
+
+    def __repr__(self):
+        return f'ChainDiff({self.symbol}, {self.time_stamp}, changed={len(self.changed)}, removed={len(self.removed)})'
+
+
+def diff_option_chains(previous: Optional[OptionChain], current: OptionChain,
+                       fields: List[str] = None) -> ChainDiff:
+    """ Return ChainDiff of current snapshot against previous snapshot
+
+    Args:
+        previous (OptionChain): previous snapshot, None if current is first snapshot
+        current (OptionChain): current snapshot
+        fields (List[str], optional): fields compared for both Call and Put. Defaults to DIFF_FIELDS.
+
+    Returns:
+        ChainDiff:
+    """
+    columns = [col for col in diff_columns(fields) if col in current.df.columns]
+    # Columns with original dtypes, compact chains hold float32 values
+    cur = pd.DataFrame({col: current.column(col) for col in KEY_COLUMNS + columns})
+    underlying_value = current.column('Underlying Value')[0] if len(current.df) else None
+
+    if previous is None:
+        changed = cur.reset_index(drop=True)
+        for col in columns:
+            changed[col + ' Delta'] = np.nan
+        changed['New'] = True
+        return ChainDiff(current.symbol, current.time_stamp, None, changed,
+                         cur[KEY_COLUMNS].iloc[:0], underlying_value)
+
+    prev = pd.DataFrame({col: previous.column(col) for col in KEY_COLUMNS + columns
+                         if col in previous.df.columns}).set_index(KEY_COLUMNS)
+    cur_index = pd.MultiIndex.from_frame(cur[KEY_COLUMNS])
+    positions = prev.index.get_indexer(cur_index)
+    found = positions >= 0
+
+    cur_values = cur[columns].to_numpy(dtype='float64')
+    prev_values = np.full_like(cur_values, np.nan)
+    prev_columns = [col for col in columns if col in prev.columns]
+    if prev_columns:
+        column_positions = [columns.index(col) for col in prev_columns]
+        prev_values[np.ix_(found, column_positions)] = \
+            prev[prev_columns].to_numpy(dtype='float64')[positions[found]]
+
+    delta = cur_values - prev_values
+    same = (cur_values == prev_values) | (np.isnan(cur_values) & np.isnan(prev_values))
+    mask = ~found | ~same.all(axis=1)
+
+    changed = cur.loc[mask].reset_index(drop=True)
+    delta = delta[mask]
+    for i, col in enumerate(columns):
+        changed[col + ' Delta'] = delta[:, i]
+    changed['New'] = ~found[mask]
+
+    removed_mask = np.ones(len(prev), dtype=bool)
+    removed_mask[positions[found]] = False
+    removed = prev.index[removed_mask].to_frame(index=False)
+    return ChainDiff(current.symbol, current.time_stamp, previous.time_stamp, changed, removed, underlying_value)
+
+
+class ChainStream:
+    """ Keep last snapshot per symbol and turn every new snapshot into ChainDiff """
+
+    def __init__(self, fields: List[str] = None):
+        """ Keep last snapshot per symbol
+
+        Args:
+            fields (List[str], optional): fields compared for both Call and Put. Defaults to DIFF_FIELDS.
+        """
+        self.fields = fields
+        self.last: Dict[str, OptionChain] = {}
+        self._lock = threading.Lock()
+
+    def is_new(self, symbol: str, time_stamp: Union[datetime, str, None]) -> bool:
+        """ Return False if time_stamp has not moved since last snapshot of symbol """
+        last = self.last.get(symbol.upper())
+        if last is None or last.time_stamp is None or time_stamp is None:
+            return True
+        return parse_time_stamp(time_stamp) > last.time_stamp
+
+    def update(self, chain: OptionChain, symbol: str = None) -> Optional[ChainDiff]:
+        """ Store chain as last snapshot of symbol
+
+        Args:
+            chain (OptionChain): new snapshot
+            symbol (str, optional): symbol of chain. Defaults to None, which use chain.symbol.
+
+        Returns:
+            [ChainDiff]: None if chain is not newer than last snapshot
+        """
+        symbol = (symbol or chain.symbol).upper()
+        with self._lock:
+            if not self.is_new(symbol, chain.time_stamp):
+                return None
+            previous = self.last.get(symbol)
+            self.last[symbol] = chain
+        return diff_option_chains(previous, chain, self.fields)
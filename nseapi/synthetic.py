@@ -0,0 +1,178 @@
+import random
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import nseapi.constant as c
+
+EXPIRY_FORMAT = '%d-%b-%Y'
+TIMESTAMP_FORMAT = '%d-%b-%Y %H:%M:%S'
+
+
+def last_thursday(year: int, month: int) -> date:
+    """ Return last thursday of month """
+    if month == 12:
+        day = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        day = date(year, month + 1, 1) - timedelta(days=1)
+    return day - timedelta(days=(day.weekday() - 3) % 7)
+
+
+def expiry_dates(start: date, count: int, weekly: bool = True) -> List[date]:
+    """ Return NSE like expiry dates after start
+
+    Args:
+        start (date): trading day
+        count (int): number of expiry dates
+        weekly (bool, optional): True for index like weekly + monthly expiries. Defaults to True.
+
+    Returns:
+        List[date]: sorted expiry dates
+    """
+    dates = set()
+    year, month = start.year, start.month
+    # Three serial monthly expiries
+    while len(dates) < min(3, count):
+        expiry = last_thursday(year, month)
+        if expiry >= start:
+            dates.add(expiry)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    day = start + timedelta(days=(3 - start.weekday()) % 7)
+    while weekly and len(dates) < count:
+        dates.add(day)
+        day += timedelta(days=7)
+
+    # Quarterly expiries for far months
+    while len(dates) < count:
+        expiry = last_thursday(year, month)
+        if month % 3 == 0:
+            dates.add(expiry)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return sorted(dates)[:count]
+
+
+def option_chain_payload(symbol: str = 'NIFTY', strikes: int = 100, expiries: int = 8,
+                         underlying_value: Optional[float] = None, time_stamp: Optional[datetime] = None,
+                         strike_step: float = 50, missing_ratio: float = 0.05,
+                         seed: Optional[int] = None) -> dict:
+    """ Return synthetic payload in shape of URL_INDICES / URL_EQUITIES response
+
+    Args:
+        symbol (str, optional): underlying symbol. Defaults to 'NIFTY'.
+        strikes (int, optional): strikes per expiry. Defaults to 100.
+        expiries (int, optional): number of expiry dates. Defaults to 8.
+        underlying_value (float, optional): spot price. Defaults to None, which put it in middle of strikes.
+        time_stamp (datetime, optional): records timestamp. Defaults to None, which use current time.
+        strike_step (float, optional): gap between strikes. Defaults to 50.
+        missing_ratio (float, optional): ratio of strikes without CE or PE side. Defaults to 0.05.
+        seed (int, optional): random seed. Defaults to None.
+
+    Returns:
+        [dict]: option chain payload with records and filtered sections
+    """
+    rnd = random.Random(seed)
+    symbol = symbol.upper()
+    time_stamp = time_stamp or datetime.now().replace(microsecond=0)
+    index = symbol in c.OPTION_INDICES
+    instrument = 'OPTIDX' if index else 'OPTSTK'
+
+    first_strike = round(10000 / strike_step) * strike_step
+    if underlying_value is None:
+        underlying_value = round(first_strike + strike_step * (strikes / 2 + rnd.random()), 2)
+    else:
+        first_strike = round((underlying_value - strike_step * strikes / 2) / strike_step) * strike_step
+
+    dates = [d.strftime(EXPIRY_FORMAT) for d in expiry_dates(time_stamp.date(), expiries, weekly=index)]
+    data = []
+    for expiry in dates:
+        identifier_date = datetime.strptime(expiry, EXPIRY_FORMAT).strftime('%d-%m-%Y')
+        for i in range(strikes):
+            strike = first_strike + i * strike_step
+            if float(strike).is_integer():
+                strike = int(strike)
+            row = {'strikePrice': strike, 'expiryDate': expiry}
+            for side in ('PE', 'CE'):
+                if rnd.random() < missing_ratio:
+                    continue
+                last_price = rnd.choice([0, round(rnd.uniform(0.05, 2000), 2)])
+                row[side] = {
+                    'strikePrice': strike,
+                    'expiryDate': expiry,
+                    'underlying': symbol,
+                    'identifier': f'{instrument}{symbol}{identifier_date}{side}{strike:.2f}',
+                    'openInterest': rnd.randint(0, 50000),
+                    'changeinOpenInterest': rnd.randint(-5000, 5000),
+                    'pchangeinOpenInterest': round(rnd.uniform(-100, 500), 6),
+                    'totalTradedVolume': rnd.randint(0, 10 ** 6),
+                    'impliedVolatility': rnd.choice([0, round(rnd.uniform(5, 60), 2)]),
+                    'lastPrice': last_price,
+                    'change': round(rnd.uniform(-50, 50), 6),
+                    'pChange': round(rnd.uniform(-90, 300), 6),
+                    'totalBuyQuantity': rnd.randint(0, 10 ** 6),
+                    'totalSellQuantity': rnd.randint(0, 10 ** 6),
+                    'bidQty': rnd.randint(0, 5000),
+                    'bidprice': round(last_price * 0.99, 2),
+                    'askQty': rnd.randint(0, 5000),
+                    'askPrice': round(last_price * 1.01, 2),
+                    'underlyingValue': underlying_value
+                }
+            data.append(row)
+
+    near = [d for d in data if d['expiryDate'] == dates[0]]
+    return {
+        'records': {
+            'expiryDates': dates,
+            'data': data,
+            'timestamp': time_stamp.strftime(TIMESTAMP_FORMAT),
+            'underlyingValue': underlying_value,
+            'strikePrices': sorted({d['strikePrice'] for d in data})
+        },
+        'filtered': {
+            'data': near,
+            'CE': {'totOI': sum(d['CE']['openInterest'] for d in near if 'CE' in d),
+                   'totVol': sum(d['CE']['totalTradedVolume'] for d in near if 'CE' in d)},
+            'PE': {'totOI': sum(d['PE']['openInterest'] for d in near if 'PE' in d),
+                   'totVol': sum(d['PE']['totalTradedVolume'] for d in near if 'PE' in d)}
+        }
+    }
+
+
+def stock_list_payload(index_name: str = 'NIFTY 50', stocks: int = 50, seed: Optional[int] = None) -> dict:
+    """ Return synthetic payload in shape of URL_STOCK_LIST response
+
+    Args:
+        index_name (str, optional): name of index like NIFTY 50. Defaults to 'NIFTY 50'.
+        stocks (int, optional): number of stocks in index. Defaults to 50.
+        seed (int, optional): random seed. Defaults to None.
+
+    Returns:
+        [dict]: stock list payload, first row is index itself
+    """
+    rnd = random.Random(seed)
+
+    def row(symbol, priority, identifier):
+        previous_close = round(rnd.uniform(50, 20000), 2)
+        last_price = round(previous_close * rnd.uniform(0.95, 1.05), 2)
+        return {
+            'priority': priority,
+            'symbol': symbol,
+            'identifier': identifier,
+            'open': previous_close,
+            'dayHigh': max(previous_close, last_price),
+            'dayLow': min(previous_close, last_price),
+            'lastPrice': last_price,
+            'previousClose': previous_close,
+            'change': round(last_price - previous_close, 2),
+            'pChange': round((last_price / previous_close - 1) * 100, 2),
+            'totalTradedVolume': rnd.randint(0, 10 ** 7),
+            'meta': {'symbol': symbol, 'isFNOSec': True}
+        }
+
+    prefix = ''.join(ch for ch in index_name if ch.isalnum())[:4]
+    data = [row(index_name, 1, index_name)]
+    data.extend(row(f'{prefix}{i:03d}', 0, f'{prefix}{i:03d}EQN') for i in range(stocks))
+    return {
+        'name': index_name,
+        'data': data,
+        'metadata': {'indexName': index_name},
+        'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT)
+    }
@@ -0,0 +1,139 @@
+""" Connection pools shared by every NseApi of a process, with byte accounting
+
+Transport holds one requests adapter which sessions of every NseApi mount, so keep-alive
+connections opened by one instance, or by a session swapped out on cookie refresh, are
+reused by the others instead of paying a new TCP and TLS handshake::
+
+    api = NseApi()                      # uses Transport.shared()
+    api.option_chain('NIFTY', True)
+    api.transport.stats()               # connections opened, bytes on the wire and decoded per endpoint
+"""
+import socket
+import threading
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.request import ACCEPT_ENCODING
+
+# TCP keep-alive probes, so idle pooled connections dropped by NAT or proxies are noticed
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class _SharedAdapter(HTTPAdapter):
+    """ HTTPAdapter which survives Session.close(), pools are closed by Transport.close() """
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('socket_options', SOCKET_OPTIONS)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+    def close(self):
+        pass
+
+    def close_pools(self):
+        super().close()
+
+
+class Transport:
+    """ Keep-alive connection pools, compression headers and byte counters shared by sessions """
+    POOL_CONNECTIONS = 4    # Hosts kept pooled
+    POOL_MAXSIZE = 8        # Connections kept per host
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE, pool_connections: int = POOL_CONNECTIONS,
+                 compress: bool = True):
+        """ Keep-alive connection pools
+
+        Args:
+            pool_maxsize (int, optional): connections kept per host, grown by resize. Defaults to 8.
+            pool_connections (int, optional): hosts kept pooled. Defaults to 4.
+            compress (bool, optional): ask for compressed responses, gzip and deflate, plus brotli and
+                zstd if their packages are installed. Defaults to True.
+        """
+        self.pool_maxsize = pool_maxsize
+        self.pool_connections = pool_connections
+        self.compress = compress
+        self.headers = {
+            'Accept-Encoding': ACCEPT_ENCODING.replace(',', ', ') if compress else 'identity',
+            'Connection': 'keep-alive',
+        }
+        self.adapter = _SharedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: [0, 0, 0])     # endpoint: [responses, wire bytes, bytes]
+        self._retired_connections = 0
+
+    @classmethod
+    def shared(cls) -> 'Transport':
+        """ Return transport of the process, created on first call """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def mount(self, session: requests.Session):
+        """ Route http and https requests of session through pools of transport """
+        session.headers.update(self.headers)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def resize(self, pool_maxsize: int):
+        """ Grow pools to keep pool_maxsize connections per host, idle connections are dropped """
+        with self._lock:
+            if pool_maxsize <= self.pool_maxsize:
+                return
+            self._retired_connections += self._opened()
+            old = self.adapter.poolmanager
+            self.pool_maxsize = pool_maxsize
+            self.adapter.init_poolmanager(self.pool_connections, pool_maxsize)
+            old.clear()
+
+    def record(self, endpoint: str, res: requests.Response) -> int:
+        """ Count bytes of res, read body first
+
+        Returns:
+            int: bytes received on the wire, before decompression
+        """
+        size = len(res.content)
+        try:
+            wire = res.raw.tell()
+        except (AttributeError, OSError):
+            wire = size
+        with self._lock:
+            counts = self._stats[endpoint]
+            counts[0] += 1
+            counts[1] += wire
+            counts[2] += size
+        return wire
+
+    @property
+    def connections(self) -> int:
+        """ Return connections opened, each one a TCP and TLS handshake """
+        with self._lock:
+            return self._retired_connections + self._opened()
+
+    def _opened(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        return sum(getattr(pools.get(key), 'num_connections', 0) for key in pools.keys())
+
+    def stats(self) -> dict:
+        """ Return connections opened, and responses, wire and decoded bytes and compression ratio per endpoint """
+        with self._lock:
+            endpoints = {endpoint: {'responses': responses, 'wire_bytes': wire, 'bytes': size,
+                                    'ratio': size / wire if wire else 1.0}
+                         for endpoint, (responses, wire, size) in self._stats.items()}
+        return {'connections': self.connections, 'endpoints': endpoints}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def close(self):
+        """ Close pooled connections, sessions mounting transport open new ones on next request """
+        with self._lock:
+            self._retired_connections += self._opened()
+            self.adapter.close_pools()
+
+    def __repr__(self):
+        return f'Transport(pool_maxsize={self.pool_maxsize}, compress={self.compress})'
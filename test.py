@@ -1,16 +1,14 @@
 from nseapi import NseApi
-from nseapi.data_models import ExpiryDates
-import pandas as pd
+from nseapi.fake_server import FakeNseServer
 
-from nseapi.data_models import OpenInterest
-
-nse = NseApi(log_info=True)
-print(nse.get_stocks_list(['Nifty', 'Banknifty']))
-oi = nse.get_oi('nifty', index=True)
-# oiobj = OpenInterest(oi)
-# ed = ExpiryDates(oi.df['Expiry Date'])
-# ed_weekly = ed.near_expiry.weekly_expiry
-# near = oi.near_expriry
-# near_next = oi.get_by_expiry(['25-02-21', '04-03-21'])
-# next_current = oi.trim()
-print('Test')
\ No newline at end of file
+# Runs against local FakeNseServer, remove the with block to try nseindia.com
+with FakeNseServer():
+    nse = NseApi(debug=True)
+    print(nse.index_stocks(['Nifty', 'Banknifty']).get_list())
+    oi = nse.option_chain('nifty', index=True)
+    ed_weekly = oi.expiry_dates.near_expiry.weekly_expiry
+    near = oi.near_expriry
+    next_current = oi.trim()
+    print(ed_weekly, near.strike_prices[:5], len(next_current))
+    nse.close()
+print('Test')
@@ -0,0 +1,26 @@
+import asyncio
+from nseapi.async_requester import AsyncNseApi
+from nseapi.fake_server import FakeNseServer
+from nseapi.requester import NseApi
+from nseapi.transport import Transport
+
+SYMBOLS = ['NIFTY', 'BANKNIFTY', 'FINNIFTY', 'RELIANCE', 'TCS', 'INFY', 'SBIN', 'ITC']
+
+
+def test_concurrent_coroutines_load_main_page_once():
+    async def fetch_all(api):
+        return [chain async for chain in api.option_chains(SYMBOLS)]
+
+    with FakeNseServer(strikes=20, expiries=2, latency=0.02) as server:
+        api = NseApi(lazy=True, background_refresh=False, transport=Transport())
+        async_api = AsyncNseApi(api)
+        try:
+            results = asyncio.run(fetch_all(async_api))
+        finally:
+            async_api.close()
+            api.close()
+
+    assert sorted(symbol for symbol, _ in results) == sorted(SYMBOLS)
+    assert all(chain is not None and len(chain) for _, chain in results)
+    assert server.stats[('/', 200)] == 1
+    assert sum(count for (_, status), count in server.stats.items() if status == 401) == 0
@@ -0,0 +1,67 @@
+import nseapi.cache
+from nseapi.cache import ResponseCache
+from nseapi.fake_server import FakeNseServer
+from nseapi.requester import NseApi
+from nseapi.transport import Transport
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nseapi.cache.t, 'monotonic', clock)
+    cache = ResponseCache(ttl=30)
+    key = cache.key('url', {'symbol': 'NIFTY'})
+    cache.put(key, {'a': 1}, 10)
+    clock.now += 29
+    assert cache.get(key) == {'a': 1}
+    clock.now += 2
+    assert cache.get(key) is None
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResponseCache(max_bytes=100)
+    a, b, c = (cache.key('url', {'symbol': s}) for s in 'abc')
+    cache.put(a, 'a', 40)
+    cache.put(b, 'b', 40)
+    assert cache.get(a) == 'a'          # b is least recently used now
+    cache.put(c, 'c', 40)
+    assert cache.get(b) is None and cache.get(a) == 'a' and cache.get(c) == 'c'
+    assert cache.size == 80 and cache.stats['evictions'] == 1
+
+    cache.put(cache.key('big'), 'big', 101)
+    assert cache.get(cache.key('big')) is None and len(cache) == 2
+
+
+def test_parsed_reused_for_same_time_stamp():
+    cache = ResponseCache()
+    key = cache.key('url')
+    cache.put(key, 'payload', 10)
+    parsed = object()
+    cache.put_parsed(key, '19-Feb-2021 15:30:00', parsed)
+    cache.put(key, 'refetched payload', 10)
+    assert cache.get_parsed(key, '19-Feb-2021 15:30:00') is parsed
+    assert cache.get_parsed(key, '19-Feb-2021 15:31:00') is None
+    assert cache.get_parsed(key, None) is None
+    assert cache.stats['parsed_hits'] == 1 and cache.stats['parsed_misses'] == 2
+
+
+def test_cached_chain_is_not_changed_by_callers():
+    with FakeNseServer(strikes=10, expiries=2, update_interval=600):
+        api = NseApi(background_refresh=False, response_cache=ResponseCache(ttl=0), transport=Transport())
+        try:
+            first = api.option_chain('NIFTY', True)
+            first['Call Open Interest'] = -1
+            first.df = first.df.iloc[:1]
+            second = api.option_chain('NIFTY', True)
+        finally:
+            api.close()
+    assert api.response_cache.stats['parsed_hits'] == 1
+    assert len(second) > 1 and (second['Call Open Interest'] != -1).any()
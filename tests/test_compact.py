@@ -0,0 +1,94 @@
+""" Compact option chains give the same results as default ones everywhere they are used """
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from nseapi.data_models import OptionChain
+from nseapi.history import OptionChainHistory
+from nseapi.multichain import MultiChain
+from nseapi.store import SnapshotStore
+from nseapi.stream import ChainStream
+from nseapi.synthetic import option_chain_payload
+
+FILTERS = ['near_expriry', 'next_expiry', 'far_expiry', 'monthly_expiry', 'weekly_expiry', 'current_expiry']
+START = datetime(2021, 2, 19, 9, 15)
+
+
+def payloads(symbol='NIFTY', count=3):
+    return [option_chain_payload(symbol, strikes=30, expiries=6, time_stamp=START + timedelta(minutes=i),
+                                 seed=i) for i in range(count)]
+
+
+def chains(compact, symbol='NIFTY', count=3):
+    return [OptionChain(payload, compact=compact) for payload in payloads(symbol, count)]
+
+
+def test_compact_chain_unchanged():
+    chain, compact = chains(False, count=1)[0], chains(True, count=1)[0]
+    assert compact.compact
+    assert chain.to_dict() == compact.to_dict()
+    assert chain.trim(5).to_dict() == compact.trim(5).to_dict()
+    for name in FILTERS:
+        assert getattr(chain, name).to_dict() == getattr(compact, name).to_dict(), name
+
+
+@pytest.mark.parametrize('first_compact', [True, False])
+def test_store_round_trip(tmp_path, first_compact):
+    default, compact = chains(False), chains(True)
+    with SnapshotStore(tmp_path, fsync=False) as store:
+        for i in range(len(default)):
+            store.append((compact if (i == 0) == first_compact else default)[i])
+
+    stored = list(SnapshotStore(tmp_path).snapshots('NIFTY'))
+    assert len(stored) == len(default)
+    for chain, read in zip(default, stored):
+        assert read.time_stamp == chain.time_stamp
+        assert read.df['Call Identifier'].notna().all()
+        pd.testing.assert_frame_equal(read.df, chain.df, check_exact=True)
+
+
+def test_history():
+    default, compact = OptionChainHistory(), OptionChainHistory()
+    for chain, compact_chain in zip(chains(False), chains(True)):
+        assert default.append(chain) and compact.append(compact_chain)
+    pd.testing.assert_frame_equal(default.to_dataframe(), compact.to_dataframe(), check_exact=True)
+    pd.testing.assert_series_equal(default.vwap_iv('Put'), compact.vwap_iv('Put'))
+
+
+def test_multichain():
+    default = MultiChain(chains(False, 'NIFTY', 1) + chains(False, 'BANKNIFTY', 1))
+    compact = MultiChain(chains(True, 'NIFTY', 1) + chains(True, 'BANKNIFTY', 1))
+    pd.testing.assert_frame_equal(default.df, compact.df, check_exact=True)
+    pd.testing.assert_frame_equal(default.summary(strikes_around_atm=5, expiry_rank=0),
+                                  compact.summary(strikes_around_atm=5, expiry_rank=0), check_exact=True)
+
+
+def test_stream():
+    default, compact = ChainStream(), ChainStream()
+    for chain, compact_chain in zip(chains(False), chains(True)):
+        diff, compact_diff = default.update(chain), compact.update(compact_chain)
+        pd.testing.assert_frame_equal(diff.changed, compact_diff.changed, check_exact=True)
+        pd.testing.assert_frame_equal(diff.removed, compact_diff.removed)
+        assert diff.underlying_value == compact_diff.underlying_value
+
+
+def test_getitem():
+    chain, compact = chains(False, count=1)[0], chains(True, count=1)[0]
+    for name in ['Call Identifier', 'Put Identifier', 'Strike Price', 'Call Open Interest', 'Put Last Price',
+                 'Underlying']:
+        pd.testing.assert_series_equal(compact[name], chain[name], check_exact=True)
+    columns = ['Strike Price', 'Call Identifier', 'Call Implied Volatility']
+    pd.testing.assert_frame_equal(compact[columns], chain[columns], check_exact=True)
+    pd.testing.assert_frame_equal(compact.trim(3)[columns], chain.trim(3)[columns], check_exact=True)
+    with pytest.raises(KeyError):
+        compact['No Such Column']
+
+
+
+def test_column():
+    chain, compact = chains(False, count=1)[0], chains(True, count=1)[0]
+    for name in ['Call Identifier', 'Strike Price', 'Expiry Date', 'Put Open Interest', 'Underlying Value']:
+        values = compact.column(name)
+        assert values.dtype == chain.df[name].dtype, name
+        np.testing.assert_array_equal(values, chain.column(name))
+        np.testing.assert_array_equal(compact.near_expriry.column(name), chain.near_expriry.df[name].to_numpy())
@@ -0,0 +1,17 @@
+from nseapi.metrics import PrometheusSink
+
+
+def test_render_escapes_label_values():
+    sink = PrometheusSink(buckets=(1.0,))
+    sink.increment('nse_errors_total', error='bad "json"\nat C:\\tmp')
+    sink.observe('nse_fetch_seconds', 0.5, symbol='M&M')
+
+    assert sink.render().splitlines() == [
+        '# TYPE nse_errors_total counter',
+        'nse_errors_total{error="bad \\"json\\"\\nat C:\\\\tmp"} 1',
+        '# TYPE nse_fetch_seconds histogram',
+        'nse_fetch_seconds_bucket{symbol="M&M",le="1.0"} 1',
+        'nse_fetch_seconds_bucket{symbol="M&M",le="+Inf"} 1',
+        'nse_fetch_seconds_sum{symbol="M&M"} 0.5',
+        'nse_fetch_seconds_count{symbol="M&M"} 1',
+    ]
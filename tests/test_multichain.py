@@ -0,0 +1,34 @@
+import warnings
+from datetime import datetime
+import numpy as np
+from nseapi.data_models import OptionChain
+from nseapi.multichain import MultiChain
+from nseapi.synthetic import option_chain_payload
+
+
+def multichain():
+    chains = [OptionChain(option_chain_payload(symbol, strikes=20, expiries=3, time_stamp=datetime(2021, 2, 19, 10),
+                                               seed=i), compact=i == 1)
+              for i, symbol in enumerate(['NIFTY', 'BANKNIFTY', 'RELIANCE'])]
+    return MultiChain(chains)
+
+
+def test_aggregate_numeric_columns():
+    chains = multichain()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        total = chains.aggregate('sum', expiry_rank=0)
+    assert 'Expiry Date' not in total and 'Call Identifier' not in total
+    rows = chains.select(expiry_rank=0)
+    for symbol, time_stamp in total.index:
+        assert total.loc[(symbol, time_stamp), 'Call Open Interest'] == \
+            rows.loc[rows['Symbol'] == symbol, 'Call Open Interest'].sum()
+
+
+def test_summary_matches_chains():
+    chains = multichain()
+    summary = chains.summary(strikes_around_atm=3, expiry_rank=0)
+    for i, chain in enumerate(chains.chains):
+        near = chain.current_expiry.trim(3)
+        assert summary['Put OI'].iloc[i] == np.nansum(near['Put Open Interest'])
+        assert summary['ATM Strike'].iloc[i] == chain.current_expiry.middle_strike
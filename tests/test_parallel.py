@@ -0,0 +1,23 @@
+import json
+import pytest
+from nseapi.data_models import OptionChain
+from nseapi.parallel import parse_many
+from nseapi.synthetic import option_chain_payload
+
+
+def bodies(count):
+    return [json.dumps(option_chain_payload('NIFTY', strikes=10, expiries=2, seed=i)).encode() for i in range(count)]
+
+
+def test_chains_match_serial_parse():
+    payloads = bodies(3)
+    for body, chain in zip(payloads, parse_many(payloads, workers=2)):
+        assert chain.to_dict() == OptionChain(json.loads(body)).to_dict()
+
+
+def test_none_payload_does_not_end_input():
+    payloads = bodies(3)
+    chains = parse_many([payloads[0], None, payloads[1], payloads[2]], workers=1)
+    assert len(next(chains)) > 0
+    with pytest.raises(ValueError):
+        next(chains)
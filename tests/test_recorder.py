@@ -0,0 +1,62 @@
+import threading
+import pytest
+from nseapi.data_models import IndexStocks, OptionChain
+from nseapi.fake_server import FakeNseServer
+from nseapi.recorder import BLOCK_HEADER, SEGMENT_GLOB, Recorder, Replayer, _zstd
+from nseapi.requester import NseApi
+from nseapi.transport import Transport
+
+
+def test_blocks_are_written_off_request_thread(tmp_path, monkeypatch):
+    writers = []
+    write_block = Recorder._write_block
+
+    def spy(self, block):
+        writers.append(threading.current_thread())
+        write_block(self, block)
+
+    monkeypatch.setattr(Recorder, '_write_block', spy)
+    with Recorder(tmp_path, block_bytes=64) as recorder:
+        for i in range(20):
+            recorder.record('url', {'symbol': 'NIFTY'}, 'Open Interest', b'{"records": %d}' % i)
+        recorder.flush()
+        assert recorder.bytes_out > 0
+
+    assert writers and threading.current_thread() not in writers
+    records = list(Replayer(tmp_path).records())
+    assert [record.content for record in records] == [b'{"records": %d}' % i for i in range(20)]
+
+
+def test_replay_recording_of_fake_server(tmp_path):
+    with FakeNseServer(strikes=10, expiries=2):
+        recorder = Recorder(tmp_path)
+        api = NseApi(background_refresh=False, recorder=recorder, transport=Transport())
+        api.option_chain('NIFTY', True)
+        api.option_chain('RELIANCE', False)
+        api.index_stocks(['NIFTY'])
+        api.close()
+        recorder.close()
+
+    replayed = list(Replayer(tmp_path))
+    assert [type(data) for _, data in replayed] == [OptionChain, OptionChain, IndexStocks]
+    assert [record.symbol for record, _ in replayed] == ['NIFTY', 'RELIANCE', 'NIFTY']
+    assert all(len(data.data if isinstance(data, IndexStocks) else data) for _, data in replayed)
+
+
+@pytest.mark.parametrize('codec', ['zlib', pytest.param('zstd', marks=pytest.mark.skipif(
+    _zstd is None, reason='zstandard is not installed'))])
+def test_replay_stops_at_corrupt_block(tmp_path, codec):
+    with Recorder(tmp_path, codec=codec) as recorder:
+        recorder.record('url', {'symbol': 'NIFTY'}, 'Open Interest', b'{"records": 1}')
+        recorder.flush()
+        recorder.record('url', {'symbol': 'NIFTY'}, 'Open Interest', b'{"records": 2}')
+
+    path, = tmp_path.glob(SEGMENT_GLOB)
+    with open(path, 'r+b') as f:
+        _, _, size, meta_size, *_ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        f.seek(meta_size + size, 1)
+        _, _, size, meta_size, *_ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        f.seek(meta_size, 1)
+        f.write(b'\xff' * size)
+
+    assert [record.content for record in Replayer(tmp_path).records()] == [b'{"records": 1}']
@@ -0,0 +1,112 @@
+import json
+import socket
+import pytest
+import requests
+import urllib3
+import nseapi.retry
+from nseapi.retry import AUTH, BAD_JSON, FATAL, THROTTLED, TRANSIENT, CircuitBreaker, RetryPolicy, \
+    classify_exception, classify_status
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nseapi.retry.t, 'monotonic', clock)
+    return clock
+
+
+@pytest.mark.parametrize('status, error', [(429, THROTTLED), (503, THROTTLED), (401, AUTH), (403, AUTH),
+                                           (500, TRANSIENT), (502, TRANSIENT), (408, TRANSIENT),
+                                           (404, FATAL), (400, FATAL)])
+def test_classify_status(status, error):
+    assert classify_status(status) == error
+
+
+@pytest.mark.parametrize('exception, error', [
+    (requests.exceptions.Timeout(), TRANSIENT),
+    (requests.exceptions.ConnectionError(), TRANSIENT),
+    (urllib3.exceptions.ReadTimeoutError(None, None, 'timeout'), TRANSIENT),
+    (socket.gaierror(), TRANSIENT),
+    (json.JSONDecodeError('x', '', 0), BAD_JSON),
+    (TypeError(), FATAL),
+    (AttributeError(), FATAL),
+    (KeyError('records'), FATAL),
+])
+def test_classify_exception(exception, error):
+    assert classify_exception(exception) == error
+
+
+def test_full_jitter_bounds(monkeypatch):
+    policy = RetryPolicy(base_delay=0.5, max_delay=8.0, throttle_factor=4.0)
+    monkeypatch.setattr(nseapi.retry.random, 'uniform', lambda low, high: high)
+    assert [policy.delay(attempt, TRANSIENT) for attempt in range(1, 7)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+    assert policy.delay(2, THROTTLED) == 4.0
+    assert policy.delay(1, AUTH) == 0.0
+
+    monkeypatch.undo()
+    for attempt in range(1, 8):
+        for _ in range(50):
+            assert 0 <= policy.delay(attempt, TRANSIENT) <= min(0.5 * 2 ** (attempt - 1), 8.0)
+
+
+def test_deadline_cutoff(clock):
+    policy = RetryPolicy(max_attempts=10, deadline=5.0)
+    started = clock()
+    assert policy.should_retry(TRANSIENT, 1, started, 1.0)
+    clock.now += 4.5
+    assert policy.remaining(started) == pytest.approx(0.5)
+    assert not policy.should_retry(TRANSIENT, 2, started, 1.0)
+    assert policy.should_retry(TRANSIENT, 2, started, 0.1)
+    assert not policy.should_retry(FATAL, 2, started, 0.1)
+    assert not RetryPolicy(max_attempts=2).should_retry(TRANSIENT, 2, clock(), 0.0)
+
+
+def test_breaker_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()          # one trial at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()                   # trial said nothing about health, next call is the trial
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow() and breaker.allow()
+    assert breaker.rejections == 2
+
+
+def test_local_error_is_not_retried_or_counted_by_breaker():
+    import nseapi.constant as c
+    from nseapi.fake_server import FakeNseServer
+    from nseapi.requester import NseApi
+    from nseapi.transport import Transport
+
+    def broken_decoder(content):
+        raise TypeError('bug')
+
+    with FakeNseServer(strikes=10, expiries=2):
+        api = NseApi(background_refresh=False, transport=Transport())
+        try:
+            assert api._get(c.URL_INDICES, {'symbol': 'NIFTY'}, 'Open Interest', decode=broken_decoder) is None
+        finally:
+            api.close()
+    assert api.metrics['attempts'] == 1 and api.metrics.get('retries', 0) == 0
+    assert api.metrics['errors_fatal'] == 1
+    assert api._breaker(c.URL_INDICES).failures == 0
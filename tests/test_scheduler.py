@@ -0,0 +1,50 @@
+import logging
+import threading
+import time as t
+from nseapi.scheduler import PollScheduler
+
+
+class FakeApi:
+    """ Api whose polls all fail, first poll blocks till released """
+    logger = logging.getLogger('test')
+
+    def __init__(self):
+        self.calls = 0
+        self.first_call = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def mount_adapters(self, pool_size):
+        pass
+
+    def option_chain_payload(self, symbol, index):
+        with self._lock:
+            self.calls += 1
+        if not self.first_call.is_set():
+            self.first_call.set()
+            self.release.wait(5)
+        return None
+
+
+def test_remove_and_add_during_poll_keeps_one_schedule():
+    api = FakeApi()
+    scheduler = PollScheduler(api, rate=100, burst=10, jitter=0)
+    scheduler.MIN_INTERVAL = 0.2
+    scheduler.add('NIFTY', interval=0.2)
+    scheduler.start(lambda symbol, chain: None)
+    try:
+        assert api.first_call.wait(5)
+        # Poll of old state is in flight while symbol is removed and added again
+        scheduler.remove('NIFTY')
+        scheduler.add('NIFTY', interval=0.2)
+        api.release.set()
+        t.sleep(1.0)
+    finally:
+        scheduler.stop(5)
+
+    stats = scheduler.stats
+    assert stats['symbols'] == 1 and stats['in_flight'] == 0
+    # Polls of old state are not counted, and a second schedule of symbol would double polls
+    assert stats['polls'] == api.calls - 1
+    assert 2 <= stats['polls'] <= 7
+    assert stats['failures'] == stats['polls']
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+from nseapi.data_models import OptionChain
+from nseapi.store import SnapshotStore
+from nseapi.synthetic import option_chain_payload
+
+START = datetime(2021, 2, 19, 9, 15)
+
+
+def chain(i):
+    return OptionChain(option_chain_payload('NIFTY', strikes=20, expiries=3, time_stamp=START + timedelta(minutes=i),
+                                            seed=i))
+
+
+def test_failed_append_leaves_no_rows(tmp_path):
+    first, second = chain(0), chain(2)
+    bad = chain(1)
+    bad.df = bad.df.assign(**{'Call Identifier': 'NEW' + bad.df['Call Identifier'],
+                              bad.df.columns[-1]: 'not a number'})
+
+    with SnapshotStore(tmp_path, fsync=False) as store:
+        assert store.append(first)
+        with pytest.raises(ValueError):
+            store.append(bad)
+        assert store.append(second)
+
+    stored = list(SnapshotStore(tmp_path).snapshots('NIFTY'))
+    assert [snapshot.time_stamp for snapshot in stored] == [first.time_stamp, second.time_stamp]
+    for expected, snapshot in zip((first, second), stored):
+        pd.testing.assert_frame_equal(snapshot.df, expected.df, check_exact=True)
+
+
+def test_read_range_and_columns(tmp_path):
+    chains = [chain(i) for i in range(3)]
+    with SnapshotStore(tmp_path, fsync=False) as store:
+        for c in chains:
+            assert store.append(c)
+        assert not store.append(chains[0])
+
+    store = SnapshotStore(tmp_path)
+    assert list(store.time_stamps('NIFTY')) == [c.time_stamp for c in chains]
+    df = store.read('NIFTY', start=chains[1].time_stamp, columns=['Call Open Interest'])
+    assert list(df.columns) == ['Time Stamp', 'Strike Price', 'Expiry Date', 'Call Open Interest']
+    assert len(df) == len(chains[1]) + len(chains[2])